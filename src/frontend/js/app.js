@@ -5,6 +5,8 @@ let followMode = false;
 let zoomCycle = 0; // 0: overview, 1: 75% (16), 2: 100% (18)
 let lastApiData = null; // Store full API response for navigation
 const REFRESH_MS = 30000;
+// Only the bus attributes this page reads (GRT_Reader ?fields=)
+const BUS_FIELDS = 'id,lat,lon,bearing,route_id,headsign,next_scheduled_arrival,next_stop_name,target_stop_sequence,current_stop_sequence';
 const NEW_SERVICE_DAY_START_HOUR = 5; // 5 AM
 
 function logAction(message, details = {}) {
@@ -65,7 +67,7 @@ async function searchStop() {
     btn.innerText = "...";
     logAction('SearchStop', { stopId: id });
     try {
-        const res = await fetch(`${API_URL}?stop_id=${id}`);
+        const res = await fetch(`${API_URL}?stop_id=${id}&fields=${BUS_FIELDS}`);
         if (res.status === 404) throw new Error("Stop not found");
         const data = await res.json();
         lastApiData = data;
@@ -96,6 +98,38 @@ async function searchStop() {
     finally { btn.innerText = originalText; }
 }
 
+function findNearbyStops() {
+    const list = document.getElementById('nearby-list');
+    if (!navigator.geolocation) { list.innerHTML = '<p class="nearby-status">Location is not available on this device.</p>'; return; }
+    list.innerHTML = '<p class="nearby-status">Finding your location...</p>';
+    logAction('NearbyStops');
+    navigator.geolocation.getCurrentPosition(async pos => {
+        try {
+            const res = await fetch(`${API_URL}?lat=${pos.coords.latitude.toFixed(5)}&lon=${pos.coords.longitude.toFixed(5)}&radius=800&k=6`);
+            const data = await res.json();
+            const stops = data.stops || [];
+            if (stops.length === 0) { list.innerHTML = '<p class="nearby-status">No stops within 800 m.</p>'; return; }
+            list.innerHTML = '';
+            stops.forEach(s => {
+                const el = document.createElement('div'); el.className = 'nearby-stop';
+                // Stop names come from the GTFS feed: set them as text, never as markup
+                const name = document.createElement('div'); name.className = 'nearby-name';
+                const id = document.createElement('span'); id.className = 'nearby-id'; id.textContent = `#${s.id}`;
+                name.append(`${s.name} `, id);
+                const meta = document.createElement('div'); meta.className = 'nearby-meta';
+                meta.textContent = `${s.distance_m} m · Routes ${s.routes.join(', ') || '--'}`;
+                el.append(name, meta);
+                el.onclick = () => {
+                    document.getElementById('stopInput').value = s.id;
+                    updateDisplay();
+                    searchStop();
+                };
+                list.appendChild(el);
+            });
+        } catch (e) { list.innerHTML = '<p class="nearby-status">Could not load nearby stops.</p>'; }
+    }, () => { list.innerHTML = '<p class="nearby-status">Location permission denied.</p>'; }, { enableHighAccuracy: true, timeout: 10000 });
+}
+
 function showRoutes(data = null) {
     if (!data) data = lastApiData;
 
@@ -245,7 +279,7 @@ function startTracking(routeKey) {
 
 async function refreshData() {
     try {
-        const res = await fetch(`${API_URL}?stop_id=${stopData.id}`);
+        const res = await fetch(`${API_URL}?stop_id=${stopData.id}&fields=${BUS_FIELDS}`);
         const data = await res.json();
         activeBuses = data.nearby_buses || [];
         const routeBuses = activeBuses.filter(b => `${b.route_id}|${b.headsign}` === selectedRouteKey);
@@ -439,6 +473,7 @@ function resetApp() {
     logAction('ResetApp');
     document.getElementById('stopInput').value = '';
     updateDisplay();
+    document.getElementById('nearby-list').innerHTML = '';
     document.getElementById('search-screen').classList.remove('hidden');
     document.querySelector('.back-btn').style.display = 'none';
     document.getElementById('route-sheet').classList.remove('active');
@@ -0,0 +1,44 @@
+"""
+Bounded-memory download of a GTFS archive.
+
+The response body is streamed in CHUNK_BYTES pieces into a SpooledTemporaryFile
+that stays in memory up to SPOOL_MAX_BYTES and then rolls over to a file under
+/tmp (Lambda's ephemeral storage), so a bigger feed costs disk rather than RSS.
+The result is a seekable file that zipfile.ZipFile reads lazily: members are
+decompressed as they're streamed, never whole.
+
+Copies of this module ship in pkg_static and pkg_checker, kept identical by pkg_reader/test_shared_modules.py.
+"""
+import os, tempfile
+
+CHUNK_BYTES = 1024 * 1024
+SPOOL_MAX_BYTES = int(os.environ.get('SPOOL_MAX_BYTES', str(8 * 1024 * 1024)))
+SPOOL_DIR = os.environ.get('SPOOL_DIR', tempfile.gettempdir())
+
+
+def download_to_spool(response, max_size=SPOOL_MAX_BYTES, chunk_size=CHUNK_BYTES):
+    """Drains a requests response made with stream=True. Returns (spooled file at offset 0, bytes read)."""
+    spool = tempfile.SpooledTemporaryFile(max_size=max_size, dir=SPOOL_DIR)
+    size = 0
+    try:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            if not chunk: continue
+            spool.write(chunk)
+            size += len(chunk)
+    except Exception:
+        spool.close()
+        raise
+    finally:
+        response.close()
+    spool.seek(0)
+    return spool, size
+
+
+def count_lines(z, name):
+    """Lines in an archive member, read in blocks rather than decoded whole."""
+    lines, last = 0, b'\n'
+    with z.open(name) as f:
+        for block in iter(lambda: f.read(CHUNK_BYTES), b''):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    return lines + (last != b'\n')  # a last line without a newline still counts
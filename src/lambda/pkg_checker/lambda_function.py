@@ -1,11 +1,11 @@
 import json, boto3, requests, os, zipfile, io, datetime
 from botocore.exceptions import ClientError
+from gtfs_download import download_to_spool, count_lines
 
 # Configuration
 GTFS_URL = "https://webapps.regionofwaterloo.ca/api/grt-routes/api/GTFS"
 DYNAMO_TABLE = os.environ['DYNAMO_TABLE']
 INGEST_FUNCTION = "GRT_Static_Ingest"
-STOP_TIMES_FUNCTION = "GRT_Static_Ingest_StopTimes"
 
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table(DYNAMO_TABLE)
@@ -29,12 +29,14 @@ def get_last_modified():
     except: return ""
 
 def update_last_modified(new_val):
-    table.put_item(Item={'PK': 'CONFIG#STATIC', 'last_modified': new_val, 'updated_at': datetime.datetime.utcnow().isoformat()})
+    # Marks the feed as seen so it isn't re-validated; GRT_Static_Ingest sets loaded_version on the same item once it is in
+    table.update_item(Key={'PK': 'CONFIG#STATIC'}, UpdateExpression='SET last_modified = :v, updated_at = :t',
+                      ExpressionAttributeValues={':v': new_val, ':t': datetime.datetime.utcnow().isoformat()})
 
-def validate_gtfs(content):
-    """The 'Guardian' Heuristic Validation Logic"""
+def validate_gtfs(archive):
+    """The 'Guardian' Heuristic Validation Logic. archive: a seekable file holding the ZIP."""
     try:
-        with zipfile.ZipFile(io.BytesIO(content)) as z:
+        with zipfile.ZipFile(archive) as z:
             files = z.namelist()
             required = ['stops.txt', 'trips.txt', 'stop_times.txt', 'calendar.txt']
             
@@ -42,12 +44,14 @@ def validate_gtfs(content):
             for f in required:
                 if f not in files: return False, f"Missing required file: {f}"
             
-            # 2. Volume Check (Heuristic: GRT always has > 2000 stops)
-            stops_count = len(z.read('stops.txt').decode('utf-8').splitlines())
+            # 2. Volume Check (Heuristic: GRT always has > 2000 stops), counted without decoding the file
+            stops_count = count_lines(z, 'stops.txt')
             if stops_count < 2000: return False, f"Suspiciously low stop count: {stops_count}"
             
             # 3. Date Check (Heuristic: Ensure schedule isn't expired)
-            calendar_lines = z.read('calendar.txt').decode('utf-8').splitlines()
+            # Only the header and first row are needed, so only they are read
+            with z.open('calendar.txt') as f:
+                calendar_lines = [line.rstrip('\r\n') for _, line in zip(range(2), io.TextIOWrapper(f, 'utf-8'))]
             if len(calendar_lines) > 1:
                 # Get the end_date from the second line (first is header)
                 # Format is usually YYYYMMDD
@@ -74,8 +78,11 @@ def lambda_handler(event, context):
 
         # 2. New data found, download and validate
         print(f"New data detected ({new_last_modified}). Downloading for validation...")
-        res = requests.get(GTFS_URL)
-        is_valid, reason = validate_gtfs(res.content)
+        res = requests.get(GTFS_URL, stream=True)
+        archive, size = download_to_spool(res)
+        print(f"Downloaded {size} bytes")
+        with archive:
+            is_valid, reason = validate_gtfs(archive)
         
         if not is_valid:
             log_to_system("AutoUpdateBlocked", {"reason": reason, "header": new_last_modified})
@@ -85,10 +92,9 @@ def lambda_handler(event, context):
         print("Data validated. Triggering re-ingestion...")
         log_to_system("AutoUpdateStarted", {"header": new_last_modified})
         
-        # Trigger Static Ingest
-        lambda_client.invoke(FunctionName=INGEST_FUNCTION, InvocationType='Event')
-        # Trigger Stop Times (This one takes a while, so we just fire and forget)
-        lambda_client.invoke(FunctionName=STOP_TIMES_FUNCTION, InvocationType='Event')
+        # One static ingest writes every static item from a single download and parse (fire and forget).
+        # The load spans several invocations; readers only switch to the new version when it finishes.
+        lambda_client.invoke(FunctionName=INGEST_FUNCTION, InvocationType='Event', Payload=json.dumps({'version': new_last_modified}))
         
         update_last_modified(new_last_modified)
         
@@ -38,6 +38,11 @@ class TestUpdateChecker(unittest.TestCase):
                 z.writestr('broken.txt', 'some content')
         return buf.getvalue()
 
+    def serve(self, mock_requests, content):
+        """The download is streamed (stream=True + iter_content), so serve it in small chunks"""
+        mock_requests.get.return_value.iter_content.side_effect = \
+            lambda chunk_size: (content[i:i + 4096] for i in range(0, len(content), 4096))
+
     @patch('lambda_function.requests')
     @patch('lambda_function.table')
     @patch('lambda_function.lambda_client')
@@ -61,7 +66,7 @@ class TestUpdateChecker(unittest.TestCase):
         mock_table.get_item.return_value = {'Item': {'last_modified': 'Mon, 01 Jan 2026 00:00:00 GMT'}}
         
         # Mock an invalid ZIP (missing files)
-        mock_requests.get.return_value.content = self.create_mock_zip(include_all=False)
+        self.serve(mock_requests, self.create_mock_zip(include_all=False))
 
         result = lambda_function.lambda_handler({}, None)
         
@@ -83,14 +88,28 @@ class TestUpdateChecker(unittest.TestCase):
         mock_table.get_item.return_value = {'Item': {'last_modified': 'Mon, 01 Jan 2026 00:00:00 GMT'}}
         
         # Mock a valid ZIP
-        mock_requests.get.return_value.content = self.create_mock_zip()
+        self.serve(mock_requests, self.create_mock_zip())
 
         result = lambda_function.lambda_handler({}, None)
         
         self.assertEqual(result['status'], 'UPDATE_TRIGGERED')
-        # Verify both ingestions were triggered
-        self.assertEqual(mock_lambda.invoke.call_count, 3) # 1 log + 2 ingests
-        mock_table.put_item.assert_called()
+        # Verify the single static ingestion was triggered
+        self.assertEqual(mock_lambda.invoke.call_count, 2) # 1 log + 1 ingest
+        mock_lambda.invoke.assert_called_with(FunctionName='GRT_Static_Ingest', InvocationType='Event',
+                                              Payload=json.dumps({'version': 'Wed, 03 Jan 2026 00:00:00 GMT'}))
+        # Only last_modified is set here; loaded_version is left for the ingest to set when the load is done
+        kwargs = mock_table.update_item.call_args.kwargs
+        self.assertEqual(kwargs['UpdateExpression'], 'SET last_modified = :v, updated_at = :t')
+        self.assertEqual(kwargs['ExpressionAttributeValues'][':v'], 'Wed, 03 Jan 2026 00:00:00 GMT')
+        mock_table.put_item.assert_not_called()
+
+    def test_validation_heuristics_on_streamed_members(self):
+        """Stop count and calendar checks read members as streams from a file object."""
+        self.assertEqual(lambda_function.validate_gtfs(io.BytesIO(self.create_mock_zip())), (True, "Validation Passed"))
+        self.assertEqual(lambda_function.validate_gtfs(io.BytesIO(self.create_mock_zip(stop_count=1998))),
+                         (False, "Suspiciously low stop count: 1999"))  # header line included, as before
+        self.assertEqual(lambda_function.validate_gtfs(io.BytesIO(self.create_mock_zip(expired=True))),
+                         (False, "Schedule expired on 20241231"))
 
 if __name__ == '__main__':
     unittest.main()
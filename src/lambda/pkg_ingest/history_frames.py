@@ -0,0 +1,118 @@
+"""
+Keyframe/delta encoding for BUS_HISTORY snapshots.
+
+A keyframe holds the full fleet. A delta frame holds only the vehicles that
+appeared or whose position, bearing, trip or stop sequence changed since the
+previous written frame, plus the ids of vehicles that disappeared. Any
+timestamp can be rebuilt from its nearest keyframe by replaying the deltas
+after it (each frame records both its keyframe and its predecessor).
+
+Frame layout:
+
+    b'GRH' + kind (b'K' or b'D'), uint32 keyframe timestamp, uint32 previous frame timestamp
+    varint removed count, then varint length + UTF-8 vehicle id per removed vehicle
+    bus_codec snapshot of the full fleet (keyframe) or the changed vehicles (delta)
+
+Blobs written before frames existed (plain bus_codec or gzip-JSON) decode as keyframes.
+
+Copies of this module ship in pkg_ingest and pkg_reader, kept identical by pkg_reader/test_shared_modules.py.
+"""
+import struct
+from bus_codec import encode_buses, decode_buses, _write_varint, _read_varint
+
+MAGIC = b'GRH'
+KEYFRAME, DELTA = b'K', b'D'
+_HEADER = struct.Struct('<4sII')
+
+
+class FrameError(ValueError):
+    pass
+
+
+def _vehicle_state(bus):
+    return (bus['lat'], bus['lon'], bus.get('bearing'), bus.get('trip_id'), bus.get('current_stop_sequence'))
+
+
+def _pack_frame(kind, keyframe_ts, prev_ts, removed, snapshot):
+    out = bytearray(_HEADER.pack(MAGIC + kind, keyframe_ts, prev_ts))
+    _write_varint(out, len(removed))
+    for vehicle_id in removed:
+        encoded = vehicle_id.encode('utf-8')
+        _write_varint(out, len(encoded))
+        out += encoded
+    return bytes(out) + snapshot
+
+
+def encode_keyframe(buses, timestamp):
+    return _pack_frame(KEYFRAME, timestamp, 0, [], encode_buses(buses, timestamp))
+
+
+def encode_delta(prev_buses, buses, timestamp, keyframe_ts, prev_ts):
+    """
+    Encodes buses as a delta against prev_buses. Returns None when the fleet can't be
+    expressed as a delta (duplicate vehicle ids), in which case the caller writes a keyframe.
+    """
+    prev_by_id = {b['id']: b for b in prev_buses}
+    current_ids = {b['id'] for b in buses}
+    if len(prev_by_id) != len(prev_buses) or len(current_ids) != len(buses): return None
+
+    changed = []
+    for bus in buses:
+        prev = prev_by_id.get(bus['id'])
+        if prev is None or _vehicle_state(prev) != _vehicle_state(bus): changed.append(bus)
+    removed = sorted(vid for vid in prev_by_id if vid not in current_ids)
+    return _pack_frame(DELTA, keyframe_ts, prev_ts, removed, encode_buses(changed, timestamp))
+
+
+def decode_frame(blob):
+    """Returns (kind, keyframe_ts, prev_ts, removed_ids, buses) for a frame or a pre-frame snapshot."""
+    blob = bytes(blob)
+    if blob[:3] != MAGIC:
+        buses = decode_buses(blob)
+        timestamp = buses[0]['timestamp'] if buses else 0
+        return KEYFRAME, timestamp, 0, [], buses
+    try:
+        magic, keyframe_ts, prev_ts = _HEADER.unpack_from(blob, 0)
+        pos = _HEADER.size
+        count, pos = _read_varint(blob, pos)
+        removed = []
+        for _ in range(count):
+            length, pos = _read_varint(blob, pos)
+            removed.append(blob[pos:pos + length].decode('utf-8'))
+            pos += length
+    except (IndexError, struct.error, UnicodeDecodeError) as e:
+        raise FrameError(f"Malformed frame: {e}") from e
+    kind = magic[3:4]
+    if kind not in (KEYFRAME, DELTA): raise FrameError(f"Unknown frame kind {kind!r}")
+    return kind, keyframe_ts, prev_ts, removed, decode_buses(blob[pos:])
+
+
+def apply_frame(fleet, frame, timestamp):
+    """Applies a decoded frame to fleet (vehicle id -> bus dict, in first-seen order) and returns it."""
+    kind, _, _, removed, buses = frame
+    if kind == KEYFRAME: fleet = {}
+    for vehicle_id in removed: fleet.pop(vehicle_id, None)
+    for bus in buses: fleet[bus['id']] = bus
+    for bus in fleet.values(): bus['timestamp'] = timestamp
+    return fleet
+
+
+def reconstruct(timestamp, fetch_frame):
+    """
+    Rebuilds the fleet at timestamp. fetch_frame(ts) returns the frame blob written at ts
+    (or None). Walks back through prev pointers to the nearest keyframe, then replays forward.
+    """
+    chain = []
+    ts = timestamp
+    while True:
+        blob = fetch_frame(ts)
+        if blob is None: raise FrameError(f"Missing history frame {ts}")
+        frame = decode_frame(blob)
+        chain.append((ts, frame))
+        if frame[0] == KEYFRAME: break
+        ts = frame[2]
+
+    fleet = {}
+    for ts, frame in reversed(chain):
+        fleet = apply_frame(fleet, frame, ts)
+    return list(fleet.values())
@@ -1,7 +1,14 @@
-import json, boto3, requests, time, os, gzip
-from datetime import datetime, timedelta
+import boto3, requests, time, os, hashlib
 from google.transit import gtfs_realtime_pb2
-from boto3.dynamodb.types import Binary
+from vehicle_decoder import decode_vehicle_positions, DecodeError
+from bus_codec import encode_buses
+from history_frames import encode_keyframe, encode_delta
+from history_store import HistoryWriter, SEGMENT_SECONDS
+from object_store import open_store
+from live_snapshot import publish_snapshot
+from boto3.dynamodb.types import TypeDeserializer
+from concurrent.futures import ThreadPoolExecutor
+from batch_get import batch_get
 from requests.adapters import HTTPAdapter
 from urllib3.poolmanager import PoolManager
 from urllib3.util.ssl_ import create_urllib3_context
@@ -19,34 +26,188 @@ DYNAMO_TABLE = os.environ['DYNAMO_TABLE']
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table(DYNAMO_TABLE)
 
+# Multi-poll mode: one scheduled invocation polls every POLL_INTERVAL_SECONDS until the
+# next scheduler tick (POLL_WINDOW_SECONDS), leaving enough time for a fetch before the timeout.
+POLL_INTERVAL_SECONDS = int(os.environ.get('POLL_INTERVAL_SECONDS', '30'))
+POLL_WINDOW_SECONDS = int(os.environ.get('POLL_WINDOW_SECONDS', '60'))
+FETCH_TIMEOUT_SECONDS = 10
+FETCH_BUDGET_SECONDS = FETCH_TIMEOUT_SECONDS + 3
+
+# Trip lookups go through batch_get: chunks of 100 in parallel, UnprocessedKeys retried with backoff
+# until BATCH_GET_DEADLINE_SECONDS; keys still unread are simply asked for again next poll.
+BATCH_GET_DEADLINE_SECONDS = float(os.environ.get('BATCH_GET_DEADLINE_SECONDS', '5'))
+batch_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('BATCH_GET_WORKERS', '4')))
+deserializer = TypeDeserializer()
+
+def batch_get_items(pks, projection):
+    """(PK -> deserialized item, set of PKs left unread) for any number of keys."""
+    raw_items, unprocessed, stats = batch_get(dynamodb.meta.client, DYNAMO_TABLE, [{'PK': {'S': pk}} for pk in pks], projection,
+                                              batch_executor, BATCH_GET_DEADLINE_SECONDS)
+    if stats.retries or stats.unprocessed: print(f"[WARN] Batch get needed retries: {stats.as_dict()}")
+    items = {}
+    for raw in raw_items:
+        item = {k: deserializer.deserialize(v) for k, v in raw.items()}
+        items[item['PK']] = item
+    return items, {k['PK']['S'] for k in unprocessed}
+
+session = requests.Session()
+session.mount('https://', LegacyAdapter())
+
+# Warm-container trip index (trip_id -> route_id, headsign, block_id).
+# Versioned by CONFIG#STATIC.loaded_version so a finished static re-ingest invalidates it.
+TRIP_INDEX_CHECK_SECONDS = int(os.environ.get('TRIP_INDEX_CHECK_SECONDS', '300'))
+TRIP_INDEX = {'version': None, 'checked_at': 0, 'trips': {}}
+
+# Trips absent from the static tables (a feed ahead of the schedule, or a load still running) are
+# asked for again after MISSING_TRIP_RETRY_SECONDS rather than cached as empty until the next version.
+MISSING_TRIP_RETRY_SECONDS = int(os.environ.get('MISSING_TRIP_RETRY_SECONDS', '300'))
+MISSING_UNTIL = {}  # TRIP# PK -> when to ask for it again
+
+def known_missing(pk, now):
+    until = MISSING_UNTIL.get(pk)
+    if until is None: return False
+    if until > now: return True
+    del MISSING_UNTIL[pk]
+    return False
+
+def mark_missing(pks, found, unprocessed, now):
+    """Remembers which requested PKs came back absent; anything unprocessed at the deadline is simply retried next poll."""
+    for pk in pks:
+        if pk not in found and pk not in unprocessed: MISSING_UNTIL[pk] = now + MISSING_TRIP_RETRY_SECONDS
+
+def get_static_version():
+    try:
+        response = table.get_item(Key={'PK': 'CONFIG#STATIC'}, ProjectionExpression='loaded_version')
+        return response.get('Item', {}).get('loaded_version', "")
+    except Exception as e:
+        print(f"[WARN] Static version check failed: {e}")
+        return TRIP_INDEX['version']
+
+def refresh_trip_index(trip_ids):
+    """Makes sure every trip_id is in TRIP_INDEX, fetching only trips this container hasn't seen."""
+    now = time.time()
+    if now - TRIP_INDEX['checked_at'] >= TRIP_INDEX_CHECK_SECONDS:
+        version = get_static_version()
+        if version != TRIP_INDEX['version']:
+            print(f"Static version changed ({TRIP_INDEX['version']} -> {version}). Resetting trip index.")
+            TRIP_INDEX['trips'] = {}
+            TRIP_INDEX['version'] = version
+            MISSING_UNTIL.clear()
+        TRIP_INDEX['checked_at'] = now
+
+    trips = TRIP_INDEX['trips']
+    missing = [f"TRIP#{t}" for t in set(trip_ids) if t and t not in trips and not known_missing(f"TRIP#{t}", now)]
+    if not missing: return trips
+    try:
+        items, unprocessed = batch_get_items(missing, 'PK, headsign, route_id, block_id')
+    except Exception as e:
+        print(f"[ERROR] Trip index batch get failed: {e}")
+        return trips
+    for pk, item in items.items():
+        trips[pk.split('#', 1)[1]] = {'route_id': item.get('route_id'), 'headsign': item.get('headsign'), 'block_id': item.get('block_id')}
+    mark_missing(missing, items, unprocessed, now)
+    return trips
+
+# Change detection: the last written feed, remembered in the warm container and in a tiny
+# INGEST_STATE item so a cold start doesn't rewrite an unchanged feed.
+LAST_FEED = {'loaded': False, 'header_timestamp': None, 'digest': None, 'buses': None, 'timestamp': None, 'keyframe_ts': None}
+POLL_STATS = {'written': 0, 'skipped': 0}
+
+def vehicle_digest(bus_list):
+    """Content digest of the decoded vehicle set, independent of entity order and poll time."""
+    rows = sorted(f"{b['id']}|{b['lat']}|{b['lon']}|{b['bearing']}|{b['trip_id']}|{b['current_stop_sequence']}" for b in bus_list)
+    return hashlib.blake2b('\n'.join(rows).encode('utf-8'), digest_size=16).hexdigest()
+
+def load_last_feed():
+    if LAST_FEED['loaded']: return LAST_FEED
+    try:
+        item = table.get_item(Key={'PK': 'INGEST_STATE'}).get('Item', {})
+        LAST_FEED['header_timestamp'] = int(item['header_timestamp']) if 'header_timestamp' in item else None
+        LAST_FEED['digest'] = item.get('digest')
+    except Exception as e:
+        print(f"[WARN] Could not load ingest state: {e}")
+    LAST_FEED['loaded'] = True
+    return LAST_FEED
+
+def decode_feed(content):
+    """Returns (header_timestamp, vehicles) using the wire decoder, or the protobuf bindings if it can't parse the feed."""
+    try:
+        return decode_vehicle_positions(content)
+    except DecodeError as e:
+        print(f"[WARN] Fast decode failed ({e}). Falling back to gtfs_realtime_pb2.")
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.ParseFromString(content)
+    vehicles = []
+    for entity in feed.entity:
+        if entity.HasField('vehicle'):
+            v = entity.vehicle
+            vehicles.append([v.vehicle.id, v.position.latitude, v.position.longitude, v.position.bearing,
+                             v.trip.trip_id, v.current_stop_sequence, v.timestamp])
+    return feed.header.timestamp, vehicles
+
+# History is written as a keyframe every HISTORY_KEYFRAME_SECONDS with delta frames in between.
+# Deltas chain to the previous frame this container wrote, so a cold start always begins with a keyframe.
+HISTORY_KEYFRAME_SECONDS = int(os.environ.get('HISTORY_KEYFRAME_SECONDS', '600'))
+
+# With HISTORY_BUCKET (or HISTORY_DIR locally) set, frames go to hourly partitions in the
+# object store instead of one BUS_HISTORY#{timestamp} item per poll (SEGMENT_SECONDS of frames per object).
+history_store = open_store('HISTORY')
+history_writer = HistoryWriter(history_store) if history_store else None
+
+# With SNAPSHOT_BUCKET (or SNAPSHOT_DIR locally) set, every written poll is also published as an
+# immutable live/<hash>.json object plus live/latest.json for clients and GRT_Reader to read from the edge
+snapshot_store = open_store('SNAPSHOT')
+SNAPSHOT_POINTER_MAX_AGE = int(os.environ.get('SNAPSHOT_POINTER_MAX_AGE', '5'))
+
+def build_history_frame(bus_list, timestamp):
+    """Returns (frame_blob, frame_kind, keyframe_ts) for this poll's BUS_HISTORY item."""
+    prev = LAST_FEED['buses']
+    # Every history segment starts with a keyframe so it can be replayed on its own
+    if prev is not None and timestamp - LAST_FEED['keyframe_ts'] < HISTORY_KEYFRAME_SECONDS \
+            and timestamp // SEGMENT_SECONDS == LAST_FEED['timestamp'] // SEGMENT_SECONDS:
+        frame = encode_delta(prev, bus_list, timestamp, LAST_FEED['keyframe_ts'], LAST_FEED['timestamp'])
+        if frame is not None: return frame, 'D', LAST_FEED['keyframe_ts']
+    return encode_keyframe(bus_list, timestamp), 'K', timestamp
+
 def fetch_and_save():
    try:
-       s = requests.Session()
-       s.mount('https://', LegacyAdapter())
-       response = s.get(URL, timeout=10)
+       response = session.get(URL, timeout=FETCH_TIMEOUT_SECONDS)
        if response.status_code != 200: return 0
        
-       feed = gtfs_realtime_pb2.FeedMessage()
-       feed.ParseFromString(response.content)
+       header_timestamp, vehicles = decode_feed(response.content)
        
        timestamp = int(time.time())
        bus_list = []
-       for entity in feed.entity:
-           if entity.HasField('vehicle'):
-               v = entity.vehicle
-               bus_list.append({
-                   "id": v.vehicle.id,
-                   "lat": round(v.position.latitude, 5),
-                   "lon": round(v.position.longitude, 5),
-                   "bearing": v.position.bearing,
-                   "trip_id": v.trip.trip_id,
-                   "current_stop_sequence": v.current_stop_sequence,
-                   "timestamp": timestamp
-               })
+       for vehicle_id, lat, lon, bearing, trip_id, stop_sequence, _ in vehicles:
+           bus_list.append({
+               "id": vehicle_id,
+               "lat": round(lat, 5),
+               "lon": round(lon, 5),
+               "bearing": bearing,
+               "trip_id": trip_id,
+               "current_stop_sequence": stop_sequence,
+               "timestamp": timestamp
+           })
        
        if not bus_list: return 0
 
-       compressed_data = gzip.compress(json.dumps(bus_list).encode('utf-8'))
+       digest = vehicle_digest(bus_list)
+       last = load_last_feed()
+       if header_timestamp == last['header_timestamp'] and digest == last['digest']:
+           POLL_STATS['skipped'] += 1
+           print(f"Feed unchanged (header {header_timestamp}). Skipping write. {POLL_STATS}")
+           return 0
+
+       # Enrich once here so GRT_Reader never has to join TRIP# items per request
+       trips = refresh_trip_index(b['trip_id'] for b in bus_list)
+       for bus in bus_list:
+           details = trips.get(bus['trip_id']) or {}
+           bus['route_id'] = details.get('route_id')
+           bus['headsign'] = details.get('headsign')
+           bus['block_id'] = details.get('block_id')
+
+       compressed_data = encode_buses(bus_list, timestamp)
+       history_frame, frame_kind, keyframe_ts = build_history_frame(bus_list, timestamp)
        
        # Calculate TTL for 12 months from now
        ttl_timestamp = timestamp + (365 * 24 * 60 * 60) # ~1 year
@@ -59,22 +220,69 @@ def fetch_and_save():
                'buses_binary': compressed_data,
                'count': len(bus_list)
            })
-           # 2. Write the historical record with a TTL
+           # 2. Without an object store, write the historical frame (keyframe or delta) with a TTL
+           if not history_writer:
+               batch.put_item(Item={
+                   'PK': f'BUS_HISTORY#{timestamp}',
+                   'buses_binary': history_frame,
+                   'frame': frame_kind,
+                   'keyframe': keyframe_ts,
+                   'count': len(bus_list),
+                   'ttl': ttl_timestamp
+               })
+           # 3. Remember what we wrote so an identical next poll can be skipped
            batch.put_item(Item={
-               'PK': f'BUS_HISTORY#{timestamp}',
-               'buses_binary': compressed_data,
-               'count': len(bus_list),
-               'ttl': ttl_timestamp
+               'PK': 'INGEST_STATE',
+               'header_timestamp': header_timestamp,
+               'digest': digest,
+               'updated_at': timestamp
            })
 
-       print(f"Updated live data and saved history for {len(bus_list)} buses.")
+       LAST_FEED.update({'header_timestamp': header_timestamp, 'digest': digest, 'buses': bus_list,
+                         'timestamp': timestamp, 'keyframe_ts': keyframe_ts})
+
+       if history_writer:
+           try:
+               history_writer.append(timestamp, history_frame)
+           except Exception as e:
+               # The next delta would point at a frame that was never stored, so start over with a keyframe
+               print(f"[ERROR] History append failed: {e}")
+               LAST_FEED['buses'] = None
+
+       if snapshot_store:
+           try:
+               publish_snapshot(snapshot_store, bus_list, timestamp, SNAPSHOT_POINTER_MAX_AGE)
+           except Exception as e:
+               # BUS_ALL is already written; readers fall back to it once the published snapshot goes stale
+               print(f"[ERROR] Snapshot publish failed: {e}")
+
+       POLL_STATS['written'] += 1
+
+       print(f"Updated live data and saved history for {len(bus_list)} buses. {POLL_STATS}")
        return len(bus_list)
    except Exception as e:
        print(f"Error: {e}")
        return 0
 
 def lambda_handler(event, context):
-    # Triggered by EventBridge Scheduler at rate(1 minute).
-    # Each invocation performs a single fetch; the scheduler handles the cadence.
-    count = fetch_and_save()
-    return {"status": "SUCCESS", "buses_updated": count}
+    # Triggered by EventBridge Scheduler at rate(1 minute). Polls run on fixed slots
+    # (start + n * interval) so a slow fetch doesn't push every later poll back.
+    started = time.monotonic()
+    polls, count = 0, 0
+    slot = 0
+    while True:
+        count = fetch_and_save()
+        polls += 1
+
+        elapsed = time.monotonic() - started
+        slot = max(slot + 1, int(elapsed // POLL_INTERVAL_SECONDS) + 1)
+        next_poll_at = slot * POLL_INTERVAL_SECONDS
+        if next_poll_at >= POLL_WINDOW_SECONDS: break
+
+        remaining = context.get_remaining_time_in_millis() / 1000 if context else 0
+        wait = next_poll_at - elapsed
+        if wait + FETCH_BUDGET_SECONDS > remaining: break
+        time.sleep(wait)
+
+    return {"status": "SUCCESS", "buses_updated": count, "polls": polls,
+            "polls_written": POLL_STATS['written'], "polls_skipped": POLL_STATS['skipped']}
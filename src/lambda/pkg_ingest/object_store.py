@@ -0,0 +1,57 @@
+"""
+Pluggable object store used for history partitions and published snapshots.
+
+S3Store is what runs on Lambda; LocalStore keeps the same keys under a local
+directory so tools and tests can run without AWS. open_store() picks one from
+the environment: <PREFIX>_BUCKET for S3, <PREFIX>_DIR for a local directory.
+
+Copies of this module ship in every package that needs it, kept identical by pkg_reader/test_shared_modules.py.
+"""
+import os
+
+
+class LocalStore:
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def put(self, key, data, content_type='application/octet-stream', cache_control=None):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f: f.write(data)
+        os.replace(tmp, path)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f: return f.read()
+        except FileNotFoundError:
+            return None
+
+
+class S3Store:
+    def __init__(self, bucket, client=None):
+        import boto3
+        self.bucket = bucket
+        self.client = client or boto3.client('s3')
+
+    def put(self, key, data, content_type='application/octet-stream', cache_control=None):
+        extra = {'CacheControl': cache_control} if cache_control else {}
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data, ContentType=content_type, **extra)
+
+    def get(self, key):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key)['Body'].read()
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+
+def open_store(prefix):
+    """Returns the store configured by <prefix>_BUCKET or <prefix>_DIR, or None if neither is set."""
+    bucket = os.environ.get(f"{prefix}_BUCKET")
+    if bucket: return S3Store(bucket)
+    directory = os.environ.get(f"{prefix}_DIR")
+    if directory: return LocalStore(directory)
+    return None
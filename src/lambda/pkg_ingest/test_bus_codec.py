@@ -0,0 +1,72 @@
+import unittest
+import gzip
+import json
+
+import bus_codec
+
+
+def bus(vid, lat, lon, bearing=90.0, seq=3, route='7', headsign='Conestoga Station', block='b1'):
+    return {'id': vid, 'lat': lat, 'lon': lon, 'bearing': bearing, 'trip_id': f"t{vid}", 'current_stop_sequence': seq,
+            'timestamp': 1767823200, 'route_id': route, 'headsign': headsign, 'block_id': block}
+
+
+# encode_buses([bus('2', ..., block=None), bus('1', ...)]) as written by the version 1 encoder
+V1_BLOB = ('4752420160d75e690200789ce364346234642a31622a3164363230643467cf8c28284a2d2e1674cecf4b2d2ec94f4f54082e492cc9cccf634a'
+           '3264606064606260666061606560636067f8ff9f8341c1d28941d9d789618356ebff4eddd6fff37b349435990199a71675')
+
+
+class TestBusCodec(unittest.TestCase):
+
+    def test_round_trip(self):
+        buses = [bus('1', 43.45123, -80.49271), bus('2', 43.4, -80.5, bearing=359.99, seq=41, route='201', headsign='iXpress')]
+        blob = bus_codec.encode_buses(buses, 1767823200)
+        self.assertTrue(bus_codec.is_columnar(blob))
+        self.assertEqual(bus_codec.decode_buses(blob), buses)
+        timestamp, columns = bus_codec.decode_columns(blob)
+        self.assertEqual((timestamp, columns['route_id']), (1767823200, ['7', '201']))
+        self.assertEqual(bus_codec.decode_buses(bus_codec.encode_buses([], 1767823200)), [])
+
+    def test_numeric_ids_and_row_order(self):
+        # Rows come back sorted by id; all-digit columns are stored as numbers, anything else through the string table
+        buses = [bus('20012', 43.5, -80.4, route='201'), bus('7', 43.45, -80.49, route='7'), bus('100', 43.4, -80.5, route=None)]
+        for b in buses: b['trip_id'] = b['id'] + '0'
+        blob = bus_codec.encode_buses(buses, 1767823200)
+        self.assertEqual(bus_codec.decode_buses(blob), [buses[1], buses[2], buses[0]])
+        self.assertEqual(blob[10] & 0b111, 0b111)  # id, trip_id and route_id are numeric
+        odd = [bus('0', 43.4, -80.5, route='007'), bus('12', 43.4, -80.5, route='7A')]
+        self.assertEqual(bus_codec.decode_buses(bus_codec.encode_buses(odd, 0))[1]['route_id'], '7A')
+        self.assertEqual(bus_codec.decode_columns(bus_codec.encode_buses(odd, 0))[1]['route_id'], ['007', '7A'])
+
+    def test_decodes_version_1(self):
+        blob = bytes.fromhex(V1_BLOB)
+        self.assertEqual(bus_codec.decode_columns(blob)[1]['id'], ['2', '1'])
+        self.assertEqual(bus_codec.decode_buses(blob)[0], bus('2', 43.4, -80.5, bearing=359.99, seq=41, route='201',
+                                                              headsign='iXpress', block=None))
+
+    def test_missing_fields_and_quantization(self):
+        raw = {'id': '3', 'lat': 43.123456, 'lon': -80.654321, 'bearing': 123.456, 'trip_id': None,
+               'current_stop_sequence': None, 'route_id': None, 'headsign': None}  # no block_id at all
+        # Positions keep 5 decimals, bearings 2; a missing stop sequence comes back as 0
+        decoded, = bus_codec.decode_buses(bus_codec.encode_buses([raw], 1767823200))
+        self.assertEqual(decoded, {'id': '3', 'lat': 43.12346, 'lon': -80.65432, 'bearing': 123.46, 'trip_id': None,
+                                   'current_stop_sequence': 0, 'timestamp': 1767823200, 'route_id': None,
+                                   'headsign': None, 'block_id': None})
+        second = bus_codec.decode_buses(bus_codec.encode_buses([dict(raw, bearing=None, id=None), dict(raw, bearing=360.0)], 0))
+        self.assertEqual([(b['id'], b['bearing']) for b in second], [(None, 0.0), ('3', 0.0)])
+
+    def test_decodes_legacy_gzip_json(self):
+        buses = [bus('1', 43.45, -80.49), bus('2', 43.4, -80.5, seq=None, block=None)]
+        legacy = gzip.compress(json.dumps(buses).encode('utf-8'))
+        self.assertFalse(bus_codec.is_columnar(legacy))
+        self.assertEqual(bus_codec.decode_buses(legacy), buses)
+        self.assertEqual(bus_codec.decode_buses(bytearray(legacy)), buses)
+
+    def test_rejects_malformed_snapshots(self):
+        blob = bus_codec.encode_buses([bus('1', 43.45, -80.49)], 1767823200)
+        with self.assertRaises(bus_codec.CodecError):
+            bus_codec.decode_columns(blob[:-4])
+        with self.assertRaises(bus_codec.CodecError):
+            bus_codec.decode_columns(blob[:3] + bytes([bus_codec.VERSION + 1]) + blob[4:])
+
+if __name__ == '__main__':
+    unittest.main()
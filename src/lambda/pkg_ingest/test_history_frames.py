@@ -0,0 +1,46 @@
+import unittest
+import gzip
+import json
+
+import history_frames
+
+
+def bus(vid, lat, seq=1, ts=100):
+    return {'id': vid, 'lat': lat, 'lon': -80.5, 'bearing': 90.0, 'trip_id': f"t{vid}", 'current_stop_sequence': seq,
+            'timestamp': ts, 'route_id': '7', 'headsign': 'Conestoga Station', 'block_id': None}
+
+
+class TestHistoryFrames(unittest.TestCase):
+
+    def test_reconstructs_every_frame_from_keyframe(self):
+        s100 = [bus('a', 43.1), bus('b', 43.2), bus('c', 43.3)]
+        s130 = [bus('a', 43.11, ts=130), bus('b', 43.2, ts=130), bus('c', 43.3, seq=2, ts=130)]
+        s160 = [bus('a', 43.11, ts=160), bus('c', 43.3, seq=2, ts=160), bus('d', 43.4, ts=160)]
+        frames = {
+            100: history_frames.encode_keyframe(s100, 100),
+            130: history_frames.encode_delta(s100, s130, 130, 100, 100),
+            160: history_frames.encode_delta(s130, s160, 160, 100, 130),
+        }
+        # The delta only carries what changed
+        self.assertEqual([b['id'] for b in history_frames.decode_frame(frames[130])[4]], ['a', 'c'])
+        kind, _, _, removed, upserts = history_frames.decode_frame(frames[160])
+        self.assertEqual((kind, removed, [b['id'] for b in upserts]), (history_frames.DELTA, ['b'], ['d']))
+
+        for ts, expected in ((100, s100), (130, s130), (160, s160)):
+            rebuilt = history_frames.reconstruct(ts, frames.get)
+            self.assertEqual(sorted(rebuilt, key=lambda b: b['id']), expected)
+
+    def test_duplicate_vehicle_ids_force_a_keyframe(self):
+        self.assertIsNone(history_frames.encode_delta([bus('a', 43.1)], [bus('a', 43.1), bus('a', 43.2)], 130, 100, 100))
+
+    def test_legacy_history_blob_is_a_keyframe(self):
+        legacy = gzip.compress(json.dumps([bus('a', 43.1)]).encode('utf-8'))
+        self.assertEqual(history_frames.reconstruct(100, {100: legacy}.get), [bus('a', 43.1)])
+
+    def test_missing_frame_raises(self):
+        frames = {130: history_frames.encode_delta([bus('a', 43.1)], [bus('a', 43.2, ts=130)], 130, 100, 100)}
+        with self.assertRaises(history_frames.FrameError):
+            history_frames.reconstruct(130, frames.get)
+
+if __name__ == '__main__':
+    unittest.main()
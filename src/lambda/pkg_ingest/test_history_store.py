@@ -0,0 +1,101 @@
+import unittest
+import tempfile
+import json
+
+import history_store
+from history_frames import encode_keyframe, encode_delta
+from object_store import LocalStore
+
+
+class CountingStore(LocalStore):
+    def __init__(self, root):
+        super().__init__(root)
+        self.gets = []
+        self.puts = []
+
+    def get(self, key):
+        self.gets.append(key)
+        return super().get(key)
+
+    def put(self, key, data, **kwargs):
+        self.puts.append((key, len(data)))
+        super().put(key, data, **kwargs)
+
+
+def fleet(ts, offset):
+    return [{'id': vid, 'lat': 43.4 + offset, 'lon': -80.5, 'bearing': 0.0, 'trip_id': 't' + vid, 'current_stop_sequence': 3,
+             'timestamp': ts, 'route_id': '7', 'headsign': 'Conestoga Station', 'block_id': None} for vid in ('a', 'b')]
+
+
+def write_polls(writer, start, end, step=30):
+    prev = None
+    for i, ts in enumerate(range(start, end, step)):
+        buses = fleet(ts, i / 1000)
+        if prev is None or ts // history_store.SEGMENT_SECONDS != prev[0] // history_store.SEGMENT_SECONDS:
+            frame, keyframe_ts = encode_keyframe(buses, ts), ts
+        else:
+            frame = encode_delta(prev[1], buses, ts, keyframe_ts, prev[0])
+        writer.append(ts, frame)
+        prev = (ts, buses)
+
+
+class TestHistoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = CountingStore(tempfile.mkdtemp())
+        # 2026-01-07 21:59:00 UTC to 22:01:00 UTC, crossing an hour boundary
+        self.start = 1767823140
+        write_polls(history_store.HistoryWriter(self.store), self.start, self.start + 150)
+
+    def test_segments_and_manifest(self):
+        manifest = history_store.load_manifest(self.store, self.start)
+        self.assertEqual(sorted(manifest['hours']), ['21', '22'])
+        self.assertEqual(manifest['hours']['21']['frames'], 2)
+        self.assertEqual(manifest['hours']['22']['frames'], 3)
+        self.assertEqual({m: s['frames'] for m, s in manifest['hours']['22']['segments'].items()}, {'00': 3})
+        self.assertEqual(history_store.segment_key(self.start + 90), 'history/2026/01/07/22/00.frames')
+
+    def test_poll_rewrites_only_its_segment(self):
+        store = CountingStore(tempfile.mkdtemp())
+        write_polls(history_store.HistoryWriter(store), self.start, self.start + 3600)
+        frames = {}
+        for key, size in store.puts:
+            if key.endswith('.frames'): frames[key] = frames.get(key, 0) + 1
+        # 120 polls land in 13 segment objects of at most 10 frames each, instead of one partition rewritten 120 times
+        self.assertEqual(sum(frames.values()), 120)
+        self.assertEqual(len(frames), 13)
+        self.assertLessEqual(max(frames.values()), history_store.SEGMENT_SECONDS // 30)
+        snapshots = history_store.query_snapshots(store, self.start + 1000, self.start + 1400)
+        self.assertEqual([s['timestamp'] for s in snapshots], list(range(self.start + 1020, self.start + 1401, 30)))
+        self.assertEqual(snapshots[-1]['buses'], fleet(self.start + 1380, 0.046))
+
+    def test_reads_hourly_partitions_written_before_segments(self):
+        store = CountingStore(tempfile.mkdtemp())
+        hour_ts = self.start + 60
+        legacy = [encode_keyframe(fleet(hour_ts, 0), hour_ts), encode_keyframe(fleet(hour_ts + 30, 0.001), hour_ts + 30)]
+        store.put(history_store.partition_key(hour_ts), b''.join(history_store._RECORD.pack(hour_ts + 30 * i, len(f)) + f for i, f in enumerate(legacy)))
+        store.put(history_store.manifest_key(hour_ts), json.dumps({'hours': {'22': {'first': hour_ts, 'last': hour_ts + 30, 'frames': 2, 'bytes': 0}}}).encode('utf-8'))
+        self.assertEqual(len(history_store.query_snapshots(store, hour_ts, hour_ts + 30)), 2)
+
+        # A writer deployed mid-hour adds segments to the same hour; both are read, in order
+        write_polls(history_store.HistoryWriter(store), hour_ts + 60, hour_ts + 150)
+        snapshots = history_store.query_snapshots(store, hour_ts, hour_ts + 150)
+        self.assertEqual([s['timestamp'] - hour_ts for s in snapshots], [0, 30, 60, 90, 120])
+        self.assertTrue(history_store.load_manifest(store, hour_ts)['hours']['22']['partition'])
+
+    def test_range_query_replays_deltas(self):
+        snapshots = history_store.query_snapshots(self.store, self.start + 30, self.start + 90)
+        self.assertEqual([s['timestamp'] for s in snapshots], [self.start + 30, self.start + 60, self.start + 90])
+        self.assertEqual(snapshots[-1]['buses'], fleet(self.start + 90, 0.003))
+
+    def test_query_touches_only_overlapping_partitions(self):
+        self.store.gets.clear()
+        history_store.query_snapshots(self.store, self.start + 90, self.start + 120)
+        self.assertEqual(self.store.gets, [history_store.manifest_key(self.start), history_store.segment_key(self.start + 90)])
+
+    def test_vehicle_track(self):
+        track = history_store.query_track(self.store, self.start, self.start + 120, 'b')
+        self.assertEqual([round(b['lat'], 3) for b in track], [43.4, 43.401, 43.402, 43.403, 43.404])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,252 @@
+import io
+import sys
+import unittest
+from contextlib import redirect_stdout
+from decimal import Decimal
+from unittest.mock import patch, MagicMock
+
+from google.transit import gtfs_realtime_pb2
+
+# Mock AWS; the fake table below stands in for GRT_Bus_State
+sys.modules['boto3'] = MagicMock()
+sys.modules['boto3.dynamodb'] = MagicMock()
+sys.modules['boto3.dynamodb.types'] = MagicMock()
+
+import os
+os.environ['DYNAMO_TABLE'] = 'TestTable'
+
+import lambda_function
+from bus_codec import decode_buses
+
+T0 = 1767823200  # on a history segment boundary
+
+
+def feed(header_timestamp, vehicles):
+    """VehiclePositions bytes for [(vehicle_id, lat, lon, trip_id, stop_sequence)]."""
+    message = gtfs_realtime_pb2.FeedMessage()
+    message.header.gtfs_realtime_version = "2.0"
+    message.header.timestamp = header_timestamp
+    for vehicle_id, lat, lon, trip_id, stop_sequence in vehicles:
+        v = message.entity.add(id=vehicle_id).vehicle
+        v.vehicle.id = vehicle_id
+        v.position.latitude, v.position.longitude, v.position.bearing = lat, lon, 90.0
+        v.trip.trip_id = trip_id
+        v.current_stop_sequence = stop_sequence
+    return message.SerializeToString()
+
+
+FLEET = [('2001', 43.45, -80.49, 't1', 2), ('2002', 43.46, -80.5, 't9', 5)]
+
+
+class FakeTable:
+    """Answers get_item, batch_get_item (low-level keys, plain values) and batch_writer puts."""
+
+    def __init__(self):
+        self.items = {}
+        self.requested = []  # PKs asked for by each batch_get_item call
+        self.puts = []
+
+    def get_item(self, Key, **kwargs):
+        return {'Item': dict(self.items[Key['PK']])} if Key['PK'] in self.items else {}
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        keys = [k['PK']['S'] for k in RequestItems['TestTable']['Keys']]
+        self.requested.append(sorted(keys))
+        return {'Responses': {'TestTable': [self.items[pk] for pk in keys if pk in self.items]}}
+
+    def batch_writer(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def put_item(self, Item):
+        self.items[Item['PK']] = Item
+        self.puts.append(Item['PK'])
+
+
+class IngestTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.table = FakeTable()
+        self.table.items.update({
+            'CONFIG#STATIC': {'PK': 'CONFIG#STATIC', 'loaded_version': 'v1'},
+            'TRIP#t1': {'PK': 'TRIP#t1', 'route_id': '7', 'headsign': 'Conestoga Station', 'block_id': 'b1'},
+        })
+        self.now = T0
+        lambda_function.dynamodb.meta.client = self.table
+        for name, value in (('table', self.table), ('deserializer', MagicMock(deserialize=lambda v: v)),
+                            ('TRIP_INDEX', {'version': None, 'checked_at': 0, 'trips': {}}), ('MISSING_UNTIL', {}),
+                            ('POLL_STATS', {'written': 0, 'skipped': 0}),
+                            ('LAST_FEED', {'loaded': False, 'header_timestamp': None, 'digest': None, 'buses': None,
+                                          'timestamp': None, 'keyframe_ts': None})):
+            patcher = patch.object(lambda_function, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch('time.time', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.session = MagicMock()
+        patcher = patch.object(lambda_function, 'session', self.session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def poll(self, header_timestamp, vehicles=FLEET):
+        """Runs one fetch_and_save against the given feed; returns the PKs it wrote."""
+        self.session.get.return_value = MagicMock(status_code=200, content=feed(header_timestamp, vehicles))
+        before = len(self.table.puts)
+        with redirect_stdout(io.StringIO()):
+            lambda_function.fetch_and_save()
+        return self.table.puts[before:]
+
+    def live_buses(self):
+        return {b['id']: b for b in decode_buses(self.table.items['BUS_ALL']['buses_binary'])}
+
+
+class TestEnrichment(IngestTestCase):
+
+    def test_buses_carry_trip_details(self):
+        self.assertIn('BUS_ALL', self.poll(T0))
+        buses = self.live_buses()
+        self.assertEqual({k: buses['2001'][k] for k in ('route_id', 'headsign', 'block_id', 'trip_id', 'current_stop_sequence')},
+                         {'route_id': '7', 'headsign': 'Conestoga Station', 'block_id': 'b1', 'trip_id': 't1', 'current_stop_sequence': 2})
+        # A trip the static tables don't know still goes out, just without details
+        self.assertEqual((buses['2002']['route_id'], buses['2002']['headsign'], buses['2002']['block_id']), (None, None, None))
+
+    def test_finished_static_load_resets_the_trip_index(self):
+        self.poll(T0)
+        self.table.items['TRIP#t1'] = dict(self.table.items['TRIP#t1'], headsign='Fairway Station')
+        self.now += 30
+        self.poll(T0 + 30, [('2001', 43.451, -80.49, 't1', 2)])
+        self.assertEqual(self.live_buses()['2001']['headsign'], 'Conestoga Station')  # cached until the version changes
+
+        self.table.items['CONFIG#STATIC']['loaded_version'] = 'v2'
+        self.now += lambda_function.TRIP_INDEX_CHECK_SECONDS
+        self.poll(T0 + 60, [('2001', 43.452, -80.49, 't1', 2)])
+        self.assertEqual(self.live_buses()['2001']['headsign'], 'Fairway Station')
+
+
+class TestChangeDetection(IngestTestCase):
+
+    def test_unchanged_feed_is_not_written(self):
+        self.assertEqual(self.poll(T0), ['BUS_ALL', f'BUS_HISTORY#{T0}', 'INGEST_STATE'])
+        self.now += 30
+        self.assertEqual(self.poll(T0), [])
+        self.assertEqual(lambda_function.POLL_STATS, {'written': 1, 'skipped': 1})
+
+        # Entity order doesn't matter, but a new header or a moved bus does
+        self.assertEqual(self.poll(T0, FLEET[::-1]), [])
+        self.assertIn('BUS_ALL', self.poll(T0 + 30))
+        self.assertIn('BUS_ALL', self.poll(T0 + 30, [FLEET[0], ('2002', 43.461, -80.5, 't9', 5)]))
+        self.assertEqual(lambda_function.POLL_STATS, {'written': 3, 'skipped': 2})
+
+    def test_ingest_state_survives_a_cold_start(self):
+        self.poll(T0)
+        state = self.table.items['INGEST_STATE']
+        self.assertEqual((state['header_timestamp'], state['updated_at']), (T0, T0))
+        # DynamoDB hands numbers back as Decimal
+        self.table.items['INGEST_STATE'] = dict(state, header_timestamp=Decimal(T0))
+
+        lambda_function.LAST_FEED.update(loaded=False, header_timestamp=None, digest=None, buses=None, timestamp=None, keyframe_ts=None)
+        self.now += 30
+        self.assertEqual(self.poll(T0), [])
+        self.assertEqual((lambda_function.LAST_FEED['header_timestamp'], lambda_function.LAST_FEED['digest']), (T0, state['digest']))
+
+        # Without a readable state item the poll is written
+        lambda_function.LAST_FEED.update(loaded=False, header_timestamp=None, digest=None)
+        with patch.object(self.table, 'get_item', side_effect=Exception('throttled')):
+            self.assertIn('BUS_ALL', self.poll(T0))
+
+
+class TestHistoryFrames(IngestTestCase):
+
+    def test_keyframes_start_every_segment_and_keyframe_interval(self):
+        frames = []
+        with patch.object(lambda_function, 'HISTORY_KEYFRAME_SECONDS', 120):
+            for offset in (0, 30, 120, 150, 240, 270, 300, 330):
+                self.now = T0 + offset
+                self.poll(T0 + offset, [('2001', 43.45 + offset / 1e5, -80.49, 't1', 2), FLEET[1]])
+                item = self.table.items[f"BUS_HISTORY#{T0 + offset}"]
+                frames.append((offset, item['frame'], item['keyframe'] - T0))
+        self.assertEqual(lambda_function.SEGMENT_SECONDS, 300)
+        # Keyframes every 120 s, and one at 300 s although the last is only 60 s old: a new segment starts there
+        self.assertEqual(frames, [(0, 'K', 0), (30, 'D', 0), (120, 'K', 120), (150, 'D', 120), (240, 'K', 240), (270, 'D', 240),
+                                  (300, 'K', 300), (330, 'D', 300)])
+
+
+class Clock:
+    """Stands in for time.monotonic / time.sleep and for a Lambda context with `timeout` seconds."""
+
+    def __init__(self, timeout):
+        self.now, self.timeout = 0.0, timeout
+
+    def monotonic(self):
+        return 1000.0 + self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def get_remaining_time_in_millis(self):
+        return (self.timeout - self.now) * 1000
+
+
+class TestPollLoop(unittest.TestCase):
+
+    def run_handler(self, fetch_seconds, interval=30, window=60, timeout=60):
+        """Runs the handler with fetches taking fetch_seconds (repeating the last); returns (result, poll start times)."""
+        clock, starts = Clock(timeout), []
+        def fetch():
+            starts.append(clock.now)
+            clock.now += fetch_seconds[min(len(starts), len(fetch_seconds)) - 1]
+            return 2
+        with patch.object(lambda_function, 'fetch_and_save', fetch), patch('time.monotonic', clock.monotonic), \
+                patch('time.sleep', clock.sleep), patch.object(lambda_function, 'POLL_INTERVAL_SECONDS', interval), \
+                patch.object(lambda_function, 'POLL_WINDOW_SECONDS', window):
+            result = lambda_function.lambda_handler({}, clock)
+        # Every poll starts on its slot, inside the window, with a full fetch budget before the timeout
+        for start in starts:
+            self.assertEqual(start % interval, 0)
+            self.assertLess(start, window)
+            self.assertLessEqual(start + lambda_function.FETCH_BUDGET_SECONDS, timeout)
+        self.assertEqual(result['polls'], len(starts))
+        return result, starts
+
+    def test_polls_on_fixed_slots_until_the_next_tick(self):
+        self.assertEqual(self.run_handler([1])[1], [0, 30])
+        # A slow fetch skips the slots it overran instead of pushing later polls back
+        self.assertEqual(self.run_handler([25, 1], interval=10)[1], [0, 30, 40])
+        self.assertEqual(self.run_handler([35])[1], [0])
+
+    def test_stops_when_a_fetch_no_longer_fits_before_the_timeout(self):
+        # Slot 50 is inside the window, but 50 s + FETCH_BUDGET_SECONDS would run past a 60 s timeout
+        self.assertEqual(self.run_handler([1], interval=10)[1], [0, 10, 20, 30, 40])
+        # Without a context there is no time to wait for a second poll
+        with patch.object(lambda_function, 'fetch_and_save', return_value=0):
+            self.assertEqual(lambda_function.lambda_handler({}, None)['polls'], 1)
+
+
+class TestMissingTrips(IngestTestCase):
+
+    def test_absent_trips_are_asked_for_again_after_the_retry_interval(self):
+        with redirect_stdout(io.StringIO()):
+            trips = lambda_function.refresh_trip_index(['t1', 't9'])
+        self.assertEqual(trips, {'t1': {'route_id': '7', 'headsign': 'Conestoga Station', 'block_id': 'b1'}})
+        self.assertEqual(self.table.requested, [['TRIP#t1', 'TRIP#t9']])
+
+        # Within the retry interval the absent trip costs no reads
+        self.now += lambda_function.MISSING_TRIP_RETRY_SECONDS - 1
+        lambda_function.refresh_trip_index(['t1', 't9'])
+        self.assertEqual(len(self.table.requested), 1)
+
+        # The static load has caught up since: the trip is read again and cached for good
+        self.table.items['TRIP#t9'] = {'PK': 'TRIP#t9', 'route_id': '201', 'headsign': 'iXpress', 'block_id': 'b9'}
+        self.now += 1
+        self.assertEqual(lambda_function.refresh_trip_index(['t1', 't9'])['t9']['route_id'], '201')
+        self.assertEqual(self.table.requested[1:], [['TRIP#t9']])
+        self.assertEqual(lambda_function.MISSING_UNTIL, {})
+
+if __name__ == '__main__':
+    unittest.main()
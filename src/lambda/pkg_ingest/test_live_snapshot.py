@@ -0,0 +1,55 @@
+import unittest
+import tempfile
+
+import live_snapshot
+from object_store import LocalStore
+
+
+class CountingStore(LocalStore):
+    def __init__(self, root):
+        super().__init__(root)
+        self.gets = []
+
+    def get(self, key):
+        self.gets.append(key)
+        return super().get(key)
+
+
+def fleet(ts, lat):
+    return [{'id': '2001', 'lat': lat, 'lon': -80.49, 'bearing': 90.0, 'trip_id': '100', 'current_stop_sequence': 2,
+             'timestamp': ts, 'route_id': '7', 'headsign': 'Conestoga Station', 'block_id': None}]
+
+
+class TestLiveSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.store = CountingStore(tempfile.mkdtemp())
+        self.t0 = 1767823200
+
+    def test_objects_are_content_addressed_and_pointer_follows(self):
+        first = live_snapshot.publish_snapshot(self.store, fleet(self.t0, 43.45), self.t0)
+        second = live_snapshot.publish_snapshot(self.store, fleet(self.t0 + 30, 43.46), self.t0 + 30)
+        self.assertNotEqual(first, second)
+        self.assertEqual(live_snapshot.publish_snapshot(self.store, fleet(self.t0 + 30, 43.46), self.t0 + 30), second)
+        self.assertEqual(live_snapshot.read_snapshot(self.store, first)['buses'][0]['lat'], 43.45)
+        self.assertEqual(live_snapshot.read_pointer(self.store), {'key': second, 'updated_at': self.t0 + 30, 'count': 1})
+
+    def test_follower_reads_pointer_only_when_a_poll_is_due(self):
+        follower = live_snapshot.LatestSnapshot(self.store, interval_seconds=30, recheck_seconds=2)
+        self.assertIsNone(follower.get(now=self.t0))
+        live_snapshot.publish_snapshot(self.store, fleet(self.t0, 43.45), self.t0)
+        self.assertIsNone(follower.get(now=self.t0 + 1))  # still inside the recheck window after the empty read
+        self.assertEqual(follower.get(now=self.t0 + 2)['updated_at'], self.t0)
+        for now in range(self.t0 + 3, self.t0 + 30):
+            follower.get(now=now)
+        self.assertEqual((follower.pointer_reads, follower.object_reads), (2, 1))
+
+        # The next poll is late: the pointer is rechecked every 2 s, and the object fetched once it moves
+        self.assertEqual(follower.get(now=self.t0 + 30)['updated_at'], self.t0)
+        self.assertEqual(follower.get(now=self.t0 + 31)['updated_at'], self.t0)
+        live_snapshot.publish_snapshot(self.store, fleet(self.t0 + 31, 43.46), self.t0 + 31)
+        self.assertEqual(follower.get(now=self.t0 + 32)['buses'][0]['lat'], 43.46)
+        self.assertEqual((follower.pointer_reads, follower.object_reads), (4, 2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import random
+
+from google.transit import gtfs_realtime_pb2
+
+import vehicle_decoder
+
+
+def reference_decode(data):
+    """The parse fetch_and_save used before the wire decoder, flattened to the same shape."""
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.ParseFromString(data)
+    vehicles = []
+    for entity in feed.entity:
+        if entity.HasField('vehicle'):
+            v = entity.vehicle
+            vehicles.append([v.vehicle.id, v.position.latitude, v.position.longitude, v.position.bearing,
+                             v.trip.trip_id, v.current_stop_sequence, v.timestamp])
+    return feed.header.timestamp, vehicles
+
+
+def make_feed(bus_count=300, seed=7):
+    """Builds a GRT-like feed, including the optional fields the decoder has to skip."""
+    rng = random.Random(seed)
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = "2.0"
+    feed.header.incrementality = gtfs_realtime_pb2.FeedHeader.FULL_DATASET
+    feed.header.timestamp = 1767823978
+    for i in range(bus_count):
+        entity = feed.entity.add()
+        entity.id = f"v{i}"
+        v = entity.vehicle
+        v.vehicle.id = str(20000 + i)
+        v.vehicle.label = f"Bus {i}"
+        v.position.latitude = 43.45 + rng.uniform(-0.1, 0.1)
+        v.position.longitude = -80.49 + rng.uniform(-0.1, 0.1)
+        v.position.bearing = rng.choice([0.0, 90.0, 181.5, 359.0])
+        v.position.speed = rng.uniform(0, 20)
+        v.trip.trip_id = str(rng.randint(1000000, 9999999))
+        v.trip.route_id = str(rng.randint(1, 200))
+        v.trip.start_date = "20260107"
+        v.current_stop_sequence = rng.randint(1, 80)
+        v.current_status = gtfs_realtime_pb2.VehiclePosition.IN_TRANSIT_TO
+        v.timestamp = 1767823900 + rng.randint(0, 60)
+        v.stop_id = str(rng.randint(1000, 4000))
+    return feed
+
+
+class TestVehicleDecoder(unittest.TestCase):
+
+    def assertSameAsReference(self, data):
+        self.assertEqual(vehicle_decoder.decode_vehicle_positions(data), reference_decode(data))
+
+    def test_full_fleet_matches_protobuf(self):
+        self.assertSameAsReference(make_feed().SerializeToString())
+
+    def test_missing_fields_use_defaults(self):
+        feed = gtfs_realtime_pb2.FeedMessage()
+        feed.header.gtfs_realtime_version = "2.0"
+        feed.entity.add(id="empty").vehicle.SetInParent()
+        feed.entity.add(id="no_trip").vehicle.vehicle.id = "42"
+        self.assertSameAsReference(feed.SerializeToString())
+
+    def test_non_vehicle_entities_are_skipped(self):
+        feed = make_feed(bus_count=3)
+        alert = feed.entity.add(id="alert").alert
+        alert.header_text.translation.add(text="Detour on King St")
+        feed.entity.add(id="tu").trip_update.trip.trip_id = "123"
+        self.assertSameAsReference(feed.SerializeToString())
+
+    def test_repeated_vehicle_fields_are_merged(self):
+        first = gtfs_realtime_pb2.FeedEntity(id="1")
+        first.vehicle.vehicle.id = "7"
+        first.vehicle.position.latitude = 43.4
+        second = gtfs_realtime_pb2.FeedEntity(id="1")
+        second.vehicle.position.longitude = -80.5
+        second.vehicle.trip.trip_id = "99"
+        # Concatenated messages merge, exactly like the protobuf runtime does
+        entity_bytes = first.SerializePartialToString() + second.SerializePartialToString()
+        data = b'\x12' + bytes([len(entity_bytes)]) + entity_bytes
+        self.assertSameAsReference(data)
+
+    def test_empty_feed(self):
+        self.assertEqual(vehicle_decoder.decode_vehicle_positions(b''), (0, []))
+
+    def test_truncated_feed_raises(self):
+        data = make_feed(bus_count=2).SerializeToString()
+        with self.assertRaises(vehicle_decoder.DecodeError):
+            vehicle_decoder.decode_vehicle_positions(data[:-3])
+
+if __name__ == '__main__':
+    unittest.main()
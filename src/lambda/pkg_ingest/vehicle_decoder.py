@@ -0,0 +1,182 @@
+"""
+Minimal GTFS-Realtime VehiclePosition decoder for the GRT_Ingest hot path.
+
+The vendored protobuf C extension is a macOS build, so on Lambda the generated
+gtfs_realtime_pb2 classes fall back to the pure-Python reflection decoder, which
+builds a full message tree for every entity. This module walks the wire format
+directly and pulls out only the fields fetch_and_save uses:
+
+    FeedMessage.header(1).timestamp(3)
+    FeedMessage.entity(2).vehicle(4)
+        .trip(1).trip_id(1)
+        .position(2).latitude(1) / longitude(2) / bearing(3)
+        .current_stop_sequence(3)
+        .timestamp(5)
+        .vehicle(8).id(1)
+
+Proto2 semantics are kept: missing fields decode to their defaults, repeated
+occurrences of a message field are merged, and unknown fields are skipped.
+"""
+import struct
+
+_unpack_float = struct.Struct('<f').unpack_from
+
+# Indexes into the per-vehicle state list
+VEHICLE_ID, LAT, LON, BEARING, TRIP_ID, STOP_SEQUENCE, TIMESTAMP = range(7)
+
+
+class DecodeError(ValueError):
+    pass
+
+
+def _varint(buf, pos):
+    b = buf[pos]
+    pos += 1
+    if b < 0x80: return b, pos
+    result = b & 0x7f
+    shift = 7
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7f) << shift
+        if b < 0x80: return result & 0xffffffffffffffff, pos
+        shift += 7
+        if shift >= 70: raise DecodeError("Varint too long")
+
+
+def _skip(buf, pos, wire_type):
+    if wire_type == 0:
+        while buf[pos] & 0x80: pos += 1
+        return pos + 1
+    if wire_type == 1: return pos + 8
+    if wire_type == 2:
+        length, pos = _varint(buf, pos)
+        return pos + length
+    if wire_type == 5: return pos + 4
+    raise DecodeError(f"Unsupported wire type {wire_type}")
+
+
+def _string(buf, pos, end):
+    if end > len(buf): raise DecodeError("Truncated string")
+    return buf[pos:end].decode('utf-8')
+
+
+def _parse_trip(buf, pos, end, state):
+    while pos < end:
+        key, pos = _varint(buf, pos)
+        if key == 0x0a:  # trip_id
+            length, pos = _varint(buf, pos)
+            state[TRIP_ID] = _string(buf, pos, pos + length)
+            pos += length
+        else:
+            pos = _skip(buf, pos, key & 7)
+
+
+def _parse_position(buf, pos, end, state):
+    while pos < end:
+        key, pos = _varint(buf, pos)
+        if key == 0x0d:  # latitude
+            state[LAT] = _unpack_float(buf, pos)[0]
+            pos += 4
+        elif key == 0x15:  # longitude
+            state[LON] = _unpack_float(buf, pos)[0]
+            pos += 4
+        elif key == 0x1d:  # bearing
+            state[BEARING] = _unpack_float(buf, pos)[0]
+            pos += 4
+        else:
+            pos = _skip(buf, pos, key & 7)
+
+
+def _parse_vehicle_descriptor(buf, pos, end, state):
+    while pos < end:
+        key, pos = _varint(buf, pos)
+        if key == 0x0a:  # id
+            length, pos = _varint(buf, pos)
+            state[VEHICLE_ID] = _string(buf, pos, pos + length)
+            pos += length
+        else:
+            pos = _skip(buf, pos, key & 7)
+
+
+def _parse_vehicle_position(buf, pos, end, state):
+    while pos < end:
+        key, pos = _varint(buf, pos)
+        if key == 0x0a:  # trip
+            length, pos = _varint(buf, pos)
+            _parse_trip(buf, pos, pos + length, state)
+            pos += length
+        elif key == 0x12:  # position
+            length, pos = _varint(buf, pos)
+            _parse_position(buf, pos, pos + length, state)
+            pos += length
+        elif key == 0x18:  # current_stop_sequence (uint32)
+            value, pos = _varint(buf, pos)
+            state[STOP_SEQUENCE] = value & 0xffffffff
+        elif key == 0x28:  # timestamp (uint64)
+            state[TIMESTAMP], pos = _varint(buf, pos)
+        elif key == 0x42:  # vehicle
+            length, pos = _varint(buf, pos)
+            _parse_vehicle_descriptor(buf, pos, pos + length, state)
+            pos += length
+        else:
+            pos = _skip(buf, pos, key & 7)
+    if pos != end: raise DecodeError("Field overran its VehiclePosition")
+
+
+def _parse_entity(buf, pos, end):
+    state = None
+    while pos < end:
+        key, pos = _varint(buf, pos)
+        if key == 0x22:  # vehicle
+            length, pos = _varint(buf, pos)
+            if state is None: state = ["", 0.0, 0.0, 0.0, "", 0, 0]
+            _parse_vehicle_position(buf, pos, pos + length, state)
+            pos += length
+        else:
+            pos = _skip(buf, pos, key & 7)
+    if pos != end: raise DecodeError("Field overran its FeedEntity")
+    return state
+
+
+def _parse_header_timestamp(buf, pos, end, timestamp):
+    while pos < end:
+        key, pos = _varint(buf, pos)
+        if key == 0x18:
+            timestamp, pos = _varint(buf, pos)
+        else:
+            pos = _skip(buf, pos, key & 7)
+    return timestamp
+
+
+def decode_vehicle_positions(data):
+    """
+    Decodes a serialized FeedMessage.
+
+    Returns (header_timestamp, vehicles) where each vehicle is a list indexed by
+    VEHICLE_ID, LAT, LON, BEARING, TRIP_ID, STOP_SEQUENCE and TIMESTAMP, in feed order.
+    Entities without a vehicle field are skipped. Raises DecodeError on malformed input.
+    """
+    buf = bytes(data)
+    end = len(buf)
+    pos = 0
+    header_timestamp = 0
+    vehicles = []
+    try:
+        while pos < end:
+            key, pos = _varint(buf, pos)
+            if key == 0x12:  # entity
+                length, pos = _varint(buf, pos)
+                state = _parse_entity(buf, pos, pos + length)
+                if state is not None: vehicles.append(state)
+                pos += length
+            elif key == 0x0a:  # header
+                length, pos = _varint(buf, pos)
+                header_timestamp = _parse_header_timestamp(buf, pos, pos + length, header_timestamp)
+                pos += length
+            else:
+                pos = _skip(buf, pos, key & 7)
+    except (IndexError, struct.error, UnicodeDecodeError) as e:
+        raise DecodeError(f"Malformed feed: {e}") from e
+    if pos != end: raise DecodeError("Truncated feed")
+    return header_timestamp, vehicles
@@ -0,0 +1,37 @@
+"""
+Stop -> upcoming live arrivals, projected by GRT_Reader for ?arrivals=<stop_id>.
+
+The vehicles that can reach a stop come from its TripIndex (stop_index); each
+one's remaining stops (from its trip's TRIP_STOP_TIMES#, starting at
+current_stop_sequence) are inverted into
+
+    {stop_id: [[vehicle_id, route_id, headsign, arrival_time, stops_away], ...]}
+
+sorted by scheduled arrival ('HH:MM:SS', hours may exceed 23, so the strings
+sort in time order). stops_away is 0 for the stop the vehicle is at or heading to.
+
+Nothing here is stored: stops_away moves every time a bus passes a stop, so a
+materialized copy would be rewritten on nearly every poll
+(tools/bench_arrivals_index.py).
+"""
+
+
+def compact_stop_times(stop_times):
+    """TRIP_STOP_TIMES# StopTimes -> [(stop_sequence, stop_id, arrival_time)] in stop_sequence order."""
+    return sorted((int(e['stop_sequence']), str(e['stop_id']), e['arrival_time']) for e in stop_times if e.get('arrival_time'))
+
+
+def project_arrivals(buses, trip_stops):
+    """buses: enriched vehicles; trip_stops: trip_id -> compact_stop_times(). Returns the stop -> arrivals map."""
+    arrivals = {}
+    for bus in buses:
+        stops = trip_stops.get(bus.get('trip_id'))
+        if not stops: continue
+        current = int(bus.get('current_stop_sequence') or 0)
+        away = 0
+        for seq, stop_id, arrival_time in stops:
+            if seq < current: continue
+            arrivals.setdefault(stop_id, []).append([bus['id'], bus.get('route_id'), bus.get('headsign'), arrival_time, away])
+            away += 1
+    for entries in arrivals.values(): entries.sort(key=lambda e: (e[3], e[0]))
+    return arrivals
@@ -0,0 +1,84 @@
+"""
+Retrying, parallel BatchGetItem for one table.
+
+Keys go out in chunks of 100 (the BatchGetItem limit), concurrently on the
+caller's thread pool when there is more than one chunk. Whatever DynamoDB hands
+back in UnprocessedKeys, or a whole chunk that was throttled, is requested again
+after a jittered exponential backoff until it's all read or the deadline
+passes; keys still unread then are returned to the caller instead of being
+dropped silently.
+
+Works on the low-level client (thread-safe, unlike resources), so keys are in
+attribute-value form ({'PK': {'S': ...}}) and items come back undeserialized.
+
+Copies of this module ship in pkg_reader and pkg_ingest, kept identical by pkg_reader/test_shared_modules.py.
+"""
+import random, threading, time
+
+MAX_KEYS = 100
+RETRYABLE_ERRORS = {'ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded',
+                    'InternalServerError', 'ServiceUnavailable'}
+
+
+class BatchGetStats:
+    def __init__(self):
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.consumed_rcu = 0.0
+        self.unprocessed = 0
+        self._lock = threading.Lock()
+
+    def record(self, response):
+        with self._lock:
+            self.calls += 1
+            self.consumed_rcu += sum(float(c.get('CapacityUnits', 0)) for c in response.get('ConsumedCapacity') or [])
+
+    def as_dict(self):
+        return {'calls': self.calls, 'retries': self.retries, 'throttled': self.throttled,
+                'consumed_rcu': round(self.consumed_rcu, 2), 'unprocessed': self.unprocessed}
+
+
+def _error_code(error):
+    return getattr(error, 'response', {}).get('Error', {}).get('Code')
+
+
+def _get_chunk(client, table_name, keys, request_extra, deadline, stats, on_response, base_delay, max_delay):
+    items, attempt = [], 0
+    while keys:
+        try:
+            response = client.batch_get_item(RequestItems={table_name: dict(request_extra, Keys=keys)}, ReturnConsumedCapacity='TOTAL')
+        except Exception as e:
+            if _error_code(e) not in RETRYABLE_ERRORS: raise
+            with stats._lock: stats.throttled += 1
+        else:
+            stats.record(response)
+            if on_response: on_response(response)
+            items.extend(response.get('Responses', {}).get(table_name, []))
+            keys = response.get('UnprocessedKeys', {}).get(table_name, {}).get('Keys', [])
+            if not keys: break
+        # Full jitter: sleep anywhere up to the exponential step, but never past the deadline
+        delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+        if time.monotonic() + delay >= deadline: break
+        time.sleep(delay)
+        attempt += 1
+        with stats._lock: stats.retries += 1
+    return items, keys
+
+
+def batch_get(client, table_name, keys, projection=None, executor=None, deadline_seconds=1.0, on_response=None,
+              base_delay=0.025, max_delay=0.5):
+    """Reads every key. Returns (raw items, keys left unread at the deadline, BatchGetStats)."""
+    stats = BatchGetStats()
+    if not keys: return [], [], stats
+    request_extra = {'ProjectionExpression': projection} if projection else {}
+    deadline = time.monotonic() + deadline_seconds
+    chunks = [keys[i:i + MAX_KEYS] for i in range(0, len(keys), MAX_KEYS)]
+    get = lambda chunk: _get_chunk(client, table_name, chunk, request_extra, deadline, stats, on_response, base_delay, max_delay)
+    results = executor.map(get, chunks) if executor and len(chunks) > 1 else map(get, chunks)
+    items, unprocessed = [], []
+    for chunk_items, chunk_unprocessed in results:
+        items.extend(chunk_items)
+        unprocessed.extend(chunk_unprocessed)
+    stats.unprocessed = len(unprocessed)
+    return items, unprocessed, stats
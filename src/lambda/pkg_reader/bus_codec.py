@@ -0,0 +1,208 @@
+"""
+Compact columnar encoding for the BUS_ALL / BUS_HISTORY vehicle snapshots.
+
+Layout (little-endian, version 2):
+
+    header    b'GRB' + version byte, uint32 snapshot timestamp, uint16 vehicle count,
+              uint8 numeric-column mask, int32 lat/lon base (degrees * 1e5)
+    body      zlib stream of
+      ints      one int32 per vehicle for each column, byte-shuffled (every first byte, then every second, ...)
+                  id, trip_id, route_id, headsign, block_id   number + 1 when the column's mask bit is set
+                                                              (all canonical decimal ids), else string index + 1;
+                                                              0 = None; id is delta-coded
+                  lat, lon                                    fixed point (degrees * 1e5) minus the header base
+                  bearing                                     degrees * 100
+                  current_stop_sequence
+      strings   varint count, then the NUL-separated UTF-8 strings
+
+Vehicles are written sorted by id, so the id column is a run of small deltas, and the
+shuffle groups the mostly-zero high bytes of every column for zlib. Every vehicle in a
+snapshot shares the poll timestamp, so it lives in the header instead of on each record.
+Version 1 snapshots and legacy gzip-compressed JSON are still decoded.
+
+Copies of this module ship in pkg_ingest and pkg_reader, kept identical by pkg_reader/test_shared_modules.py.
+"""
+import sys, json, gzip, struct, zlib
+from array import array
+from itertools import accumulate
+
+MAGIC = b'GRB'
+VERSION = 2
+_HEADER = struct.Struct('<4sIHBii')
+_HEADER_V1 = struct.Struct('<4sIH')
+_NONE = 0xFFFF
+_COORD_SCALE = 100000
+_BEARING_SCALE = 100
+_STRING_COLUMNS = ('id', 'trip_id', 'route_id', 'headsign', 'block_id')
+_INT_COLUMNS = _STRING_COLUMNS + ('lat', 'lon', 'bearing', 'current_stop_sequence')
+_MAX_NUMERIC = 2 ** 30
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+class CodecError(ValueError):
+    pass
+
+
+def _write_varint(out, value):
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(buf, pos):
+    result = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7f) << shift
+        if b < 0x80: return result, pos
+        shift += 7
+
+
+def _pack(typecode, values):
+    arr = array(typecode, values)
+    if not _LITTLE_ENDIAN: arr.byteswap()
+    return arr.tobytes()
+
+
+def _unpack(typecode, buf, pos, count):
+    arr = array(typecode)
+    end = pos + arr.itemsize * count
+    arr.frombytes(buf[pos:end])
+    if not _LITTLE_ENDIAN: arr.byteswap()
+    return arr, end
+
+
+def is_columnar(blob):
+    return bytes(blob[:3]) == MAGIC
+
+
+def _is_numeric(value):
+    return value.isdigit() and value.isascii() and (value == '0' or value[0] != '0') and int(value) < _MAX_NUMERIC
+
+
+def _sort_key(bus):
+    vid = bus.get('id')
+    return (0, 0, '') if vid is None else (1, len(str(vid)), str(vid))
+
+
+def encode_buses(buses, timestamp):
+    """Encodes a list of bus dicts (as written by GRT_Ingest) into the columnar format."""
+    buses = sorted(buses, key=_sort_key)
+    strings, string_index = [], {}
+    def intern(value):
+        idx = string_index.get(value)
+        if idx is None:
+            if '\0' in value: raise CodecError("Strings may not contain NUL")
+            idx = string_index[value] = len(strings) + 1
+            strings.append(value)
+        return idx
+
+    ints, mask = [], 0
+    for bit, col in enumerate(_STRING_COLUMNS):
+        values = [None if b.get(col) is None else str(b.get(col)) for b in buses]
+        if all(v is None or _is_numeric(v) for v in values):
+            mask |= 1 << bit
+            column = [0 if v is None else int(v) + 1 for v in values]
+        else:
+            column = [0 if v is None else intern(v) for v in values]
+        if col == 'id': column = [v - p for v, p in zip(column, [0] + column)]
+        ints += column
+    lat = [round(float(b['lat']) * _COORD_SCALE) for b in buses]
+    lon = [round(float(b['lon']) * _COORD_SCALE) for b in buses]
+    lat_base, lon_base = min(lat, default=0), min(lon, default=0)
+    ints += [v - lat_base for v in lat]
+    ints += [v - lon_base for v in lon]
+    ints += [round(float(b.get('bearing') or 0) * _BEARING_SCALE) % (360 * _BEARING_SCALE) for b in buses]
+    ints += [int(b.get('current_stop_sequence') or 0) for b in buses]
+
+    packed = _pack('i', ints)
+    out = bytearray(b''.join(packed[i::4] for i in range(4)))
+    _write_varint(out, len(strings))
+    out += b'\0'.join(value.encode('utf-8') for value in strings)
+    header = _HEADER.pack(MAGIC + bytes([VERSION]), int(timestamp), len(buses), mask, lat_base, lon_base)
+    return header + zlib.compress(bytes(out), 6)
+
+
+def decode_columns(blob):
+    """Decodes a columnar snapshot into (timestamp, {column name: list of values})."""
+    blob = bytes(blob)
+    try:
+        magic = blob[:4]
+        if magic[:3] != MAGIC: raise CodecError("Not a columnar bus snapshot")
+        if magic[3] == 1: return _decode_v1(blob)
+        if magic[3] != VERSION: raise CodecError(f"Unsupported snapshot version {magic[3]}")
+        _, timestamp, count, mask, lat_base, lon_base = _HEADER.unpack_from(blob, 0)
+        buf = zlib.decompress(blob[_HEADER.size:])
+        size = 4 * count * len(_INT_COLUMNS)
+        if len(buf) < size: raise CodecError("Snapshot length mismatch")
+        packed = bytearray(size)
+        for i in range(4):
+            packed[i::4] = buf[i * size // 4:(i + 1) * size // 4]
+        ints, _ = _unpack('i', packed, 0, count * len(_INT_COLUMNS))
+        n_strings, pos = _read_varint(buf, size)
+        strings = [None] + (buf[pos:].decode('utf-8').split('\0') if n_strings else [])
+        if len(strings) != n_strings + 1: raise CodecError("Snapshot string count mismatch")
+
+        raw = {col: ints[i * count:(i + 1) * count] for i, col in enumerate(_INT_COLUMNS)}
+        raw['id'] = accumulate(raw['id'])
+        columns = {}
+        for bit, col in enumerate(_STRING_COLUMNS):
+            if mask & (1 << bit):
+                columns[col] = [str(v - 1) if v else None for v in raw[col]]
+            else:
+                columns[col] = [strings[v] for v in raw[col]]
+        columns['lat'] = [(v + lat_base) / _COORD_SCALE for v in raw['lat']]
+        columns['lon'] = [(v + lon_base) / _COORD_SCALE for v in raw['lon']]
+        columns['bearing'] = [v / _BEARING_SCALE for v in raw['bearing']]
+        columns['current_stop_sequence'] = list(raw['current_stop_sequence'])
+    except (IndexError, struct.error, zlib.error, UnicodeDecodeError) as e:
+        raise CodecError(f"Malformed snapshot: {e}") from e
+    return timestamp, columns
+
+
+def _decode_v1(blob):
+    """Version 1: uint16 string indices, plain int32 coordinates, varint stop sequences."""
+    magic, timestamp, count = _HEADER_V1.unpack_from(blob, 0)
+    buf = zlib.decompress(blob[_HEADER_V1.size:])
+    pos = 0
+    n_strings, pos = _read_varint(buf, pos)
+    strings = []
+    for _ in range(n_strings):
+        length, pos = _read_varint(buf, pos)
+        strings.append(buf[pos:pos + length].decode('utf-8'))
+        pos += length
+    strings.append(None)
+    none_index = len(strings) - 1
+
+    columns = {}
+    for col in _STRING_COLUMNS:
+        idx, pos = _unpack('H', buf, pos, count)
+        columns[col] = [strings[none_index if i == _NONE else i] for i in idx]
+    lat, pos = _unpack('i', buf, pos, count)
+    lon, pos = _unpack('i', buf, pos, count)
+    bearing, pos = _unpack('H', buf, pos, count)
+    columns['lat'] = [v / _COORD_SCALE for v in lat]
+    columns['lon'] = [v / _COORD_SCALE for v in lon]
+    columns['bearing'] = [v / _BEARING_SCALE for v in bearing]
+    seq = []
+    for _ in range(count):
+        value, pos = _read_varint(buf, pos)
+        seq.append(value)
+    columns['current_stop_sequence'] = seq
+    if pos != len(buf) or len(columns['lat']) != count: raise CodecError("Snapshot length mismatch")
+    return timestamp, columns
+
+
+def decode_buses(blob):
+    """Decodes either format into the list of bus dicts GRT_Ingest produced."""
+    if not is_columnar(blob):
+        return json.loads(gzip.decompress(bytes(blob)).decode('utf-8'))
+    timestamp, c = decode_columns(blob)
+    return [
+        {'id': i, 'lat': la, 'lon': lo, 'bearing': be, 'trip_id': t, 'current_stop_sequence': sq,
+         'timestamp': timestamp, 'route_id': r, 'headsign': h, 'block_id': bl}
+        for i, la, lo, be, t, sq, r, h, bl in zip(c['id'], c['lat'], c['lon'], c['bearing'], c['trip_id'],
+                                                  c['current_stop_sequence'], c['route_id'], c['headsign'], c['block_id'])
+    ]
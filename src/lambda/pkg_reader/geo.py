@@ -0,0 +1,53 @@
+"""
+Metre distances and a uniform grid index over live vehicle positions.
+
+GRT_Reader builds one GridIndex per BUS_ALL snapshot (keyed by updated_at) and
+reuses it across requests in a warm container, so "which buses are within R
+metres of this stop" only looks at the handful of cells around the stop.
+Distances use the equirectangular approximation, which is well under a metre
+off at the few-hundred-metre radii used here.
+"""
+from math import cos, radians, sqrt, floor, ceil
+from collections import defaultdict
+
+EARTH_RADIUS_M = 6371008.8
+METRES_PER_DEGREE = radians(1) * EARTH_RADIUS_M
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    x = radians(lon2 - lon1) * cos(radians((lat1 + lat2) / 2))
+    y = radians(lat2 - lat1)
+    return EARTH_RADIUS_M * sqrt(x * x + y * y)
+
+
+class GridIndex:
+    def __init__(self, points, cell_m=250, ref_lat=43.45):
+        """points: [(lat, lon)] (entries that aren't numbers are left out); cells are about cell_m metres square around ref_lat."""
+        self.lat_step = cell_m / METRES_PER_DEGREE
+        self.lon_step = cell_m / (METRES_PER_DEGREE * cos(radians(ref_lat)))
+        self.cells = defaultdict(list)
+        for i, (lat, lon) in enumerate(points):
+            try:
+                lat, lon = float(lat), float(lon)
+            except (TypeError, ValueError):
+                continue
+            self.cells[(floor(lat / self.lat_step), floor(lon / self.lon_step))].append((i, lat, lon))
+
+    def within(self, lat, lon, radius_m):
+        """[(distance in metres, point index)] for points within radius_m of (lat, lon), nearest first."""
+        row, col = floor(lat / self.lat_step), floor(lon / self.lon_step)
+        rows = ceil(radius_m / (self.lat_step * METRES_PER_DEGREE))
+        # Columns narrow towards the poles; past the point where the window outgrows the grid, visit the filled cells instead
+        cols = radius_m / (self.lon_step * METRES_PER_DEGREE * max(cos(radians(lat)), 1e-9))
+        if (2 * rows + 1) * (2 * cols + 1) > len(self.cells):
+            keys = [(r, c) for r, c in self.cells if abs(r - row) <= rows]
+        else:
+            cols = ceil(cols)
+            keys = [(r, c) for r in range(row - rows, row + rows + 1) for c in range(col - cols, col + cols + 1)]
+        found = []
+        for key in keys:
+            for i, p_lat, p_lon in self.cells.get(key, ()):
+                d = distance_m(lat, lon, p_lat, p_lon)
+                if d <= radius_m: found.append((d, i))
+        found.sort()
+        return found
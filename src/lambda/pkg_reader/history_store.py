@@ -0,0 +1,144 @@
+"""
+Time-partitioned vehicle history on top of an object store.
+
+    history/YYYY/MM/DD/HH/MM.frames     one segment per SEGMENT_SECONDS, named by its first minute:
+                                        records of uint32 timestamp, uint32 length, history frame
+    history/YYYY/MM/DD/manifest.json    {"hours": {"HH": {"first", "last", "frames", "bytes",
+                                                          "segments": {"MM": {"first", "last", "frames", "bytes"}}}}}
+
+GRT_Ingest appends each poll's frame to the current segment (rewriting the
+object, which S3 requires) and starts every segment with a keyframe, so a
+segment replays on its own. A poll rewrites at most SEGMENT_SECONDS of frames
+rather than everything the hour has accumulated. Range queries read one
+manifest per day and then only the segments that overlap the range. There is a
+single writer: the scheduled GRT_Ingest invocation.
+
+Hours written before segments existed are one history/YYYY/MM/DD/HH.frames
+partition; their manifest entries have no "segments" (or "partition": true if
+segments were added to the hour later) and are still read.
+
+Copies of this module ship in pkg_ingest and pkg_reader, kept identical by pkg_reader/test_shared_modules.py.
+"""
+import json, struct, time
+from itertools import islice
+from history_frames import decode_frame, apply_frame
+
+PREFIX = 'history'
+SEGMENT_SECONDS = 300
+_RECORD = struct.Struct('<II')
+
+
+def _day_path(ts):
+    return time.strftime(f"{PREFIX}/%Y/%m/%d", time.gmtime(ts))
+
+
+def partition_key(ts):
+    return f"{_day_path(ts)}/{time.gmtime(ts).tm_hour:02d}.frames"
+
+
+def segment_key(ts):
+    t = time.gmtime(ts - ts % SEGMENT_SECONDS)
+    return f"{_day_path(ts)}/{t.tm_hour:02d}/{t.tm_min:02d}.frames"
+
+
+def manifest_key(ts):
+    return f"{_day_path(ts)}/manifest.json"
+
+
+def load_manifest(store, ts):
+    blob = store.get(manifest_key(ts))
+    return json.loads(blob) if blob else {'hours': {}}
+
+
+def read_partition(blob):
+    """Yields (timestamp, frame_blob) for every record in a partition."""
+    pos, end = 0, len(blob)
+    while pos + _RECORD.size <= end:
+        ts, length = _RECORD.unpack_from(blob, pos)
+        pos += _RECORD.size
+        yield ts, blob[pos:pos + length]
+        pos += length
+
+
+def _count(entry, ts, size):
+    entry['last'] = ts
+    entry['frames'] += 1
+    entry['bytes'] = entry.get('bytes', 0) + size
+
+
+class HistoryWriter:
+    def __init__(self, store):
+        self.store = store
+        self.segment = None
+        self.buffer = bytearray()
+        self.day = None
+        self.manifest = None
+
+    def _open_segment(self, ts):
+        # On a cold start mid-segment, keep appending to what an earlier container wrote
+        self.buffer = bytearray(self.store.get(segment_key(ts)) or b'')
+        day = _day_path(ts)
+        if day != self.day:
+            self.manifest = load_manifest(self.store, ts)
+            self.day = day
+        self.segment = ts // SEGMENT_SECONDS
+
+    def append(self, ts, frame):
+        if ts // SEGMENT_SECONDS != self.segment: self._open_segment(ts)
+        record = _RECORD.pack(ts, len(frame)) + frame
+        self.buffer += record
+        self.store.put(segment_key(ts), bytes(self.buffer))
+
+        hour = self.manifest['hours'].setdefault(f"{time.gmtime(ts).tm_hour:02d}", {'first': ts, 'frames': 0, 'segments': {}})
+        if 'segments' not in hour: hour.update(segments={}, partition=True)
+        minute = f"{time.gmtime(ts - ts % SEGMENT_SECONDS).tm_min:02d}"
+        _count(hour, ts, len(record))
+        _count(hour['segments'].setdefault(minute, {'first': ts, 'frames': 0}), ts, len(record))
+        self.store.put(manifest_key(ts), json.dumps(self.manifest).encode('utf-8'), content_type='application/json')
+
+
+def _overlaps(entry, start_ts, end_ts):
+    return entry['last'] >= start_ts and entry['first'] <= end_ts
+
+
+def _blob_keys(entry, hour_ts, start_ts, end_ts):
+    """The objects holding an hour's frames in the range, in time order."""
+    keys = []
+    if 'segments' not in entry or entry.get('partition'): keys.append(partition_key(hour_ts))
+    for minute, segment in sorted(entry.get('segments', {}).items()):
+        if _overlaps(segment, start_ts, end_ts): keys.append(segment_key(hour_ts + int(minute) * 60))
+    return keys
+
+
+def iter_snapshots(store, start_ts, end_ts):
+    """Yields (timestamp, buses) for every stored poll with start_ts <= timestamp <= end_ts."""
+    manifests = {}
+    for hour in range(start_ts // 3600, end_ts // 3600 + 1):
+        hour_ts = hour * 3600
+        day = _day_path(hour_ts)
+        if day not in manifests: manifests[day] = load_manifest(store, hour_ts)
+        entry = manifests[day]['hours'].get(f"{time.gmtime(hour_ts).tm_hour:02d}")
+        if not entry or not _overlaps(entry, start_ts, end_ts): continue
+
+        for key in _blob_keys(entry, hour_ts, start_ts, end_ts):
+            blob = store.get(key)
+            if not blob: continue
+            fleet = {}
+            for ts, frame in read_partition(blob):
+                if ts > end_ts: break
+                fleet = apply_frame(fleet, decode_frame(frame), ts)
+                if ts >= start_ts: yield ts, [dict(b) for b in fleet.values()]
+
+
+def query_snapshots(store, start_ts, end_ts, limit=None):
+    """The range's snapshots oldest first, at most `limit` of them."""
+    return [{'timestamp': ts, 'buses': buses} for ts, buses in islice(iter_snapshots(store, start_ts, end_ts), limit)]
+
+
+def query_track(store, start_ts, end_ts, vehicle_id):
+    """One vehicle's positions between two timestamps."""
+    track = []
+    for ts, buses in iter_snapshots(store, start_ts, end_ts):
+        bus = next((b for b in buses if b['id'] == vehicle_id), None)
+        if bus: track.append(bus)
+    return track
@@ -1,174 +1,527 @@
-import json, boto3, os, gzip, time
+import boto3, math, os, time, zlib
 from datetime import datetime, timedelta
-from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.types import TypeDeserializer
+from bus_codec import decode_buses
+from history_store import query_snapshots, query_track
+from object_store import open_store
+from live_snapshot import LatestSnapshot
+from batch_get import batch_get
+from metrics import RequestMetrics, DEBUG, EMIT_METRICS
+from response_format import parse_fields, shape_stop_body, dumps, compress_response
+from arrivals_index import compact_stop_times, project_arrivals
+from static_cache import StaticCache, ABSENT
+from geo import GridIndex
+from stop_index import decode_trip_index, lookup_trip, time_to_seconds, seconds_to_time, decode_schedule_index, schedule_index_from_list, next_departures, DAY, decode_stops_index
 
 DYNAMO_TABLE = os.environ['DYNAMO_TABLE']
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table(DYNAMO_TABLE)
 
-# --- Helper Functions ---
+# Static items survive across requests in a warm container until CONFIG#STATIC.loaded_version changes
+static_cache = StaticCache(int(os.environ.get('STATIC_CACHE_MAX_ITEMS', '2048')), int(os.environ.get('STATIC_VERSION_CHECK_SECONDS', '60')))
+
+# batch_get_item chunks of 100 run concurrently; the low-level client is thread-safe, resources aren't.
+# UnprocessedKeys are retried with backoff until BATCH_GET_DEADLINE_SECONDS (the function times out at 3 s).
+BATCH_GET_WORKERS = int(os.environ.get('BATCH_GET_WORKERS', '4'))
+BATCH_GET_DEADLINE_SECONDS = float(os.environ.get('BATCH_GET_DEADLINE_SECONDS', '1.0'))
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_GET_WORKERS)
+deserializer = TypeDeserializer()
+
+# Decoded BUS_ALL buses and a grid over their positions, rebuilt only when the snapshot's updated_at changes
+LIVE_SNAPSHOT = {'updated_at': None, 'buses': None, 'grid': None}
+HYBRID_RADIUS_METERS = float(os.environ.get('HYBRID_RADIUS_METERS', '500'))
+
+# ?lat=&lon= nearest-stop queries
+NEARBY_DEFAULT_RADIUS_METERS = 500
+NEARBY_MAX_RADIUS_METERS = float(os.environ.get('NEARBY_MAX_RADIUS_METERS', '2000'))
+NEARBY_MAX_RESULTS = int(os.environ.get('NEARBY_MAX_RESULTS', '25'))
+
+# Stop responses stay fresh until the next ingest poll is due, so CloudFront serves one origin response per
+# snapshot to every rider watching the stop
+INGEST_INTERVAL_SECONDS = int(os.environ.get('INGEST_INTERVAL_SECONDS', '30'))
+STATIC_RESPONSE_MAX_AGE = int(os.environ.get('STATIC_RESPONSE_MAX_AGE', '3600'))
+
+# ?stop_ids=a,b,c answers several stops from one snapshot decode and shared batch rounds
+MAX_STOPS_PER_REQUEST = int(os.environ.get('MAX_STOPS_PER_REQUEST', '5'))
+
+# ?arrivals=<stop_id> is projected from the stop's TripIndex, the live snapshot and the matched trips'
+# TRIP_STOP_TIMES# (all static and warm-cached); a snapshot older than ARRIVALS_STALE_SECONDS means no arrivals
+ARRIVALS_STALE_SECONDS = int(os.environ.get('ARRIVALS_STALE_SECONDS', '600'))
+
+history_store = open_store('HISTORY')
+
+# Phase timings and DynamoDB calls of the request being served; replaced at the start of every invocation
+request_metrics = RequestMetrics()
+COLD_START = {'value': True}
+
+# With SNAPSHOT_BUCKET set, live buses come from GRT_Ingest's published live/latest.json instead of BUS_ALL,
+# so a warm request with its static items cached makes no DynamoDB reads at all. BUS_ALL stays the fallback
+# when nothing is published or the published snapshot is older than SNAPSHOT_STALE_SECONDS.
+snapshot_store = open_store('SNAPSHOT')
+published_snapshot = LatestSnapshot(snapshot_store, INGEST_INTERVAL_SECONDS, int(os.environ.get('SNAPSHOT_RECHECK_SECONDS', '2'))) if snapshot_store else None
+SNAPSHOT_STALE_SECONDS = int(os.environ.get('SNAPSHOT_STALE_SECONDS', str(3 * INGEST_INTERVAL_SECONDS)))
+# A snapshot of ~300 buses is ~70 KB of JSON, so history responses are bounded twice to stay under Lambda's
+# 6 MB response limit and the 3 s timeout: a range of at most HISTORY_MAX_RANGE_SECONDS, and at most
+# HISTORY_MAX_SNAPSHOTS snapshots per response, with next_from pointing at where the next page starts.
+# At 30 s polls a full range is 31 snapshots, one page.
+HISTORY_MAX_RANGE_SECONDS = int(os.environ.get('HISTORY_MAX_RANGE_SECONDS', '900'))
+HISTORY_MAX_SNAPSHOTS = int(os.environ.get('HISTORY_MAX_SNAPSHOTS', '32'))
 
-def decimal_default(obj):
-    if isinstance(obj, Decimal): return int(obj)
-    raise TypeError
+# --- Helper Functions ---
 
-def response_proxy(code, body):
+def response_proxy(code, body, cache_control="no-cache", etag=None):
+   headers = {"Content-Type": "application/json", "Cache-Control": cache_control}
+   if etag: headers["ETag"] = etag
+   with request_metrics.phase('Serialization'):
+       body = dumps(body)
    return {
        "statusCode": code,
-       "headers": {"Content-Type": "application/json", "Cache-Control": "no-cache"},
-       "body": json.dumps(body, default=decimal_default)
+       "headers": headers,
+       "body": body
    }
 
+def not_modified(etag, cache_control):
+    return {"statusCode": 304, "headers": {"ETag": etag, "Cache-Control": cache_control}, "body": ""}
+
+def snapshot_etag(updated_at, now=None):
+    """Changes with the BUS_ALL snapshot, the static dataset version, and the minute (offline schedules move with the clock)."""
+    version = zlib.crc32(str(static_cache.version).encode('utf-8'))
+    return f'"{int(updated_at or 0)}-{version:08x}-{int(now or time.time()) // 60}"'
+
+def snapshot_cache_control(updated_at, now=None):
+    """Fresh until the next ingest poll is due, then servable stale for one more interval while CloudFront revalidates."""
+    age = (now or time.time()) - float(updated_at) if updated_at else 0
+    max_age = max(1, int(INGEST_INTERVAL_SECONDS - age % INGEST_INTERVAL_SECONDS))
+    return f"public, max-age={max_age}, stale-while-revalidate={INGEST_INTERVAL_SECONDS}"
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match: return False
+    # Gzipped responses carry the same tag with a -gz suffix
+    tags = [t.strip().replace('-gz"', '"') for t in if_none_match.split(',')]
+    return '*' in tags or etag in tags or f"W/{etag}" in tags
+
 def batch_get_trip_details(keys):
     trip_details = {}
     if not keys: return trip_details
-    unique_keys = list({(k['PK']): k for k in keys}.values()) # Deduplicate keys
-    
-    for i in range(0, len(unique_keys), 100):
-        chunk = unique_keys[i:i + 100]
-        request_items = {DYNAMO_TABLE: {'Keys': chunk, 'ProjectionExpression': 'PK, headsign, route_id'}}
-        try:
-            response = dynamodb.batch_get_item(RequestItems=request_items)
-            for item in response.get('Responses', {}).get(DYNAMO_TABLE, []):
-                trip_id = item['PK'].split('#')[1]
-                trip_details[trip_id] = {'headsign': item.get('headsign'), 'route_id': item.get('route_id')}
-        except Exception as e:
-            print(f"[ERROR] Batch get failed: {e}")
-            
+    trip_pks = list(dict.fromkeys(k['PK'] for k in keys)) # Deduplicate keys
+    try:
+        for item in batch_get_raw([{'PK': {'S': pk}} for pk in trip_pks], 'PK, headsign, route_id')[0]:
+            item = {k: deserializer.deserialize(v) for k, v in item.items()}
+            trip_id = item['PK'].split('#')[1]
+            trip_details[trip_id] = {'headsign': item.get('headsign'), 'route_id': item.get('route_id')}
+    except Exception as e:
+        print(f"[ERROR] Batch get failed: {e}")
     return trip_details
 
-def get_schedule_for_bus(trip_id, target_stop_id, current_sequence):
-    if not trip_id: return None, None, None
-    response = table.get_item(Key={'PK': f"TRIP_STOP_TIMES#{trip_id}"})
-    item = response.get('Item')
-    if not item or 'StopTimes' not in item: return None, None, None
-    stop_times = item['StopTimes']
-    
-    target_arrival, target_seq, next_stop_name = None, None, None
+def batch_get_raw(keys, projection=None):
+    """batch_get with the reader's pool and deadline; retries and leftovers are reported in the request's metrics."""
+    items, unprocessed, stats = batch_get(dynamodb.meta.client, DYNAMO_TABLE, keys, projection, batch_executor,
+                                          BATCH_GET_DEADLINE_SECONDS, request_metrics.dynamo)
+    request_metrics.batch(stats)
+    if stats.unprocessed: print(f"[WARN] {stats.unprocessed} keys still unprocessed at the batch get deadline: {stats.as_dict()}")
+    return items, unprocessed
+
+def batch_get_items(pks):
+    """One parallel, retrying batch_get_item pass over any number of keys. Returns (PK -> item, set of PKs still unread)."""
+    raw_items, unprocessed = batch_get_raw([{'PK': {'S': pk}} for pk in dict.fromkeys(pks)])
+    items = {}
+    for raw in raw_items:
+        item = {k: deserializer.deserialize(v) for k, v in raw.items()}
+        items[item['PK']] = item
+    return items, {k['PK']['S'] for k in unprocessed}
+
+def get_static_items(pks):
+    """Static items by PK from the warm cache, with every miss fetched in a single parallel round."""
+    result, missing = {}, []
+    for pk in dict.fromkeys(pks):
+        cached = static_cache.get(pk)
+        if cached is None: missing.append(pk)
+        elif cached is not ABSENT: result[pk] = cached
+    if missing:
+        fetched, unprocessed = batch_get_items(missing)
+        for pk in missing:
+            if pk not in unprocessed: static_cache.put(pk, fetched.get(pk))
+        result.update(fetched)
+    return result
+
+def get_core_items(static_pks, live_pks=('BUS_ALL',)):
+    """Fetches the live items (BUS_ALL) plus whichever static items aren't in the warm cache, in one batch_get_item."""
+    check_version = static_cache.version_due()
+    to_fetch = list(live_pks) + (['CONFIG#STATIC'] if check_version else [])
+    item_map = {}
+    for pk in static_pks:
+        cached = static_cache.get(pk)
+        if cached is None: to_fetch.append(pk)
+        elif cached is not ABSENT: item_map[pk] = cached
+
+    fetched, unprocessed = batch_get_items(to_fetch)
+    if check_version and 'CONFIG#STATIC' not in unprocessed:
+        version = fetched.get('CONFIG#STATIC', {}).get('loaded_version', "")
+        stale = [pk for pk in static_pks if pk not in to_fetch]
+        if static_cache.set_version(version) and stale:
+            # Static data was re-ingested since these were cached; read them again
+            print(f"Static version changed to {version}. Refetching {len(stale)} cached items.")
+            refetched, more_unprocessed = batch_get_items(stale)
+            fetched.update(refetched)
+            unprocessed |= more_unprocessed
+            to_fetch += stale
+            for pk in stale: item_map.pop(pk, None)
+
+    for pk in static_pks:
+        if pk in to_fetch and pk not in unprocessed:
+            static_cache.put(pk, fetched.get(pk))
+        if pk in fetched: item_map[pk] = fetched[pk]
+    for pk in live_pks:
+        if pk in fetched: item_map[pk] = fetched[pk]
+    return item_map
+
+def next_stop_after(stop_times, current_sequence):
+    current_seq_val = int(current_sequence) if current_sequence else 0
+    return next((entry['stop_id'] for entry in stop_times if entry['stop_sequence'] > current_seq_val), None)
+
+def match_stop_times(stop_times, target_stop_id, current_sequence):
+    """Returns (arrival at target stop, its stop_sequence, id of the next stop) for a bus on this trip."""
+    target_arrival, target_seq = None, None
     current_seq_val = int(current_sequence) if current_sequence else 0
     
     for entry in stop_times:
         if str(entry['stop_id']) == str(target_stop_id) and current_seq_val <= entry['stop_sequence']:
-            target_arrival, target_seq = entry['arrival_time'], entry['stop_sequence']
+            target_arrival, target_seq = entry['arrival_time'], int(entry['stop_sequence'])
             break 
+    return target_arrival, target_seq, next_stop_after(stop_times, current_sequence)
 
-    for entry in stop_times:
-        if entry['stop_sequence'] > current_seq_val:
-            stop_resp = table.get_item(Key={'PK': f"STOP#{entry['stop_id']}"})
-            if 'Item' in stop_resp: next_stop_name = stop_resp['Item'].get('name')
-            break
-    return target_arrival, target_seq, next_stop_name
+def cached_index(key, build):
+    """A stop's lookup index, decoded once and kept in the warm cache alongside the item it came from."""
+    cached = static_cache.get(key)
+    if cached is not None: return None if cached is ABSENT else cached
+    index = build()
+    static_cache.put(key, index)
+    return index
 
-# --- Main Handler ---
+def get_trip_index(stop_id, stop_routes):
+    """The stop's TripIndex. None for STOP_ROUTES items written before it existed."""
+    blob = (stop_routes or {}).get('TripIndex')
+    return cached_index(f"TRIP_INDEX#{stop_id}", lambda: decode_trip_index(blob.value) if blob else None)
 
-def lambda_handler(event, context):
+def get_schedule_index(stop_id, stop_schedule):
+    """(route_id, headsign) -> sorted departure seconds for the stop, from ScheduleIndex or a legacy Schedule list."""
+    stop_schedule = stop_schedule or {}
+    blob = stop_schedule.get('ScheduleIndex')
+    return cached_index(f"SCHEDULE_INDEX#{stop_id}",
+                        lambda: decode_schedule_index(blob.value) if blob else schedule_index_from_list(stop_schedule.get('Schedule', [])))
+
+def get_stops_index(stops_item):
+    """All stops as parallel columns plus a GridIndex over them, or None until the static ingest has built STOP_INDEX."""
+    blob = (stops_item or {}).get('Index')
+    def build():
+        if not blob: return None
+        stops = decode_stops_index(blob.value)
+        stops['grid'] = GridIndex(list(zip(stops['lat'], stops['lon'])))
+        return stops
+    return cached_index('STOP_INDEX#decoded', build)
+
+def get_published_buses():
+    """The published snapshot ({'updated_at', 'buses'}) if it's fresh enough to use in place of BUS_ALL, else None."""
+    if not published_snapshot: return None
     try:
-        params = event.get('queryStringParameters') or {}
-        stop_id = params.get('stop_id')
-        if not stop_id: return response_proxy(400, {"error": "Missing stop_id"})
-        print(f"--- REQUEST START: stop_id={stop_id} ---")
-
-        est_now = datetime.utcnow() - timedelta(hours=5)
-        current_time_str = est_now.strftime('%H:%M:%S')
-
-        # 1. Batch Fetch Core Data
-        core_data_keys = [
-            {'PK': f"STOP#{stop_id}"}, {'PK': f"STOP_ROUTES#{stop_id}"},
-            {'PK': f"STOP_SCHEDULE#{stop_id}"}, {'PK': 'BUS_ALL'}
-        ]
-        response = dynamodb.batch_get_item(RequestItems={DYNAMO_TABLE: {'Keys': core_data_keys}})
-        item_map = {item['PK']: item for item in response.get('Responses', {}).get(DYNAMO_TABLE, [])}
-        
-        stop_data = item_map.get(f"STOP#{stop_id}")
-        if not stop_data: return response_proxy(404, {"error": "Stop not found"})
-        
-        allowed_routes = {(r['route_id'], r['headsign']) for r in item_map.get(f"STOP_ROUTES#{stop_id}", {}).get('Routes', [])}
-        print(f"Allowed routes for Stop {stop_id}: {allowed_routes}")
-        
-        full_schedule = item_map.get(f"STOP_SCHEDULE#{stop_id}", {}).get('Schedule', [])
-        bus_item = item_map.get('BUS_ALL')
-        buses = json.loads(gzip.decompress(bus_item['buses_binary'].value).decode('utf-8')) if bus_item and 'buses_binary' in bus_item else []
-        print(f"Found {len(buses)} total live buses in BUS_ALL.")
-
-        # 2. Batch Enrich All Live Buses
-        if buses:
-            trip_keys = [{'PK': f"TRIP#{b.get('trip_id')}"} for b in buses if b.get('trip_id')]
-            trip_details_map = batch_get_trip_details(trip_keys)
-            for bus in buses:
-                bus.update(trip_details_map.get(bus.get('trip_id'), {}))
-                
-        # 3. Filter Buses: Direct Matches vs. Ignored (for Hybrid check)
-        final_buses, ignored_buses, live_route_keys = [], [], set()
+        snapshot = published_snapshot.get()
+    except Exception as e:
+        print(f"[WARN] Could not read published snapshot: {e}")
+        return None
+    if snapshot and time.time() - snapshot['updated_at'] <= SNAPSHOT_STALE_SECONDS: return snapshot
+    return None
+
+def get_live_buses(bus_item):
+    """Per-request copies of the snapshot's buses, plus the snapshot's GridIndex (point i is buses[i]).
+    bus_item is the BUS_ALL item or a published snapshot, which already carries decoded buses."""
+    updated_at = bus_item.get('updated_at') if bus_item else None
+    if LIVE_SNAPSHOT['buses'] is None or LIVE_SNAPSHOT['updated_at'] != updated_at:
+        if bus_item and 'buses' in bus_item: buses = bus_item['buses']
+        else: buses = decode_buses(bus_item['buses_binary'].value) if bus_item and 'buses_binary' in bus_item else []
+        LIVE_SNAPSHOT.update(updated_at=updated_at, buses=buses, grid=GridIndex([(b.get('lat'), b.get('lon')) for b in buses]))
+    return [dict(b) for b in LIVE_SNAPSHOT['buses']], LIVE_SNAPSHOT['grid']
+
+def history_response(params):
+    """GET ?history_from=<ts>&history_to=<ts>[&vehicle_id=<id>] -> snapshots (plus next_from when there are
+    more in the range), or one vehicle's track."""
+    if not history_store: return response_proxy(503, {"error": "History store not configured"})
+    try:
+        start_ts, end_ts = int(params['history_from']), int(params.get('history_to') or time.time())
+    except ValueError:
+        return response_proxy(400, {"error": "history_from and history_to must be unix timestamps"})
+    if end_ts < start_ts or end_ts - start_ts > HISTORY_MAX_RANGE_SECONDS:
+        return response_proxy(400, {"error": f"History range must be between 0 and {HISTORY_MAX_RANGE_SECONDS} seconds"})
+
+    # Ranges that ended before the latest poll can't change any more
+    cache_control = f"public, max-age={STATIC_RESPONSE_MAX_AGE}" if end_ts < time.time() - 2 * INGEST_INTERVAL_SECONDS else "no-cache"
+    vehicle_id = params.get('vehicle_id')
+    if vehicle_id:
+        return response_proxy(200, {"vehicle_id": vehicle_id, "track": query_track(history_store, start_ts, end_ts, vehicle_id)}, cache_control)
+    snapshots = query_snapshots(history_store, start_ts, end_ts, HISTORY_MAX_SNAPSHOTS + 1)
+    body = {"snapshots": snapshots[:HISTORY_MAX_SNAPSHOTS]}
+    if len(snapshots) > HISTORY_MAX_SNAPSHOTS: body["next_from"] = snapshots[HISTORY_MAX_SNAPSHOTS]['timestamp']
+    return response_proxy(200, body, cache_control)
+
+def arrivals_response(stop_id, if_none_match=None):
+    """Live vehicles heading to the stop, soonest scheduled arrival first. Only buses on trips in the stop's
+    TripIndex are projected, so stop times are read (or found warm) for those trips alone."""
+    with request_metrics.phase('CoreBatchGet'):
+        published = get_published_buses()
+        item_map = get_core_items([f"STOP_ROUTES#{stop_id}"], () if published else ('BUS_ALL',))
+    stop_routes = item_map.get(f"STOP_ROUTES#{stop_id}")
+    if not stop_routes: return response_proxy(404, {"error": "Stop not found"})
+    trip_index = get_trip_index(stop_id, stop_routes)
+    if trip_index is None: return response_proxy(503, {"error": "Trip index not built for this stop yet"})
+
+    bus_item = published or item_map.get('BUS_ALL')
+    updated_at = int(bus_item['updated_at']) if bus_item else 0
+    etag, cache_control = snapshot_etag(updated_at), snapshot_cache_control(updated_at)
+    if etag_matches(if_none_match, etag): return not_modified(etag, cache_control)
+
+    entries = []
+    if time.time() - updated_at <= ARRIVALS_STALE_SECONDS:
+        with request_metrics.phase('SnapshotDecode'):
+            buses = [b for b in get_live_buses(bus_item)[0]
+                     if lookup_trip(trip_index, b.get('trip_id'), b.get('current_stop_sequence'))[0] is not None]
+        with request_metrics.phase('StopTimesBatchGet'):
+            stop_times = get_static_items([f"TRIP_STOP_TIMES#{b['trip_id']}" for b in buses])
+        with request_metrics.phase('ScheduleMatching'):
+            trip_stops = {pk.split('#', 1)[1]: compact_stop_times(item.get('StopTimes', [])) for pk, item in stop_times.items()}
+            entries = project_arrivals(buses, trip_stops).get(stop_id, [])
+    arrivals = [{"vehicle_id": vehicle_id, "route_id": route_id, "headsign": headsign,
+                 "scheduled_arrival": seconds_to_time(time_to_seconds(arrival_time) % DAY), "stops_away": stops_away}
+                for vehicle_id, route_id, headsign, arrival_time, stops_away in entries]
+    return response_proxy(200, {"stop_id": stop_id, "updated_at": updated_at, "arrivals": arrivals}, cache_control, etag)
+
+def nearby_stops_response(params):
+    """GET ?lat=&lon=[&radius=<metres>][&k=<count>] -> the k nearest stops within radius, with their route ids."""
+    try:
+        lat, lon = float(params['lat']), float(params['lon'])
+        radius = float(params.get('radius') or NEARBY_DEFAULT_RADIUS_METERS)
+        k = int(params.get('k') or 10)
+    except (KeyError, ValueError):
+        lat = None
+    # float() accepts 'nan' and 'inf'; nan fails every comparison, so the range checks alone would let it through
+    if lat is None or not all(math.isfinite(v) for v in (lat, lon, radius)) or not (-90 <= lat <= 90 and -180 <= lon <= 180) \
+            or radius <= 0 or k <= 0:
+        return response_proxy(400, {"error": "lat must be within ±90 and lon within ±180 degrees, radius and k positive numbers"})
+    radius, k = min(radius, NEARBY_MAX_RADIUS_METERS), min(k, NEARBY_MAX_RESULTS)
+
+    stops = get_stops_index(get_core_items(['STOP_INDEX'], live_pks=()).get('STOP_INDEX'))
+    if stops is None: return response_proxy(503, {"error": "Stop index not built yet"})
+    return response_proxy(200, {"stops": [
+        {"id": stops['ids'][i], "name": stops['names'][i], "lat": stops['lat'][i], "lon": stops['lon'][i],
+         "distance_m": round(distance), "routes": stops['routes'][i]}
+        for distance, i in stops['grid'].within(lat, lon, radius)[:k]
+    ]}, f"public, max-age={STATIC_RESPONSE_MAX_AGE}")
+
+def prepare_stop(stop_id, item_map, buses, grid):
+    """First pass for one stop: route keys, direct matches from its TripIndex and the TRIP_STOP_TIMES# keys it needs.
+
+    buses are this stop's own copies (matching annotates them), index-aligned with grid. None if the stop doesn't exist.
+    """
+    stop_data = item_map.get(f"STOP#{stop_id}")
+    if not stop_data: return None
+    
+    allowed_routes = {(r['route_id'], r['headsign']) for r in item_map.get(f"STOP_ROUTES#{stop_id}", {}).get('Routes', [])}
+    if DEBUG: print(f"Allowed routes for Stop {stop_id}: {allowed_routes}")
+
+    # Direct matches come from the stop's TripIndex (trip_id -> visits) with a dict lookup, so stop times
+    # are only read for the buses that can end up in the response
+    allowed_route_ids = {r_id for r_id, _ in allowed_routes}
+    stop_lat = float(stop_data.get('lat', 0))
+    stop_lon = float(stop_data.get('lon', 0))
+    nearby = [(distance, buses[i]) for distance, i in grid.within(stop_lat, stop_lon, HYBRID_RADIUS_METERS)]  # nearest first
+    trip_index = get_trip_index(stop_id, item_map.get(f"STOP_ROUTES#{stop_id}"))
+    direct_matches = {}  # id(bus) -> (scheduled arrival, target stop_sequence)
+    if trip_index is not None:
         for bus in buses:
+            if (bus.get('route_id'), bus.get('headsign')) in allowed_routes:
+                target_seq, arrival = lookup_trip(trip_index, bus.get('trip_id'), bus.get('current_stop_sequence'))
+                if target_seq is not None: direct_matches[id(bus)] = (seconds_to_time(arrival), target_seq)
+        candidates = [b for b in buses if id(b) in direct_matches] + [b for _, b in nearby if b.get('route_id') in allowed_route_ids]
+    else:
+        candidates = [b for b in buses if b.get('route_id') in allowed_route_ids]
+
+    return {
+        'stop_id': stop_id, 'stop_data': stop_data, 'allowed_routes': allowed_routes, 'buses': buses, 'nearby': nearby,
+        'trip_index': trip_index, 'direct_matches': direct_matches,
+        'schedule_index': get_schedule_index(stop_id, item_map.get(f"STOP_SCHEDULE#{stop_id}")),
+        'candidate_pks': [f"TRIP_STOP_TIMES#{b['trip_id']}" for b in candidates if b.get('trip_id')],
+    }
+
+def finish_stop(stop, trip_stop_times, now_secs, pending_names):
+    """Second pass for one stop: direct and hybrid matches plus offline schedules. Appends (bus, next stop id) to
+    pending_names; the caller resolves every stop's names in one round."""
+    stop_id, allowed_routes, trip_index, direct_matches = stop['stop_id'], stop['allowed_routes'], stop['trip_index'], stop['direct_matches']
+
+    # Filter Buses: Direct Matches vs. Ignored (for Hybrid check)
+    with request_metrics.phase('ScheduleMatching'):
+        final_buses, ignored_buses, live_route_keys = [], [], set()
+        for bus in stop['buses']:
             bus_route_key = (bus.get('route_id'), bus.get('headsign'))
             if bus_route_key in allowed_routes:
-                sched_time, target_seq, next_stop_name = get_schedule_for_bus(bus.get('trip_id'), stop_id, bus.get('current_stop_sequence'))
+                stop_times = trip_stop_times.get(bus.get('trip_id'), [])
+                if trip_index is not None:
+                    sched_time, target_seq = direct_matches.get(id(bus), (None, None))
+                    next_stop_id = next_stop_after(stop_times, bus.get('current_stop_sequence'))
+                else:
+                    sched_time, target_seq, next_stop_id = match_stop_times(stop_times, stop_id, bus.get('current_stop_sequence'))
                 if target_seq is not None:
-                    bus.update({'next_scheduled_arrival': sched_time or "N/A", 'next_stop_name': next_stop_name, 'target_stop_sequence': target_seq})
+                    bus.update({'next_scheduled_arrival': sched_time or "N/A", 'next_stop_name': None, 'target_stop_sequence': target_seq})
+                    pending_names.append((bus, next_stop_id))
                     final_buses.append(bus)
                     live_route_keys.add(bus_route_key)
                 else: ignored_buses.append(bus)
             else: ignored_buses.append(bus)
-        
+    
+    if DEBUG:
         print(f"Final buses (direct matches after filter): {len(final_buses)}")
         print(f"Ignored buses (for hybrid check): {len(ignored_buses)}")
-        if ignored_buses:
-            print(f"First few ignored buses:")
-            for i, b in enumerate(ignored_buses[:5]):
-                print(f"  - ID: {b.get('id')}, Route: {b.get('route_id')}, Headsign: {b.get('headsign')}")
+        for b in ignored_buses[:5]:
+            print(f"  - ID: {b.get('id')}, Route: {b.get('route_id')}, Headsign: {b.get('headsign')}")
 
-        # 4. Universal Hybrid Logic & Offline Schedules
+    # Universal Hybrid Logic & Offline Schedules
+    with request_metrics.phase('HybridMatching'):
         offline_schedules = []
-        stop_lat = float(stop_data.get('lat', 0))
-        stop_lon = float(stop_data.get('lon', 0))
+        ignored_ids = {id(b) for b in ignored_buses}
 
         for r_id, r_headsign in allowed_routes:
             if (r_id, r_headsign) not in live_route_keys:
-                next_departure = next((e for e in full_schedule if e['r'] == r_id and e['h'] == r_headsign and e['t'] > current_time_str), None) \
-                                 or next((e for e in full_schedule if e['r'] == r_id and e['h'] == r_headsign), None)
-                
+                next_departure = next_departures(stop['schedule_index'].get((r_id, r_headsign), []), now_secs)
+
                 if next_departure:
-                    next_departure_time = next_departure['t']
+                    next_departure_time = seconds_to_time(next_departure[0] % DAY)
                     found_incoming = False
                     # Hybrid match: same route_id AND is physically close
                     # Removed restrictive headsign match for universal application
-                    for bus in ignored_buses:
-                        if bus.get('route_id') == r_id: 
-                            try:
-                                # Check proximity (simple Euclidean distance for quick check)
-                                bus_lat = float(bus.get('lat', 0))
-                                bus_lon = float(bus.get('lon', 0))
-                                distance = ((bus_lat - stop_lat)**2 + (bus_lon - stop_lon)**2)**0.5
-                                # Assuming 0.005 degrees is approx 500m (adjust as needed for GRT area)
-                                if distance < 0.005: 
-                                    print(f"    HYBRID MATCH FOUND (proximity): Bus {bus.get('id')} (Route {bus.get('route_id')} {bus.get('headsign')}) for target ({r_id}, {r_headsign})") 
-                                    hybrid_bus = bus.copy()
-                                    hybrid_bus.update({'headsign': r_headsign, 'next_scheduled_arrival': next_departure_time, 'target_stop_sequence': 0})
-                                    _, _, next_stop_name = get_schedule_for_bus(hybrid_bus.get('trip_id'), None, hybrid_bus.get('current_stop_sequence'))
-                                    hybrid_bus['next_stop_name'] = next_stop_name
-                                    final_buses.append(hybrid_bus)
-                                    live_route_keys.add((r_id, r_headsign)) 
-                                    found_incoming = True
-                                    break
-                            except Exception as dist_err:
-                                print(f"    Error calculating distance for hybrid check: {dist_err}")
-                    
+                    for distance, bus in stop['nearby']:
+                        if bus.get('route_id') == r_id and id(bus) in ignored_ids:
+                            if DEBUG: print(f"    HYBRID MATCH FOUND (proximity): Bus {bus.get('id')} (Route {bus.get('route_id')} {bus.get('headsign')}) {distance:.0f} m from stop for target ({r_id}, {r_headsign})") 
+                            hybrid_bus = bus.copy()
+                            hybrid_bus.update({'headsign': r_headsign, 'next_scheduled_arrival': next_departure_time, 'target_stop_sequence': 0})
+                            next_stop_id = next_stop_after(trip_stop_times.get(hybrid_bus.get('trip_id'), []), hybrid_bus.get('current_stop_sequence'))
+                            hybrid_bus['next_stop_name'] = None
+                            pending_names.append((hybrid_bus, next_stop_id))
+                            final_buses.append(hybrid_bus)
+                            live_route_keys.add((r_id, r_headsign)) 
+                            found_incoming = True
+                            break
+
                     if not found_incoming:
-                        print(f"    No hybrid match for ({r_id}, {r_headsign}). Adding to offline schedules.")
-                        time_str = next_departure_time
-                        h, m, s = map(int, time_str.split(':'))
-                        if h >= 24: time_str = f"{h-24:02d}:{m:02d}:{s:02d}"
-                        offline_schedules.append({"route_id": r_id, "headsign": r_headsign, "next_scheduled_arrival": time_str})
-
-        print(f"--- REQUEST END: Returning {len(final_buses)} live buses, {len(offline_schedules)} offline schedules ---")
-        return response_proxy(200, {
-            "stop_details": {"id": stop_id, "lat": stop_data.get('lat'), "lon": stop_data.get('lon'), "name": stop_data.get('name')},
-            "nearby_buses": final_buses,
-            "offline_schedules": offline_schedules,
-            "all_routes": [list(r) for r in allowed_routes]
-        })
+                        if DEBUG: print(f"    No hybrid match for ({r_id}, {r_headsign}). Adding to offline schedules.")
+                        offline_schedules.append({"route_id": r_id, "headsign": r_headsign, "next_scheduled_arrival": next_departure_time})
+
+    stop_data = stop['stop_data']
+    if DEBUG: print(f"Stop {stop_id}: {len(final_buses)} live buses, {len(offline_schedules)} offline schedules")
+    return {
+        "stop_details": {"id": stop_id, "lat": stop_data.get('lat'), "lon": stop_data.get('lon'), "name": stop_data.get('name')},
+        "nearby_buses": final_buses,
+        "offline_schedules": offline_schedules,
+        "all_routes": [list(r) for r in allowed_routes]
+    }
+
+def stop_bodies(stop_ids, if_none_match=None):
+    """Response bodies for one or more stops (None for unknown stops) and their (ETag, Cache-Control). Every stop
+    shares the snapshot decode, the legacy trip join, one batch round for static items, one for stop times and one
+    for next-stop names. Bodies come back as None when if_none_match already has the current ETag.
+    """
+    est_now = datetime.utcnow() - timedelta(hours=5)
+    now_secs = est_now.hour * 3600 + est_now.minute * 60 + est_now.second
+
+    # 1. Batch Fetch Core Data (BUS_ALL only when there's no fresh published snapshot)
+    with request_metrics.phase('CoreBatchGet'):
+        published = get_published_buses()
+        item_map = get_core_items([pk for sid in stop_ids for pk in (f"STOP#{sid}", f"STOP_ROUTES#{sid}", f"STOP_SCHEDULE#{sid}")],
+                                  () if published else ('BUS_ALL',))
+    if DEBUG: print(f"Static cache: {static_cache.stats()}")
+    if not any(item_map.get(f"STOP#{sid}") for sid in stop_ids): return dict.fromkeys(stop_ids), (None, "no-cache")
+
+    bus_item = published or item_map.get('BUS_ALL')
+    updated_at = bus_item.get('updated_at') if bus_item else None
+    validators = (snapshot_etag(updated_at), snapshot_cache_control(updated_at))
+    if etag_matches(if_none_match, validators[0]): return None, validators
+
+    with request_metrics.phase('SnapshotDecode'):
+        buses, grid = get_live_buses(bus_item)
+    if DEBUG: print(f"Found {len(buses)} total live buses in {'the published snapshot' if published else 'BUS_ALL'}.")
+
+    # 2. GRT_Ingest writes enriched buses; only snapshots from before that still need the trip join
+    legacy_buses = [b for b in buses if 'route_id' not in b]
+    if legacy_buses:
+        with request_metrics.phase('TripEnrichment'):
+            trip_keys = [{'PK': f"TRIP#{b.get('trip_id')}"} for b in legacy_buses if b.get('trip_id')]
+            trip_details_map = batch_get_trip_details(trip_keys)
+            for bus in legacy_buses:
+                bus.update(trip_details_map.get(bus.get('trip_id'), {}))
+
+    # 3. Per-stop matching; each stop of a multi-stop request annotates its own copies of the buses
+    with request_metrics.phase('ScheduleMatching'):
+        stops = {sid: prepare_stop(sid, item_map, buses if len(stop_ids) == 1 else [dict(b) for b in buses], grid) for sid in stop_ids}
+
+    # 4. One parallel round for the stop times of every candidate bus across all stops
+    with request_metrics.phase('StopTimesBatchGet'):
+        candidate_pks = [pk for stop in stops.values() if stop for pk in stop['candidate_pks']]
+        trip_stop_times = {pk.split('#', 1)[1]: item.get('StopTimes', []) for pk, item in get_static_items(candidate_pks).items()}
+    pending_names = []  # (bus, next stop id) resolved in one more round once matching is done
+    bodies = {sid: finish_stop(stop, trip_stop_times, now_secs, pending_names) if stop else None for sid, stop in stops.items()}
+
+    # 5. Last round: names of every bus's next stop
+    with request_metrics.phase('StopNamesBatchGet'):
+        stop_names = get_static_items([f"STOP#{sid}" for _, sid in pending_names if sid is not None])
+    for bus, next_stop_id in pending_names:
+        bus['next_stop_name'] = stop_names.get(f"STOP#{next_stop_id}", {}).get('name')
+    return bodies, validators
+
+# --- Main Handler ---
+
+def route_request(params, if_none_match):
+    if params.get('history_from'): return history_response(params)
+    if params.get('lat') or params.get('lon'): return nearby_stops_response(params)
+    if params.get('arrivals'): return arrivals_response(params['arrivals'].strip(), if_none_match)
+
+    # ?fields= and ?format=compact only reshape the body, so the ETag is per query string like the CloudFront cache key
+    fields, compact = parse_fields(params.get('fields')), params.get('format') == 'compact'
+    if params.get('stop_ids'):
+        stop_ids = list(dict.fromkeys(s.strip() for s in params['stop_ids'].split(',') if s.strip()))
+        if not stop_ids or len(stop_ids) > MAX_STOPS_PER_REQUEST:
+            return response_proxy(400, {"error": f"stop_ids takes 1 to {MAX_STOPS_PER_REQUEST} comma-separated stop ids"})
+        if DEBUG: print(f"--- REQUEST START: stop_ids={stop_ids} ---")
+        bodies, (etag, cache_control) = stop_bodies(stop_ids, if_none_match)
+        if bodies is None: return not_modified(etag, cache_control)
+        return response_proxy(200, {"stops": {sid: shape_stop_body(body, fields, compact) if body else {"error": "Stop not found"}
+                                              for sid, body in bodies.items()}}, cache_control, etag)
+
+    stop_id = params.get('stop_id')
+    if not stop_id: return response_proxy(400, {"error": "Missing stop_id"})
+    if DEBUG: print(f"--- REQUEST START: stop_id={stop_id} ---")
+    bodies, (etag, cache_control) = stop_bodies([stop_id], if_none_match)
+    if bodies is None: return not_modified(etag, cache_control)
+    if not bodies[stop_id]: return response_proxy(404, {"error": "Stop not found"})
+    return response_proxy(200, shape_stop_body(bodies[stop_id], fields, compact), cache_control, etag)
+
+def request_route(params):
+    """The Route dimension of the request's metrics."""
+    if params.get('history_from'): return 'history'
+    if params.get('lat') or params.get('lon'): return 'nearby'
+    if params.get('arrivals'): return 'arrivals'
+    return 'stops' if params.get('stop_ids') else 'stop'
+
+def lambda_handler(event, context):
+    global request_metrics
+    params = event.get('queryStringParameters') or {}
+    request_metrics = RequestMetrics(request_route(params))
+    try:
+        headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+        response = route_request(params, headers.get('if-none-match'))
+        with request_metrics.phase('Serialization'):
+            response = compress_response(response, headers.get('accept-encoding'))
     except Exception as e:
         print(f"[ERROR] Lambda execution failed: {e}")
         import traceback
         traceback.print_exc()
-        return response_proxy(500, {"error": "Internal server error."})
\ No newline at end of file
+        response = response_proxy(500, {"error": "Internal server error."})
+    if EMIT_METRICS: print(request_metrics.emf(status=response['statusCode'], cold_start=COLD_START['value']))
+    COLD_START['value'] = False
+    return response
@@ -0,0 +1,74 @@
+"""
+Published live vehicle snapshots, so clients and GRT_Reader fetch positions from
+the object store (and CloudFront in front of it) instead of reading BUS_ALL.
+
+    live/<blake2b of body>.json   {"updated_at": ts, "count": n, "buses": [...]}   immutable
+    live/latest.json              {"key": "live/<...>.json", "updated_at": ts, "count": n}
+
+GRT_Ingest writes the enriched vehicle list as a content-addressed object, then
+overwrites the small latest pointer. The object goes first, so the pointer never
+names something that isn't there yet, and an object can be cached forever
+because a different snapshot always gets a different key.
+
+Copies of this module ship in pkg_ingest and pkg_reader, kept identical by pkg_reader/test_shared_modules.py.
+"""
+import json, hashlib, time
+
+PREFIX = 'live'
+LATEST_KEY = f'{PREFIX}/latest.json'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def snapshot_key(body):
+    return f"{PREFIX}/{hashlib.blake2b(body, digest_size=16).hexdigest()}.json"
+
+
+def publish_snapshot(store, buses, updated_at, pointer_max_age=5):
+    """Writes the snapshot object and then the latest pointer. Returns the object's key."""
+    body = json.dumps({'updated_at': updated_at, 'count': len(buses), 'buses': buses}, separators=(',', ':')).encode('utf-8')
+    key = snapshot_key(body)
+    store.put(key, body, 'application/json', IMMUTABLE)
+    pointer = {'key': key, 'updated_at': updated_at, 'count': len(buses)}
+    store.put(LATEST_KEY, json.dumps(pointer).encode('utf-8'), 'application/json', f'public, max-age={pointer_max_age}')
+    return key
+
+
+def read_pointer(store):
+    data = store.get(LATEST_KEY)
+    return json.loads(data) if data else None
+
+
+def read_snapshot(store, key):
+    data = store.get(key)
+    return json.loads(data) if data else None
+
+
+class LatestSnapshot:
+    """Follows latest.json from a warm container. The pointer is only re-read once the next ingest poll is due
+    (updated_at + interval_seconds), then at most every recheck_seconds until a newer snapshot appears, and an
+    object is only downloaded when the pointer names a new key."""
+
+    def __init__(self, store, interval_seconds=30, recheck_seconds=2):
+        self.store = store
+        self.interval_seconds = interval_seconds
+        self.recheck_seconds = recheck_seconds
+        self.key = None
+        self.snapshot = None
+        self.next_check = 0
+        self.pointer_reads = 0
+        self.object_reads = 0
+
+    def get(self, now=None):
+        """{'updated_at', 'count', 'buses'} of the latest published snapshot, or None if nothing is published."""
+        now = now or time.time()
+        if now >= self.next_check:
+            self.next_check = now + self.recheck_seconds
+            pointer = read_pointer(self.store)
+            self.pointer_reads += 1
+            if pointer and pointer['key'] != self.key:
+                snapshot = read_snapshot(self.store, pointer['key'])
+                self.object_reads += 1
+                if snapshot: self.key, self.snapshot = pointer['key'], snapshot
+            if self.snapshot:
+                self.next_check = max(self.next_check, self.snapshot['updated_at'] + self.interval_seconds)
+        return self.snapshot
@@ -0,0 +1,67 @@
+"""
+Per-request phase timings and DynamoDB accounting for GRT_Reader.
+
+One RequestMetrics lives for each invocation. Phases are timed with
+`with metrics.phase('name'):` (time spent in a phase entered several times, e.g.
+once per stop, adds up) and every DynamoDB response is passed to
+metrics.dynamo() to count the call and its ConsumedCapacity. At the end of the
+request emf() renders everything as one CloudWatch Embedded Metric Format line,
+so the numbers become metrics without a PutMetricData call.
+
+LOG_LEVEL gates the output: DEBUG also prints the per-request matching details,
+INFO prints only the EMF line, WARNING and above print only warnings and errors.
+"""
+import json, os, threading, time
+from contextlib import contextmanager
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+LOG_LEVEL = LEVELS.get(os.environ.get('LOG_LEVEL', 'INFO').upper(), 20)
+DEBUG = LOG_LEVEL <= LEVELS['DEBUG']
+EMIT_METRICS = LOG_LEVEL <= LEVELS['INFO']
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'GRT/Reader')
+
+
+class RequestMetrics:
+    def __init__(self, route='unknown'):
+        self.route = route
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.counts = {'DynamoDBCalls': 0, 'ConsumedRCU': 0.0, 'DynamoDBRetries': 0, 'UnprocessedKeys': 0}
+        self.properties = {}
+        self._lock = threading.Lock()  # batch_get_item chunks report from executor threads
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            with self._lock: self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def dynamo(self, response):
+        """Counts one DynamoDB call and the capacity it reports (requests must ask for ReturnConsumedCapacity)."""
+        consumed = response.get('ConsumedCapacity') or []
+        if isinstance(consumed, dict): consumed = [consumed]
+        with self._lock:
+            self.counts['DynamoDBCalls'] += 1
+            self.counts['ConsumedRCU'] += sum(float(c.get('CapacityUnits', 0)) for c in consumed)
+        return response
+
+    def batch(self, stats):
+        """Adds a batch_get's retries and the keys it gave up on (its calls were already counted by dynamo())."""
+        with self._lock:
+            self.counts['DynamoDBRetries'] += stats.retries
+            self.counts['UnprocessedKeys'] += stats.unprocessed
+
+    def emf(self, **properties):
+        """The request's metrics as an EMF JSON line; properties are logged alongside but aren't metrics."""
+        total = (time.perf_counter() - self.started) * 1000
+        values = {name: round(ms, 3) for name, ms in self.phases.items()}
+        values.update(self.counts, TotalMs=round(total, 3), ConsumedRCU=round(self.counts['ConsumedRCU'], 2))
+        definitions = [{'Name': name, 'Unit': 'Count' if name in self.counts else 'Milliseconds'} for name in values]
+        return json.dumps({
+            '_aws': {'Timestamp': int(time.time() * 1000),
+                     'CloudWatchMetrics': [{'Namespace': NAMESPACE, 'Dimensions': [['Route']], 'Metrics': definitions}]},
+            'Route': self.route, **values, **self.properties, **properties,
+        }, separators=(',', ':'))
@@ -0,0 +1,75 @@
+"""
+Response shaping for GRT_Reader stop responses.
+
+?fields=id,lat,lon,...  keeps only those attributes of each bus in nearby_buses.
+?format=compact         turns the body's lists of objects into column arrays under short keys:
+
+    {"s": {"i": stop_id, "y": lat, "x": lon, "n": name},
+     "b": {"i": [bus ids], "y": [lats], "x": [lons], ...},     nearby_buses, one array per attribute
+     "o": {"r": [route ids], "h": [headsigns], "a": [times]},  offline_schedules
+     "r": [[route_id, headsign], ...]}                          all_routes
+
+Bodies are serialized once with compact separators and no default= callback, so
+everything in them must already be plain JSON types. Clients that send
+Accept-Encoding: gzip get bodies over GZIP_MIN_BYTES gzipped by the Lambda itself.
+"""
+import json, gzip, base64
+
+SHORT_KEYS = {
+    'id': 'i', 'lat': 'y', 'lon': 'x', 'name': 'n', 'bearing': 'b', 'route_id': 'r', 'headsign': 'h', 'trip_id': 't',
+    'block_id': 'k', 'timestamp': 'ts', 'current_stop_sequence': 'q', 'target_stop_sequence': 'g',
+    'next_scheduled_arrival': 'a', 'next_stop_name': 'ns',
+}
+OFFLINE_FIELDS = ('route_id', 'headsign', 'next_scheduled_arrival')
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+
+
+def parse_fields(value):
+    """'id, lat,lon' -> ['id', 'lat', 'lon'], or None when no projection was asked for."""
+    fields = [f.strip() for f in (value or '').split(',') if f.strip()]
+    return list(dict.fromkeys(fields)) or None
+
+
+def columns(rows, fields=None):
+    """Lists of objects as {short key: [values]}; fields defaults to every key seen, in first-seen order."""
+    if fields is None: fields = list(dict.fromkeys(k for row in rows for k in row))
+    return {SHORT_KEYS.get(f, f): [row.get(f) for row in rows] for f in fields}
+
+
+def shape_stop_body(body, fields=None, compact=False):
+    buses = body['nearby_buses']
+    if fields: buses = [{f: bus[f] for f in fields if f in bus} for bus in buses]
+    if not compact: return dict(body, nearby_buses=buses)
+    return {
+        's': {SHORT_KEYS.get(k, k): v for k, v in body['stop_details'].items()},
+        'b': columns(buses, fields),
+        'o': columns(body['offline_schedules'], OFFLINE_FIELDS),
+        'r': body['all_routes'],
+    }
+
+
+def dumps(body):
+    return json.dumps(body, separators=(',', ':'))
+
+
+def accepts_gzip(accept_encoding):
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if name.strip().lower() in ('gzip', '*'):
+            return params.replace(' ', '').lower() not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def compress_response(response, accept_encoding, min_bytes=GZIP_MIN_BYTES):
+    """Gzips a Lambda proxy response in place when the client accepts it and the body is worth it."""
+    body = response.get('body') or ''
+    if response.get('isBase64Encoded') or len(body) < min_bytes: return response
+    headers = response.setdefault('headers', {})
+    headers['Vary'] = 'Accept-Encoding'
+    if not accepts_gzip(accept_encoding): return response
+    data = gzip.compress(body.encode('utf-8'), compresslevel=GZIP_LEVEL, mtime=0)
+    headers['Content-Encoding'] = 'gzip'
+    if 'ETag' in headers: headers['ETag'] = headers['ETag'][:-1] + '-gz"'
+    response.update(body=base64.b64encode(data).decode('ascii'), isBase64Encoded=True)
+    return response
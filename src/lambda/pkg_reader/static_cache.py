@@ -0,0 +1,56 @@
+"""
+Warm-container LRU cache for static DynamoDB items (STOP#, STOP_ROUTES#, STOP_SCHEDULE#, ...).
+
+Static data only changes when GRT_Static_Ingest re-loads the feed, and it bumps
+CONFIG#STATIC.loaded_version once the last item of the load is written, so entries
+stay valid until that version changes. The version is re-checked at most once every version_check_seconds.
+"""
+import time
+from collections import OrderedDict
+
+# Cached marker for keys that don't exist, so missing items don't cost a read every request
+ABSENT = object()
+
+
+class StaticCache:
+    def __init__(self, max_items=512, version_check_seconds=60):
+        self.max_items = max_items
+        self.version_check_seconds = version_check_seconds
+        self.items = OrderedDict()
+        self.version = None
+        self.checked_at = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def version_due(self, now=None):
+        return (now or time.time()) - self.checked_at >= self.version_check_seconds
+
+    def set_version(self, version, now=None):
+        """Records a fresh version check. Returns True (and empties the cache) if the version changed."""
+        self.checked_at = now or time.time()
+        if version == self.version: return False
+        changed = self.version is not None
+        self.version = version
+        self.items.clear()
+        return changed
+
+    def get(self, key):
+        """Returns the cached item, ABSENT for a known-missing key, or None on a miss."""
+        item = self.items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.items.move_to_end(key)
+        return item
+
+    def put(self, key, item):
+        self.items[key] = ABSENT if item is None else item
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': len(self.items), 'version': self.version}
@@ -0,0 +1,34 @@
+import unittest
+
+import arrivals_index
+
+
+def bus(vehicle_id, trip_id, sequence, route_id='7', headsign='Conestoga Station'):
+    return {'id': vehicle_id, 'trip_id': trip_id, 'current_stop_sequence': sequence, 'route_id': route_id, 'headsign': headsign}
+
+
+class TestArrivalsIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.trip_stops = {
+            't1': arrivals_index.compact_stop_times([
+                {'stop_id': '1000', 'arrival_time': '23:58:00', 'stop_sequence': 1},
+                {'stop_id': '1001', 'arrival_time': '24:03:00', 'stop_sequence': 2},
+                {'stop_id': '1002', 'arrival_time': '24:09:00', 'stop_sequence': 3}]),
+            't2': arrivals_index.compact_stop_times([
+                {'stop_id': '1002', 'arrival_time': '23:59:00', 'stop_sequence': 1},
+                {'stop_id': '1001', 'arrival_time': '', 'stop_sequence': 2},
+                {'stop_id': '1000', 'arrival_time': '24:10:00', 'stop_sequence': 3}]),
+        }
+
+    def test_projects_remaining_stops_in_arrival_order(self):
+        arrivals = arrivals_index.project_arrivals([bus('a', 't1', 2), bus('b', 't2', 1, '8', 'Fairview Park'), bus('c', 'unknown', 1)],
+                                                   self.trip_stops)
+        self.assertEqual(arrivals, {
+            '1001': [['a', '7', 'Conestoga Station', '24:03:00', 0]],
+            '1002': [['b', '8', 'Fairview Park', '23:59:00', 0], ['a', '7', 'Conestoga Station', '24:09:00', 1]],
+            '1000': [['b', '8', 'Fairview Park', '24:10:00', 1]],
+        })
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import threading
+import unittest
+from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
+
+from batch_get import batch_get
+
+
+class Throttled(Exception):
+    response = {'Error': {'Code': 'ProvisionedThroughputExceededException'}}
+
+
+class ThrottlingClient:
+    """Answers at most `per_call` keys per request and throws a throttling error on the first `throttle_first` calls."""
+
+    def __init__(self, items, per_call=30, throttle_first=0):
+        self.items, self.per_call, self.throttle_first = items, per_call, throttle_first
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def batch_get_item(self, RequestItems, ReturnConsumedCapacity=None):
+        with self.lock:
+            self.calls += 1
+            if self.calls <= self.throttle_first: raise Throttled()
+        request = RequestItems['T']
+        assert len(request['Keys']) <= 100
+        served, rest = request['Keys'][:self.per_call], request['Keys'][self.per_call:]
+        found = [self.items[k['PK']['S']] for k in served if k['PK']['S'] in self.items]
+        response = {'Responses': {'T': found}, 'ConsumedCapacity': [{'TableName': 'T', 'CapacityUnits': 0.5 * len(found)}]}
+        if rest: response['UnprocessedKeys'] = {'T': dict(request, Keys=rest)}
+        return response
+
+
+def keys(n):
+    return [{'PK': {'S': f"TRIP#{i}"}} for i in range(n)]
+
+
+class TestBatchGet(unittest.TestCase):
+
+    def setUp(self):
+        self.items = {f"TRIP#{i}": {'PK': {'S': f"TRIP#{i}"}} for i in range(250)}
+
+    def test_unprocessed_keys_are_retried_until_everything_is_read(self):
+        client = ThrottlingClient(self.items, per_call=30, throttle_first=2)
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            items, unprocessed, stats = batch_get(client, 'T', keys(260), executor=pool, base_delay=0.001)
+        self.assertEqual(sorted(i['PK']['S'] for i in items), sorted(self.items))  # the 10 missing keys just aren't there
+        self.assertEqual(unprocessed, [])
+        self.assertEqual(stats.throttled, 2)
+        self.assertEqual(stats.calls, 4 + 4 + 2)  # chunks of 100, 100 and 60, 30 keys served per call
+        self.assertEqual(stats.retries, stats.calls + stats.throttled - 3)
+        self.assertEqual(stats.consumed_rcu, 125.0)
+
+    def test_deadline_returns_what_is_left(self):
+        client = ThrottlingClient(self.items, per_call=10)
+        with patch('random.uniform', lambda low, high: high):  # every backoff takes its full 20 ms
+            items, unprocessed, stats = batch_get(client, 'T', keys(100), deadline_seconds=0.05, base_delay=0.02, max_delay=0.02)
+        self.assertEqual(len(items) + len(unprocessed), 100)
+        self.assertGreater(len(unprocessed), 0)
+        self.assertEqual(stats.unprocessed, len(unprocessed))
+
+    def test_other_errors_are_raised(self):
+        class Broken:
+            def batch_get_item(self, **kwargs):
+                raise ValueError('ValidationException')
+        with self.assertRaises(ValueError):
+            batch_get(Broken(), 'T', keys(5))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import random
+import unittest
+
+from geo import GridIndex, distance_m
+
+
+class TestGridIndex(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        rng = random.Random(4)
+        points = [(43.45 + rng.uniform(-0.05, 0.05), -80.49 + rng.uniform(-0.05, 0.05)) for _ in range(400)] + [(None, None)]
+        grid = GridIndex(points, cell_m=200)
+        for lat, lon in points[:20]:
+            expected = sorted((distance_m(lat, lon, p_lat, p_lon), i) for i, (p_lat, p_lon) in enumerate(points[:-1])
+                              if distance_m(lat, lon, p_lat, p_lon) <= 500)
+            self.assertEqual(grid.within(lat, lon, 500), expected)
+
+    def test_wide_windows_and_poles(self):
+        points = [(43.45, -80.49), (43.46, -80.5), (89.999, 10.0)]
+        grid = GridIndex(points)
+        # A window with more cells than the grid has filled ones visits those instead
+        self.assertEqual([i for _, i in grid.within(43.45, -80.49, 20000)], [0, 1])
+        self.assertEqual([i for _, i in grid.within(90.0, 0.0, 1000)], [2])
+        self.assertEqual(grid.within(-90.0, 180.0, 1), [])
+
+    def test_distance(self):
+        # 0.005 degrees of longitude at Waterloo is about 404 m, of latitude about 556 m
+        self.assertAlmostEqual(distance_m(43.45, -80.49, 43.45, -80.485), 404, delta=1)
+        self.assertAlmostEqual(distance_m(43.45, -80.49, 43.455, -80.49), 556, delta=1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import io
+import json
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch, MagicMock
+
+# Mock AWS; history is served from a local object store
+sys.modules['boto3'] = MagicMock()
+sys.modules['boto3.dynamodb'] = MagicMock()
+sys.modules['boto3.dynamodb.types'] = MagicMock()
+
+import os
+os.environ['DYNAMO_TABLE'] = 'TestTable'
+
+import lambda_function
+from history_frames import encode_keyframe
+from history_store import HistoryWriter
+from object_store import LocalStore
+
+T0 = 1767823200
+LAMBDA_RESPONSE_LIMIT = 6 * 1024 * 1024
+
+
+def worst_case_fleet(ts, n=500):
+    # More buses than GRT ever runs, with every field filled and long strings
+    return [{'id': f"{90000000 + i}", 'lat': 43.123456 + i / 1e5, 'lon': -80.654321 - i / 1e5, 'bearing': 359.99,
+             'trip_id': f"{4000000000 + i}", 'current_stop_sequence': 127, 'timestamp': ts, 'route_id': f"{200 + i % 50}",
+             'headsign': f"Conestoga Station via Fairview Park Mall {i % 50}", 'block_id': f"{1200000 + i}"} for i in range(n)]
+
+
+class TestHistoryResponse(unittest.TestCase):
+
+    def setUp(self):
+        self.store = LocalStore(tempfile.mkdtemp())
+        writer = HistoryWriter(self.store)
+        # Polls every 10 s, three times the default rate, across the whole allowed range
+        for ts in range(T0, T0 + lambda_function.HISTORY_MAX_RANGE_SECONDS + 1, 10):
+            writer.append(ts, encode_keyframe(worst_case_fleet(ts), ts))
+        patcher = patch.object(lambda_function, 'history_store', self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, **params):
+        with redirect_stdout(io.StringIO()):
+            return lambda_function.lambda_handler({'queryStringParameters': {k: str(v) for k, v in params.items()}, 'headers': {}}, None)
+
+    def test_worst_case_page_fits_in_a_lambda_response(self):
+        response = self.get(history_from=T0, history_to=T0 + lambda_function.HISTORY_MAX_RANGE_SECONDS)
+        self.assertEqual(response['statusCode'], 200)
+        self.assertLess(len(json.dumps(response)), LAMBDA_RESPONSE_LIMIT)
+        body = json.loads(response['body'])
+        self.assertEqual(len(body['snapshots']), lambda_function.HISTORY_MAX_SNAPSHOTS)
+        self.assertEqual(body['next_from'], T0 + 10 * lambda_function.HISTORY_MAX_SNAPSHOTS)
+
+        # Following next_from picks up exactly where the page stopped
+        rest = json.loads(self.get(history_from=body['next_from'], history_to=T0 + lambda_function.HISTORY_MAX_RANGE_SECONDS)['body'])
+        self.assertEqual(rest['snapshots'][0]['timestamp'], body['next_from'])
+
+    def test_last_page_and_range_cap(self):
+        body = json.loads(self.get(history_from=T0 + 600, history_to=T0 + 650)['body'])
+        self.assertEqual([s['timestamp'] for s in body['snapshots']], list(range(T0 + 600, T0 + 651, 10)))
+        self.assertNotIn('next_from', body)
+        self.assertEqual(self.get(history_from=T0, history_to=T0 + lambda_function.HISTORY_MAX_RANGE_SECONDS + 1)['statusCode'], 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,321 @@
+import io
+import re
+import json
+import sys
+import tempfile
+import threading
+import unittest
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from unittest.mock import patch, MagicMock
+
+# Mock AWS; the fake table below answers batch_get_item with plain values
+sys.modules['boto3'] = MagicMock()
+sys.modules['boto3.dynamodb'] = MagicMock()
+sys.modules['boto3.dynamodb.types'] = MagicMock()
+
+import os
+os.environ['DYNAMO_TABLE'] = 'TestTable'
+
+import lambda_function
+from bus_codec import encode_buses
+from live_snapshot import LatestSnapshot, publish_snapshot
+from stop_index import encode_trip_index, encode_stops_index
+from object_store import LocalStore
+
+T0 = 1767823200  # a whole minute, so ETags only change when the test moves the clock across one
+
+
+class Binary:
+    def __init__(self, value):
+        self.value = value
+
+
+class FakeTable:
+    def __init__(self):
+        self.items = {}
+        self.batch_gets = 0
+        self.gets = 0
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        self.batch_gets += 1
+        keys = [k['PK']['S'] for k in RequestItems['TestTable']['Keys']]
+        found = [self.items[pk] for pk in keys if pk in self.items]
+        return {'Responses': {'TestTable': found}, 'ConsumedCapacity': [{'TableName': 'TestTable', 'CapacityUnits': 0.5 * len(found)}]}
+
+    def get_item(self, Key, **kwargs):
+        self.gets += 1
+        return {'Item': self.items[Key['PK']]} if Key['PK'] in self.items else {}
+
+    def publish(self, ts, lat, sequence=2):
+        buses = [{'id': '2001', 'lat': lat, 'lon': -80.49, 'bearing': 90.0, 'trip_id': '100', 'current_stop_sequence': sequence,
+                  'timestamp': ts, 'route_id': '7', 'headsign': 'Conestoga Station', 'block_id': None}]
+        self.items['BUS_ALL'] = {'PK': 'BUS_ALL', 'updated_at': ts, 'buses_binary': Binary(encode_buses(buses, ts)), 'count': 1}
+
+
+class CollapsingCache:
+    """Just enough of CloudFront: honours max-age, revalidates expired entries with If-None-Match, and collapses
+    concurrent misses for the same URL into one origin request."""
+
+    def __init__(self, origin, clock):
+        self.origin, self.clock = origin, clock
+        self.entries = {}
+        self.locks = defaultdict(threading.Lock)
+        self.origin_hits = 0
+        self.revalidated = 0
+
+    def get(self, query):
+        key = tuple(sorted(query.items()))
+        with self.locks[key]:
+            entry = self.entries.get(key)
+            if entry and self.clock() < entry['expires']: return entry['response']
+            headers = {'If-None-Match': entry['response']['headers']['ETag']} if entry else {}
+            self.origin_hits += 1
+            response = self.origin({'queryStringParameters': dict(query), 'headers': headers}, None)
+            max_age = int(re.search(r'max-age=(\d+)', response['headers']['Cache-Control']).group(1))
+            if response['statusCode'] == 304:
+                self.revalidated += 1
+                response = entry['response']
+            self.entries[key] = {'response': response, 'expires': self.clock() + max_age}
+            return response
+
+
+class ReaderTestCase(unittest.TestCase):
+    """Stops 1000 and 1001 on route 7, with bus 2001 on trip 100 between them in BUS_ALL."""
+
+    def setUp(self):
+        self.table = FakeTable()
+        self.table.items.update({
+            'CONFIG#STATIC': {'PK': 'CONFIG#STATIC', 'loaded_version': 'v1'},
+            'STOP#1000': {'PK': 'STOP#1000', 'lat': '43.45', 'lon': '-80.49', 'name': 'Charles Terminal'},
+            'STOP#1001': {'PK': 'STOP#1001', 'lat': '43.46', 'lon': '-80.49', 'name': 'Victoria Park'},
+            'STOP_ROUTES#1000': {'PK': 'STOP_ROUTES#1000', 'Routes': [{'route_id': '7', 'headsign': 'Conestoga Station'}]},
+            'TRIP_STOP_TIMES#100': {'PK': 'TRIP_STOP_TIMES#100', 'StopTimes': [
+                {'stop_id': '1001', 'arrival_time': '08:00:00', 'stop_sequence': 2},
+                {'stop_id': '1000', 'arrival_time': '08:05:00', 'stop_sequence': 3}]},
+        })
+        self.table.publish(T0, 43.455)
+        self.now = T0 + 5
+        lambda_function.published_snapshot = None
+        lambda_function.dynamodb.meta.client = self.table
+        lambda_function.deserializer = MagicMock(deserialize=lambda v: v)
+        lambda_function.static_cache.items.clear()
+        lambda_function.static_cache.checked_at = 0
+        patcher = patch('time.time', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, params, headers=None):
+        return lambda_function.lambda_handler({'queryStringParameters': params, 'headers': headers or {}}, None)
+
+
+class TestReaderCaching(ReaderTestCase):
+
+    def get_arrivals(self, stop_id):
+        return lambda_function.lambda_handler({'queryStringParameters': {'arrivals': stop_id}}, None)
+
+    def test_concurrent_identical_requests_hit_origin_once(self):
+        cdn = CollapsingCache(lambda_function.lambda_handler, lambda: self.now)
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            responses = list(pool.map(lambda _: cdn.get({'stop_id': '1000'}), range(64)))
+        self.assertEqual(cdn.origin_hits, 1)
+        self.assertTrue(all(r['statusCode'] == 200 and r['body'] == responses[0]['body'] for r in responses))
+        self.assertEqual(responses[0]['headers']['Cache-Control'], 'public, max-age=25, stale-while-revalidate=30')
+
+    def test_expired_entry_revalidates_until_the_snapshot_changes(self):
+        cdn = CollapsingCache(lambda_function.lambda_handler, lambda: self.now)
+        first = cdn.get({'stop_id': '1000'})
+        self.now = T0 + 31  # past max-age, same snapshot and minute
+        self.assertIs(cdn.get({'stop_id': '1000'}), first)
+        self.assertEqual((cdn.origin_hits, cdn.revalidated), (2, 1))
+
+        # The revalidated entry stays fresh until the poll due at T0 + 60
+        self.table.publish(T0 + 60, 43.452)
+        self.now = T0 + 59
+        self.assertIs(cdn.get({'stop_id': '1000'}), first)
+        self.now = T0 + 62
+        second = cdn.get({'stop_id': '1000'})
+        self.assertEqual((cdn.origin_hits, cdn.revalidated), (3, 1))
+        self.assertNotEqual(second['headers']['ETag'], first['headers']['ETag'])
+        self.assertIn('43.452', second['body'])
+
+    def test_not_modified_skips_matching(self):
+        first = lambda_function.lambda_handler({'queryStringParameters': {'stop_id': '1000'}}, None)
+        reads = self.table.batch_gets
+        response = lambda_function.lambda_handler({'queryStringParameters': {'stop_id': '1000'},
+                                                   'headers': {'if-none-match': first['headers']['ETag']}}, None)
+        self.assertEqual((response['statusCode'], response['body']), (304, ''))
+        self.assertEqual(self.table.batch_gets - reads, 1)  # BUS_ALL only; no stop times or stop names
+
+        # The gzipped variant's tag revalidates the same snapshot
+        response = lambda_function.lambda_handler({'queryStringParameters': {'stop_id': '1000'},
+                                                   'headers': {'If-None-Match': first['headers']['ETag'][:-1] + '-gz"'}}, None)
+        self.assertEqual(response['statusCode'], 304)
+
+    def test_static_version_change_drops_and_refetches_cached_items(self):
+        stop_name = lambda: json.loads(lambda_function.lambda_handler({'queryStringParameters': {'stop_id': '1000'}}, None)['body'])['stop_details']['name']
+        self.assertEqual(stop_name(), 'Charles Terminal')
+        self.assertEqual(lambda_function.static_cache.version, 'v1')
+
+        # The Guardian has seen a new feed but the load is still running: keep serving the cached items
+        self.table.items['STOP#1000'] = dict(self.table.items['STOP#1000'], name='Charles Street Terminal')
+        self.table.items['CONFIG#STATIC']['last_modified'] = 'Wed, 03 Jan 2026 00:00:00 GMT'
+        self.now += lambda_function.static_cache.version_check_seconds
+        self.assertEqual(stop_name(), 'Charles Terminal')
+
+        # GRT_Static_Ingest finished: the next version check empties the cache and the items are read again
+        self.table.items['CONFIG#STATIC']['loaded_version'] = 'v2'
+        self.now += lambda_function.static_cache.version_check_seconds
+        reads = self.table.batch_gets
+        self.assertEqual(stop_name(), 'Charles Street Terminal')
+        self.assertEqual(lambda_function.static_cache.version, 'v2')
+        self.assertIn('STOP#1000', lambda_function.static_cache.items)
+        self.assertEqual(self.table.batch_gets - reads, 3)  # BUS_ALL with the version, the cached static items again, stop times
+
+    def test_published_snapshot_replaces_bus_all_reads(self):
+        store = LocalStore(tempfile.mkdtemp())
+        lambda_function.published_snapshot = LatestSnapshot(store, 30, 2)
+        lambda_function.lambda_handler({'queryStringParameters': {'stop_id': '1000'}}, None)
+        self.assertEqual(self.table.batch_gets, 2)  # nothing published yet: BUS_ALL with the static items, then stop times
+
+        buses = [{'id': '2001', 'lat': 43.457, 'lon': -80.49, 'bearing': 90.0, 'trip_id': '100', 'current_stop_sequence': 2,
+                  'timestamp': T0 + 30, 'route_id': '7', 'headsign': 'Conestoga Station', 'block_id': None}]
+        publish_snapshot(store, buses, T0 + 30)
+        self.now = T0 + 33
+        reads = self.table.batch_gets
+        response = lambda_function.lambda_handler({'queryStringParameters': {'stop_id': '1000'}}, None)
+        self.assertIn('43.457', response['body'])
+        self.assertEqual(self.table.batch_gets, reads)  # static items are warm and BUS_ALL isn't needed
+
+        # A snapshot older than SNAPSHOT_STALE_SECONDS is ignored in favour of BUS_ALL
+        self.now = T0 + 30 + lambda_function.SNAPSHOT_STALE_SECONDS + 1
+        response = lambda_function.lambda_handler({'queryStringParameters': {'stop_id': '1000'}}, None)
+        self.assertIn('43.455', response['body'])
+        self.assertEqual(self.table.batch_gets, reads + 1)
+
+    def test_arrivals_are_projected_from_static_indexes_and_the_snapshot(self):
+        self.table.items['STOP_ROUTES#1000']['TripIndex'] = Binary(encode_trip_index({'100': [(3, 8 * 3600 + 300)]}))
+        arrivals = lambda: self.get_arrivals('1000')
+        response = arrivals()
+        self.assertEqual(json.loads(response['body'])['arrivals'], [
+            {'vehicle_id': '2001', 'route_id': '7', 'headsign': 'Conestoga Station', 'scheduled_arrival': '08:05:00', 'stops_away': 1}])
+        self.assertEqual(response['headers']['Cache-Control'], 'public, max-age=25, stale-while-revalidate=30')
+        self.assertEqual(self.table.batch_gets, 2)  # BUS_ALL with STOP_ROUTES#1000, then the trip's stop times
+
+        # Warm: the next snapshot is the only read, and a bus past the stop drops out
+        self.table.publish(T0 + 30, 43.457, sequence=4)
+        self.now = T0 + 33
+        self.assertEqual(json.loads(arrivals()['body'])['arrivals'], [])
+        self.assertEqual(self.table.batch_gets, 3)
+
+        # A snapshot the ingest stopped refreshing means no arrivals, and stops without STOP_ROUTES# are unknown
+        self.table.publish(T0 + 30, 43.455)
+        self.now = T0 + 30 + lambda_function.ARRIVALS_STALE_SECONDS + 1
+        self.assertEqual(json.loads(arrivals()['body'])['arrivals'], [])
+        self.assertEqual(self.get_arrivals('9999')['statusCode'], 404)
+
+    def test_one_metrics_line_per_request(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            lambda_function.lambda_handler({'queryStringParameters': {'stop_id': '1000'}}, None)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 1)  # LOG_LEVEL defaults to INFO: no per-request matching details
+        emf = json.loads(lines[0])
+        self.assertEqual(emf['_aws']['CloudWatchMetrics'][0]['Dimensions'], [['Route']])
+        self.assertEqual((emf['Route'], emf['status'], emf['DynamoDBCalls']), ('stop', 200, 2))
+        self.assertEqual(emf['ConsumedRCU'], 2.5)  # FakeTable charges 0.5 per item: four core items, then TRIP_STOP_TIMES#100
+        for phase in ('CoreBatchGet', 'SnapshotDecode', 'ScheduleMatching', 'HybridMatching', 'StopTimesBatchGet', 'Serialization', 'TotalMs'):
+            self.assertIn(phase, emf)
+
+
+class TestStopIds(ReaderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.table.items['STOP_ROUTES#1001'] = {'PK': 'STOP_ROUTES#1001', 'Routes': [{'route_id': '7', 'headsign': 'Conestoga Station'}]}
+
+    def test_stops_share_every_read_round(self):
+        response = self.get({'stop_ids': '1000,1001'})
+        self.assertEqual(response['statusCode'], 200)
+        stops = json.loads(response['body'])['stops']
+        self.assertEqual(list(stops), ['1000', '1001'])
+        # One round for BUS_ALL and all six static items, one for the stop times both stops need
+        self.assertEqual(self.table.batch_gets, 2)
+
+        # Each stop gets the body ?stop_id= would have returned
+        for sid in ('1000', '1001'):
+            self.assertEqual(stops[sid], json.loads(self.get({'stop_id': sid})['body']))
+        self.assertEqual([b['target_stop_sequence'] for b in stops['1000']['nearby_buses']], [3])
+        self.assertEqual([b['target_stop_sequence'] for b in stops['1001']['nearby_buses']], [2])
+        self.assertEqual(stops['1001']['stop_details']['name'], 'Victoria Park')
+
+    def test_unknown_and_duplicate_ids(self):
+        response = self.get({'stop_ids': ' 1000,9999,1000,, '})
+        self.assertEqual(response['statusCode'], 200)
+        stops = json.loads(response['body'])['stops']
+        self.assertEqual(list(stops), ['1000', '9999'])
+        self.assertEqual(stops['9999'], {'error': 'Stop not found'})
+        self.assertEqual(stops['1000']['stop_details']['id'], '1000')
+
+        # Nothing known: every stop reports its error and the response isn't cached
+        response = self.get({'stop_ids': '9998,9999'})
+        self.assertEqual(json.loads(response['body'])['stops'], {'9998': {'error': 'Stop not found'}, '9999': {'error': 'Stop not found'}})
+        self.assertEqual(response['headers']['Cache-Control'], 'no-cache')
+
+    def test_stop_count_is_limited(self):
+        limit = lambda_function.MAX_STOPS_PER_REQUEST
+        self.assertEqual(limit, 5)
+        ids = [str(1000 + i) for i in range(limit + 1)]
+        self.assertEqual(self.get({'stop_ids': ','.join(ids[:limit])})['statusCode'], 200)
+        for query in (','.join(ids), ' , ,'):
+            response = self.get({'stop_ids': query})
+            self.assertEqual(response['statusCode'], 400)
+            self.assertIn('1 to 5', json.loads(response['body'])['error'])
+        # Duplicates count once
+        self.assertEqual(self.get({'stop_ids': ','.join(ids[:limit] + ids[:2])})['statusCode'], 200)
+
+    def test_matching_etag_returns_304_before_any_matching(self):
+        first = self.get({'stop_ids': '1000,1001'})
+        reads = self.table.batch_gets
+        response = self.get({'stop_ids': '1000,1001'}, {'If-None-Match': first['headers']['ETag']})
+        self.assertEqual((response['statusCode'], response['body'], response['headers']['ETag']), (304, '', first['headers']['ETag']))
+        self.assertEqual(self.table.batch_gets - reads, 1)  # BUS_ALL only; no stop times or stop names
+
+        # A new snapshot is a full response again
+        self.table.publish(T0 + 60, 43.452)
+        self.now = T0 + 62
+        self.assertEqual(self.get({'stop_ids': '1000,1001'}, {'If-None-Match': first['headers']['ETag']})['statusCode'], 200)
+
+class TestNearbyStops(ReaderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.table.items['STOP_INDEX'] = {'PK': 'STOP_INDEX', 'Index': Binary(encode_stops_index([
+            ('1000', 'Charles Terminal', 43.45, -80.49, ['7']), ('1001', 'Victoria Park', 43.46, -80.49, ['7', '201'])]))}
+
+    def test_nearest_stops_within_radius(self):
+        response = self.get({'lat': '43.451', 'lon': '-80.49', 'radius': '500'})
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(json.loads(response['body'])['stops'], [
+            {'id': '1000', 'name': 'Charles Terminal', 'lat': 43.45, 'lon': -80.49, 'distance_m': 111, 'routes': ['7']}])
+        stops = json.loads(self.get({'lat': '43.455', 'lon': '-80.49', 'radius': '2000', 'k': '1'})['body'])['stops']
+        self.assertEqual(len(stops), 1)
+
+    def test_rejects_invalid_coordinates_and_radius(self):
+        for params in ({'lat': 'nan', 'lon': '-80.49'}, {'lat': '43.45', 'lon': 'inf'}, {'lat': '-Infinity', 'lon': '-80.49'},
+                       {'lat': '43.45', 'lon': '-80.49', 'radius': 'nan'}, {'lat': '43.45', 'lon': '-80.49', 'radius': 'inf'},
+                       {'lat': '90.5', 'lon': '-80.49'}, {'lat': '-91', 'lon': '-80.49'}, {'lat': '43.45', 'lon': '180.1'},
+                       {'lat': '43.45', 'lon': '-181'}, {'lat': '43.45', 'lon': '-80.49', 'radius': '0'},
+                       {'lat': '43.45', 'lon': '-80.49', 'radius': '-5'}, {'lat': '43.45', 'lon': '-80.49', 'k': '0'},
+                       {'lat': '43.45'}, {'lat': 'north', 'lon': '-80.49'}):
+            with self.subTest(params=params):
+                response = self.get(params)
+                self.assertEqual(response['statusCode'], 400)
+                self.assertIn('error', json.loads(response['body']))
+        self.assertEqual(self.table.batch_gets, 0)
+        # The edges of the valid range are fine
+        self.assertEqual(self.get({'lat': '-90', 'lon': '180', 'radius': '1'})['statusCode'], 200)
+
+if __name__ == '__main__':
+    unittest.main()
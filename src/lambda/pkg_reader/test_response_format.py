@@ -0,0 +1,52 @@
+import base64
+import gzip
+import json
+import unittest
+
+from response_format import parse_fields, shape_stop_body, dumps, accepts_gzip, compress_response
+
+BODY = {
+    "stop_details": {"id": "1000", "lat": "43.45", "lon": "-80.49", "name": "Charles Terminal"},
+    "nearby_buses": [
+        {"id": "2001", "lat": 43.455, "lon": -80.49, "bearing": 90.0, "route_id": "7", "headsign": "Conestoga Station",
+         "next_scheduled_arrival": "08:05:00", "next_stop_name": "Victoria Park"},
+        {"id": "2002", "lat": 43.46, "lon": -80.5, "bearing": 180.0, "route_id": "8", "headsign": "Fairview Park",
+         "next_scheduled_arrival": "08:09:00"},
+    ],
+    "offline_schedules": [{"route_id": "12", "headsign": "Conestoga Station", "next_scheduled_arrival": "08:30:00"}],
+    "all_routes": [["7", "Conestoga Station"], ["8", "Fairview Park"], ["12", "Conestoga Station"]],
+}
+
+
+class TestResponseFormat(unittest.TestCase):
+
+    def test_fields_project_buses_only(self):
+        body = shape_stop_body(BODY, parse_fields(' id,lat, next_stop_name,id'))
+        self.assertEqual(body['nearby_buses'], [{'id': '2001', 'lat': 43.455, 'next_stop_name': 'Victoria Park'}, {'id': '2002', 'lat': 43.46}])
+        self.assertEqual(body['offline_schedules'], BODY['offline_schedules'])
+        self.assertIsNone(parse_fields(' , '))
+
+    def test_compact_columns(self):
+        body = shape_stop_body(BODY, parse_fields('id,lat,lon,next_stop_name'), compact=True)
+        self.assertEqual(body['s'], {'i': '1000', 'y': '43.45', 'x': '-80.49', 'n': 'Charles Terminal'})
+        self.assertEqual(body['b'], {'i': ['2001', '2002'], 'y': [43.455, 43.46], 'x': [-80.49, -80.5], 'ns': ['Victoria Park', None]})
+        self.assertEqual(body['o'], {'r': ['12'], 'h': ['Conestoga Station'], 'a': ['08:30:00']})
+        self.assertEqual(len(shape_stop_body(BODY, compact=True)['b']), 8)
+
+    def test_gzip_only_when_accepted_and_large_enough(self):
+        self.assertTrue(accepts_gzip('br, gzip;q=0.8'))
+        self.assertFalse(accepts_gzip('gzip;q=0, br'))
+        self.assertFalse(accepts_gzip(None))
+
+        body = dumps({"stops": [BODY] * 5})
+        plain = compress_response({'statusCode': 200, 'headers': {'ETag': '"1-2-3"'}, 'body': body}, 'br')
+        self.assertEqual((plain['body'], plain['headers']['Vary']), (body, 'Accept-Encoding'))
+        zipped = compress_response({'statusCode': 200, 'headers': {'ETag': '"1-2-3"'}, 'body': body}, 'gzip, deflate')
+        self.assertTrue(zipped['isBase64Encoded'])
+        self.assertEqual((zipped['headers']['Content-Encoding'], zipped['headers']['ETag']), ('gzip', '"1-2-3-gz"'))
+        self.assertEqual(json.loads(gzip.decompress(base64.b64decode(zipped['body']))), json.loads(body))
+        small = compress_response({'statusCode': 400, 'headers': {}, 'body': '{"error":"Missing stop_id"}'}, 'gzip')
+        self.assertNotIn('Content-Encoding', small['headers'])
+
+if __name__ == '__main__':
+    unittest.main()
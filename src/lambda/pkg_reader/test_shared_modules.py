@@ -0,0 +1,34 @@
+import os
+import unittest
+from collections import defaultdict
+
+LAMBDA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def shared_modules():
+    """{module file name: [paths]} for every top-level module that ships in more than one Lambda package."""
+    copies = defaultdict(list)
+    for package in sorted(os.listdir(LAMBDA_DIR)):
+        path = os.path.join(LAMBDA_DIR, package)
+        if not package.startswith('pkg_') or not os.path.isdir(path): continue
+        for name in os.listdir(path):
+            if name.endswith('.py') and name != 'lambda_function.py' and not name.startswith('test_'):
+                copies[name].append(os.path.join(path, name))
+    return {name: paths for name, paths in copies.items() if len(paths) > 1}
+
+
+class TestSharedModules(unittest.TestCase):
+    """Modules copied between packages (bus_codec, stop_index, gtfs_download, ...) must stay byte-identical."""
+
+    def test_copies_are_identical(self):
+        modules = shared_modules()
+        self.assertIn('bus_codec.py', modules)
+        for name, paths in modules.items():
+            contents = {}
+            for path in paths:
+                with open(path, 'rb') as f: contents[os.path.relpath(path, LAMBDA_DIR)] = f.read()
+            with self.subTest(module=name):
+                self.assertEqual(len(set(contents.values())), 1, f"{name} differs between {sorted(contents)}; copy the edited one over the others")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+"""
+Capacity-aware parallel BatchWriteItem for one table.
+
+Items are grouped into requests of 25 (the BatchWriteItem limit) and sent by a
+small pool of worker threads. A token bucket holding write capacity units sits
+in front of every request, so the writers together stay near
+`target_wcu` per second instead of relying on fixed sleeps:
+
+- every request takes its estimated cost from the bucket before it's sent
+  (items x the running average WCU per item; it starts at one, and a 350 KB
+  TripIndex item costs 350);
+- the ConsumedCapacity of the response settles the difference, so a request
+  that cost more than estimated leaves the bucket in debt and the next ones wait;
+- a throttling error or any UnprocessedItems halves the rate, and every clean
+  response adds back 5% of the target until it's reached again.
+
+Unprocessed items are retried with jittered exponential backoff. Items still
+unwritten after `max_attempts` count as failed in the stats; they're never
+dropped silently. An `on_written(pks, deleted)` callback hears about every
+key as soon as its write has landed (from the worker threads).
+
+Works on the low-level client, which is thread-safe (resources aren't).
+Give it a TypeSerializer to write plain Python items.
+"""
+import random, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_ITEMS = 25
+RETRYABLE_ERRORS = {'ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded',
+                    'InternalServerError', 'ServiceUnavailable'}
+
+
+class TokenBucket:
+    """Write capacity units refilled at `rate` per second, holding at most one second's worth."""
+
+    def __init__(self, rate, min_rate=1.0):
+        self.target = float(rate)
+        self.rate = float(rate)
+        self.min_rate = min(float(min_rate), self.target)
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, units):
+        """Blocks until the bucket can pay for `units` and takes them. Costs above a
+        second's worth go through once the bucket is full and leave it in debt."""
+        while True:
+            with self._lock:
+                self._refill()
+                needed = min(units, self.rate)
+                if self.tokens >= needed:
+                    self.tokens -= units
+                    return
+                wait = (needed - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def settle(self, units):
+        """Takes (or with a negative value, returns) the gap between a request's estimate and its ConsumedCapacity."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.rate, self.tokens - units)
+
+    def throttled(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+
+    def succeeded(self):
+        with self._lock:
+            self.rate = min(self.target, self.rate + self.target * 0.05)
+
+
+class BulkWriteStats:
+    def __init__(self):
+        self.items = 0
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.consumed_wcu = 0.0
+        self.failed = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def as_dict(self):
+        return {'items': self.items, 'calls': self.calls, 'retries': self.retries, 'throttled': self.throttled,
+                'consumed_wcu': round(self.consumed_wcu, 1), 'failed': self.failed, 'seconds': round(self.seconds, 2),
+                'items_per_second': round(self.items / self.seconds, 1) if self.seconds else 0.0}
+
+
+def _error_code(error):
+    return getattr(error, 'response', {}).get('Error', {}).get('Code')
+
+
+def _request_pk(request):
+    item = request['PutRequest']['Item'] if 'PutRequest' in request else request['DeleteRequest']['Key']
+    pk = item['PK']
+    return pk['S'] if isinstance(pk, dict) else pk  # serialized or plain
+
+
+class BulkWriter:
+    def __init__(self, client, table_name, target_wcu, workers=4, serializer=None, max_attempts=10,
+                 base_delay=0.05, max_delay=2.0, on_written=None):
+        self.client = client
+        self.table_name = table_name
+        self.bucket = TokenBucket(target_wcu)
+        self.stats = BulkWriteStats()
+        self.serializer = serializer
+        self.max_attempts = max_attempts
+        self.base_delay, self.max_delay = base_delay, max_delay
+        self.wcu_per_item = 1.0
+        self.on_written = on_written
+        self._depth = 0  # write() can be re-entered from the items generator (manifest flushes); time only the outer call
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self._in_flight = threading.BoundedSemaphore(workers * 2)  # at most this many requests built ahead of the workers
+
+    def _serialize(self, item):
+        if not self.serializer: return item
+        return {k: self.serializer.serialize(v) for k, v in item.items()}
+
+    def _send(self, requests, deleted):
+        attempt = 0
+        while requests:
+            estimate = len(requests) * self.wcu_per_item
+            self.bucket.acquire(estimate)
+            try:
+                response = self.client.batch_write_item(RequestItems={self.table_name: requests}, ReturnConsumedCapacity='TOTAL')
+            except Exception as e:
+                if _error_code(e) not in RETRYABLE_ERRORS: raise
+                self.bucket.settle(-estimate)  # rejected requests consume nothing
+                self.bucket.throttled()
+                with self.stats._lock: self.stats.throttled += 1
+            else:
+                consumed = sum(float(c.get('CapacityUnits', 0)) for c in response.get('ConsumedCapacity') or [])
+                unprocessed = response.get('UnprocessedItems', {}).get(self.table_name, [])
+                written = len(requests) - len(unprocessed)
+                self.bucket.settle(consumed - estimate)
+                with self.stats._lock:
+                    self.stats.calls += 1
+                    self.stats.items += written
+                    self.stats.consumed_wcu += consumed
+                    if written and consumed: self.wcu_per_item = 0.8 * self.wcu_per_item + 0.2 * consumed / written
+                if self.on_written and written:
+                    retry = {_request_pk(r) for r in unprocessed}
+                    self.on_written([pk for pk in map(_request_pk, requests) if pk not in retry], deleted)
+                if not unprocessed:
+                    self.bucket.succeeded()
+                    return
+                self.bucket.throttled()
+                requests = unprocessed
+            attempt += 1
+            if attempt >= self.max_attempts:
+                with self.stats._lock: self.stats.failed += len(requests)
+                print(f"BulkWriter: giving up on {len(requests)} items after {attempt} attempts")
+                return
+            with self.stats._lock: self.stats.retries += 1
+            time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+
+    def _submit(self, requests, deleted, futures):
+        self._in_flight.acquire()
+        future = self.executor.submit(self._send, requests, deleted)
+        future.add_done_callback(lambda _: self._in_flight.release())
+        futures.append(future)
+
+    def _run(self, keyed_requests, deleted=False):
+        started = time.perf_counter()
+        self._depth += 1
+        try:
+            futures, requests, keys, count = [], [], set(), 0
+            for key, request in keyed_requests:
+                # One request can't touch the same key twice; send what's pending first
+                if key in keys or len(requests) == MAX_ITEMS:
+                    self._submit(requests, deleted, futures)
+                    requests, keys = [], set()
+                requests.append(request)
+                keys.add(key)
+                count += 1
+            if requests: self._submit(requests, deleted, futures)
+            for future in futures: future.result()
+        finally:
+            self._depth -= 1
+        if not self._depth: self.stats.seconds += time.perf_counter() - started
+        return count
+
+    def write(self, items):
+        """
+        Writes every item and waits for them all. Returns how many were given to it.
+        Requests run concurrently, so if a key repeats, either version may end up stored.
+        """
+        return self._run((item['PK'], {'PutRequest': {'Item': self._serialize(item)}}) for item in items)
+
+    def delete(self, pks):
+        """Deletes every PK and waits for them all. Returns how many were given to it."""
+        return self._run(((pk, {'DeleteRequest': {'Key': self._serialize({'PK': pk})}}) for pk in pks), deleted=True)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
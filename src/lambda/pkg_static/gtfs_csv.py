@@ -0,0 +1,40 @@
+"""
+Positional reader for GTFS CSV members.
+
+csv.DictReader builds a dict per row and every row.get('trip_id') is a hash
+lookup; over the ~450k rows of stop_times.txt that is most of the parse. Here
+the header is resolved to column indices once, and each row comes back as a
+plain tuple of just the requested columns, pulled out by one itemgetter:
+
+    for trip_id, stop_id, arrival_time in gtfs_rows(f, ('trip_id', 'stop_id', 'arrival_time')):
+
+Quoting and embedded commas are handled by the csv module itself. Column order
+doesn't matter and extra agency columns are ignored. Header names are matched
+after stripping a UTF-8 BOM and surrounding whitespace. As with DictReader, a
+requested column the file doesn't have, or a short row doesn't reach, reads as
+None, and blank lines are skipped. Values stay strings; callers convert the
+ones they use.
+"""
+import csv, io
+from operator import itemgetter
+
+
+def gtfs_rows(f, columns):
+    """f: a binary file (e.g. ZipFile.open()). Yields one tuple per data row, in `columns` order."""
+    reader = csv.reader(io.TextIOWrapper(f, 'utf-8-sig', newline=''))
+    header = next(reader, None)
+    if header is None: return
+    index = {name.strip().lstrip('\ufeff'): i for i, name in enumerate(header)}
+    width = len(header)
+    # Missing columns point one past the header, which padding always fills with None
+    positions = [index.get(name, width) for name in columns]
+    needed = max(positions) + 1
+    pick = itemgetter(*positions)
+    if len(positions) == 1:
+        single = pick
+        pick = lambda row: (single(row),)
+    for row in reader:
+        if len(row) < needed:
+            if not row: continue
+            row += [None] * (needed - len(row))
+        yield pick(row)
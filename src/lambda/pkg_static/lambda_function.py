@@ -1,7 +1,12 @@
-import json, boto3, requests, os, io, zipfile, csv, time, ssl
+import json, boto3, requests, os, zipfile, time
 from requests.adapters import HTTPAdapter
 from urllib3.poolmanager import PoolManager
 from urllib3.util.ssl_ import create_urllib3_context
+from static_pipeline import StageTimings, TimeBudget, run_pipeline
+from bulk_writer import BulkWriter
+from static_manifest import ManifestDiff, chunk_keys, read_manifest, is_owned
+from gtfs_download import download_to_spool
+from boto3.dynamodb.types import TypeSerializer
 
 class LegacyAdapter(HTTPAdapter):
     def init_poolmanager(self, connections, maxsize, block=False):
@@ -15,84 +20,134 @@ STATIC_URL = "https://webapps.regionofwaterloo.ca/api/grt-routes/api/staticfeeds
 DYNAMO_TABLE = os.environ['DYNAMO_TABLE']
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table(DYNAMO_TABLE)
+lambda_client = boto3.client('lambda')
+
+# Bulk writes aim at this share of the table's provisioned WCU, leaving the rest for GRT_Ingest's polls
+WRITE_CAPACITY_FRACTION = float(os.environ.get('WRITE_CAPACITY_FRACTION', '0.7'))
+WRITE_CAPACITY_UNITS = os.environ.get('WRITE_CAPACITY_UNITS')  # overrides DescribeTable, e.g. for on-demand tables
+ON_DEMAND_TARGET_WCU = float(os.environ.get('ON_DEMAND_TARGET_WCU', '1000'))
+WRITE_WORKERS = int(os.environ.get('WRITE_WORKERS', '4'))
+
+# Fingerprints of landed writes are flushed to the manifest after every stage and this often within one
+MANIFEST_FLUSH_SECONDS = float(os.environ.get('MANIFEST_FLUSH_SECONDS', '300'))
+
+# A full load is more than one invocation's worth of writes at 25 WCU. Each invocation stops handing out
+# items with TIME_RESERVE_SECONDS left (to drain in-flight writes and flush the manifest), then invokes
+# the function again with {"resume": n}; the new run re-parses the feed and the manifest skips what landed.
+# Only the last invocation of a load sets CONFIG#STATIC.loaded_version, which GRT_Reader and GRT_Ingest
+# key their warm caches on, so they don't cache a half-written feed for the life of the version.
+TIME_RESERVE_SECONDS = float(os.environ.get('TIME_RESERVE_SECONDS', '120'))
+MAX_RESUMES = int(os.environ.get('MAX_RESUMES', '10'))
+
+def target_write_units():
+    if WRITE_CAPACITY_UNITS: return float(WRITE_CAPACITY_UNITS) * WRITE_CAPACITY_FRACTION
+    try:
+        provisioned = table.provisioned_throughput or {}
+        units = provisioned.get('WriteCapacityUnits', 0)
+    except Exception as e:
+        print(f"DescribeTable failed ({e}); assuming 25 WCU")
+        units = 25
+    # On-demand tables report 0 provisioned units
+    return units * WRITE_CAPACITY_FRACTION if units else ON_DEMAND_TARGET_WCU
+
+def scan_static_pks():
+    """PKs of every static item in the table, for a first incremental run with no manifest to diff against."""
+    pks, kwargs = [], {'ProjectionExpression': 'PK'}
+    while True:
+        response = table.scan(**kwargs)
+        pks.extend(item['PK'] for item in response.get('Items', []) if is_owned(item['PK']))
+        if 'LastEvaluatedKey' not in response: return pks
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def load_manifest():
+    """({PK: fingerprint or None} of what the table holds, {chunk key: blob} as stored)."""
+    found = {}
+    request = {DYNAMO_TABLE: {'Keys': [{'PK': key} for key in chunk_keys()]}}
+    while request:
+        response = dynamodb.batch_get_item(RequestItems=request)
+        for item in response.get('Responses', {}).get(DYNAMO_TABLE, []): found[item['PK']] = item
+        request = response.get('UnprocessedKeys')
+        if request: time.sleep(0.1)
+
+    manifest = read_manifest(found)
+    if manifest: return manifest
+    # Missing (first run, or MANIFEST_CHUNKS changed): rewrite everything but still delete what the feed dropped
+    print("No complete static manifest; scanning the table for existing static items")
+    return dict.fromkeys(scan_static_pks()), {}
+
+def continue_load(context, resume, version):
+    """Hands the rest of the load to a new asynchronous invocation; True if one was started."""
+    if resume > MAX_RESUMES:
+        print(f"[ERROR] Static load still unfinished after {MAX_RESUMES} continuations; stopping")
+        return False
+    lambda_client.invoke(FunctionName=context.function_name, InvocationType='Event', Payload=json.dumps({'resume': resume, 'version': version}))
+    print(f"Out of time; continuing in invocation {resume}")
+    return True
+
+def publish_version(version):
+    """Tells the warm caches in GRT_Reader and GRT_Ingest that the static items changed."""
+    table.update_item(Key={'PK': 'CONFIG#STATIC'}, UpdateExpression='SET loaded_version = :v, loaded_at = :t',
+                      ExpressionAttributeValues={':v': version, ':t': int(time.time())})
+    print(f"Static version {version} loaded")
 
 def lambda_handler(event, context):
+    event = event or {}
+    # The Guardian passes the feed's Last-Modified; a manual run gets one of its own, kept across continuations
+    version = event.get('version') or f"manual-{int(time.time())}"
+    timings = StageTimings()
     print(f"Downloading Static GTFS from {STATIC_URL}...")
     s = requests.Session()
     s.mount('https://', LegacyAdapter())
     headers = { 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36' }
-    r = s.get(STATIC_URL, headers=headers)
-    
-    if r.status_code != 200:
-        return {"status": "FAIL", "reason": r.text[:200]}
-
-    z = zipfile.ZipFile(io.BytesIO(r.content))
-    
-    # Process stops.txt
-    print("Processing stops...")
-    stops_count = 0
-    with z.open('stops.txt') as f, table.batch_writer() as writer:
-        reader = csv.DictReader(io.TextIOWrapper(f, 'utf-8'))
-        for row in reader:
-            code = row.get('stop_code') or row.get('stop_id')
-            if not code: continue
-            writer.put_item(Item={
-                'PK': f"STOP#{code}", 'lat': row.get('stop_lat'),
-                'lon': row.get('stop_lon'), 'name': row.get('stop_name'),
-                'type': 'STATIC_STOP'
-            })
-            stops_count += 1
-            if stops_count % 500 == 0: time.sleep(0.1)
-
-    # Process trips.txt to build a trip_id -> {route_id, headsign} map in memory
-    print("Processing trips (for in-memory map)...")
-    trip_to_route_map = {}
-    trips_count = 0
-    with z.open('trips.txt') as f, table.batch_writer() as writer:
-        reader = csv.DictReader(io.TextIOWrapper(f, 'utf-8'))
-        for row in reader:
-            trip_id = row.get('trip_id')
-            route_id = row.get('route_id')
-            headsign = row.get('trip_headsign')
-            if trip_id and route_id: 
-                trip_to_route_map[trip_id] = {'route_id': route_id, 'headsign': headsign}
-                writer.put_item(Item={
-                    'PK': f"TRIP#{trip_id}",
-                    'headsign': headsign,
-                    'route_id': route_id,
-                    'type': 'STATIC_TRIP'
-                })
-                trips_count += 1
-                if trips_count % 500 == 0: time.sleep(0.1)
-
-    # Process stop_times.txt to build stop_id -> set of (route_id, headsign) tuples
-    print("Processing stop_times and building STOP_ROUTES mapping...")
-    stop_routes_map = {}
-    with z.open('stop_times.txt') as f:
-        reader = csv.DictReader(io.TextIOWrapper(f, 'utf-8'))
-        for row in reader:
-            stop_id = row.get('stop_id')
-            trip_id = row.get('trip_id')
-            
-            if stop_id and trip_id and trip_id in trip_to_route_map:
-                route_info = trip_to_route_map[trip_id]
-                route_id = route_info['route_id']
-                headsign = route_info['headsign']
-                if stop_id not in stop_routes_map:
-                    stop_routes_map[stop_id] = set()
-                stop_routes_map[stop_id].add((route_id, headsign))
-
-    # Write STOP_ROUTES#<stop_id> items to DynamoDB
-    stop_routes_count = 0
-    with table.batch_writer() as writer:
-        for stop_id, route_info_set in stop_routes_map.items():
-            route_list = [{'route_id': r[0], 'headsign': r[1]} for r in route_info_set]
-            writer.put_item(Item={
-                'PK': f"STOP_ROUTES#{stop_id}",
-                'Routes': route_list,
-                'type': 'STOP_ROUTE_MAP'
-            })
-            stop_routes_count += 1
-            if stop_routes_count % 500 == 0: time.sleep(0.1)
-
-    return {"status": "SUCCESS", "stops_processed": stops_count, "trips_processed": trips_count, "stop_routes_processed": stop_routes_count}
\ No newline at end of file
+    with timings.stage('Download'):
+        r = s.get(STATIC_URL, headers=headers, stream=True)
+        if r.status_code != 200:
+            return {"status": "FAIL", "reason": r.text[:200]}
+        # Streamed to a spooled file under /tmp; ZipFile reads members from it lazily
+        archive, archive_bytes = download_to_spool(r)
+    print(f"Downloaded {archive_bytes} bytes")
+
+    with timings.stage('ManifestRead'):
+        previous, previous_blobs = load_manifest()
+    # {"full": true} rewrites every item, e.g. after a change to how items are encoded. The unknown
+    # fingerprints reach the manifest with the first flush, so continuations don't pass it on.
+    if event.get('full'): previous = dict.fromkeys(previous)
+    diff = ManifestDiff(previous, previous_blobs, MANIFEST_FLUSH_SECONDS)
+
+    z = zipfile.ZipFile(archive)
+    target_wcu = target_write_units()
+    # Only writes that land reach the manifest, so failed ones are retried by the next run
+    writer = BulkWriter(dynamodb.meta.client, DYNAMO_TABLE, target_wcu, WRITE_WORKERS, TypeSerializer(), on_written=diff.landed)
+
+    def write_changed(items):
+        before = len(diff.current)
+        writer.write(diff.changed(items, writer.write))
+        diff.flush(writer.write)
+        return len(diff.current) - before
+
+    budget = TimeBudget(context.get_remaining_time_in_millis, TIME_RESERVE_SECONDS) if context else None
+    try:
+        counts = run_pipeline(z, write_changed, timings, budget)
+        # Removed items go last, once nothing written above points at them
+        if not (budget and budget.exhausted):
+            with timings.stage('DeleteRemoved'):
+                counts['deleted'] = writer.delete(budget.guard(diff.removed()) if budget else diff.removed())
+                diff.flush(writer.write)
+        counts['unchanged'] = diff.unchanged
+        counts['put'] = len(diff.current) - diff.unchanged
+        counts['manifest_chunks_written'] = diff.chunks_written
+    finally:
+        writer.close()
+        z.close()
+        archive.close()
+    writes = dict(writer.stats.as_dict(), target_wcu=target_wcu)
+    print(f"Static ingest stage timings (s): {json.dumps(timings.stages)}")
+    print(f"Static ingest writes: {json.dumps(writes)}")
+    status = "SUCCESS" if not writes['failed'] else "PARTIAL"
+    if budget and budget.exhausted:
+        resume = int(event.get('resume', 0)) + 1
+        status = "CONTINUED" if continue_load(context, resume, version) else "PARTIAL"
+        counts['resume'] = resume
+    # Even a partial load has replaced items, so cached copies of them are stale either way
+    if status != "CONTINUED": publish_version(version)
+    return {"status": status, "version": version, **counts, "timings": timings.stages, "writes": writes}
@@ -0,0 +1,162 @@
+"""
+Fingerprint manifest of the items the last static ingest wrote.
+
+Every item the pipeline produces gets a content fingerprint: a 64-bit blake2b
+of its canonical JSON, with binary attributes as hex. The fingerprints of what
+the table holds are kept in DynamoDB, split by item kind (the PK up to '#'):
+
+    STATIC_MANIFEST#<kind>#<n>   {'Manifest': zlib(json {PK: fingerprint}), 'chunks': MANIFEST_CHUNKS[kind]}
+
+with each PK in chunk crc32(PK) % MANIFEST_CHUNKS[kind]. Every chunk stays far
+below the 400 KB item limit (~24k entries for a GRT-sized feed, at most ~35 KB
+per chunk), and only chunks whose content changed are written back.
+
+The manifest is persisted progressively rather than once at the end. A
+fingerprint is recorded only when BulkWriter reports that its put landed
+(landed() is its on_written callback), and the changed chunks are flushed
+after every stage and every `flush_seconds` within one. A run that dies part
+way through still leaves a manifest that is true of the table, and the next
+run skips whatever already landed. Splitting by kind keeps those flushes
+cheap: while TRIP_STOP_TIMES# items stream in, only that kind's chunks change.
+
+The next ingest diffs the new feed against it. ManifestDiff.changed() passes
+on only items that are new or whose fingerprint changed, and removed() lists
+the PKs the new feed no longer produces (old trips, their stop times, stops
+taken out of service) so they can be deleted in the same run.
+
+A fingerprint of None means "present, content unknown": the item is rewritten,
+and it's still deleted if the new feed doesn't have it. That is how a table
+written before the manifest existed (seeded from a PK scan) and forced full
+reloads are handled.
+"""
+import hashlib, json, threading, time, zlib
+from zlib import crc32
+
+# Chunks per item kind; the big kinds are split so each chunk stays a few dozen KB
+MANIFEST_CHUNKS = {'STOP': 1, 'TRIP': 4, 'TRIP_STOP_TIMES': 4, 'STOP_ROUTES': 1, 'STOP_SCHEDULE': 1, 'STOP_INDEX': 1}
+MANIFEST_PREFIX = 'STATIC_MANIFEST#'
+
+# PK prefixes the static pipeline owns; anything else in the table is never diffed or deleted
+OWNED_PREFIXES = ('STOP#', 'TRIP#', 'TRIP_STOP_TIMES#', 'STOP_ROUTES#', 'STOP_SCHEDULE#', 'STOP_INDEX')
+
+
+def _json_default(value):
+    if isinstance(value, (bytes, bytearray)): return value.hex()
+    if hasattr(value, 'value'): return _json_default(value.value)  # boto3 Binary
+    return str(value)
+
+
+def fingerprint(item):
+    canonical = json.dumps(item, sort_keys=True, separators=(',', ':'), default=_json_default)
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def chunk_key(kind, n):
+    return f"{MANIFEST_PREFIX}{kind}#{n}"
+
+
+def _chunks_of(key):
+    return MANIFEST_CHUNKS[key[len(MANIFEST_PREFIX):].split('#', 1)[0]]
+
+
+def chunk_keys():
+    return [chunk_key(kind, n) for kind, chunks in MANIFEST_CHUNKS.items() for n in range(chunks)]
+
+
+def chunk_for(pk):
+    kind = pk.split('#', 1)[0]
+    return chunk_key(kind, crc32(pk.encode('utf-8')) % MANIFEST_CHUNKS[kind])
+
+
+def encode_manifest(fingerprints):
+    """{PK: fingerprint} -> {chunk key: zlib blob} for every chunk, empty ones included."""
+    split = {key: {} for key in chunk_keys()}
+    for pk, fp in fingerprints.items(): split[chunk_for(pk)][pk] = fp
+    return {key: zlib.compress(json.dumps(entries, sort_keys=True, separators=(',', ':')).encode('utf-8'), 9)
+            for key, entries in split.items()}
+
+
+def decode_chunk(blob):
+    return json.loads(zlib.decompress(blob))
+
+
+def read_manifest(found):
+    """{PK: item} as read from the table -> ({PK: fingerprint}, {chunk key: blob}), or None unless every chunk is there."""
+    blobs = {}
+    for key in chunk_keys():
+        item = found.get(key)
+        if not item or item.get('chunks') != _chunks_of(key): return None
+        blobs[key] = getattr(item['Manifest'], 'value', item['Manifest'])
+    stored = {}
+    for blob in blobs.values(): stored.update(decode_chunk(blob))
+    return stored, blobs
+
+
+def is_owned(pk):
+    return pk.startswith(OWNED_PREFIXES)
+
+
+class ManifestDiff:
+    """
+    stored is what the table holds as far as the manifest knows ({PK: fingerprint or None}),
+    blobs the chunks as they were read. Both are kept up to date as writes land.
+    """
+
+    def __init__(self, stored, blobs=None, flush_seconds=300):
+        self.stored = stored
+        self.blobs = dict(blobs or {})
+        self.current = {}           # {PK: fingerprint} of this load, filled as items stream through
+        self.unchanged = 0
+        self.flush_seconds = flush_seconds
+        self.flushed_at = time.monotonic()
+        self.chunks_written = 0
+        self._pending = {}          # PK -> fingerprint (or chunk key -> blob) handed to the writer, not yet landed
+        self._lock = threading.Lock()
+
+    def changed(self, items, flush=None):
+        """
+        Records every item's fingerprint and yields only the ones that need a put. With flush
+        (the writer's write_items), the manifest is also written every flush_seconds.
+        """
+        for item in items:
+            if flush and time.monotonic() - self.flushed_at >= self.flush_seconds: self.flush(flush)
+            pk, fp = item['PK'], fingerprint(item)
+            self.current[pk] = fp
+            with self._lock:
+                old = self.stored.get(pk)
+                if old is not None and old == fp:
+                    self.unchanged += 1
+                    continue
+                self._pending[pk] = fp
+            yield item
+
+    def landed(self, pks, deleted=False):
+        """BulkWriter's on_written callback; runs on its worker threads."""
+        with self._lock:
+            for pk in pks:
+                if deleted:
+                    self.stored.pop(pk, None)
+                    continue
+                value = self._pending.pop(pk, None)
+                if value is None: continue
+                if pk.startswith(MANIFEST_PREFIX): self.blobs[pk] = value
+                else: self.stored[pk] = value
+
+    def removed(self):
+        with self._lock:
+            return [pk for pk in self.stored if pk not in self.current and is_owned(pk)]
+
+    def changed_chunks(self):
+        """Manifest items whose content differs from what is stored."""
+        with self._lock:
+            items = [{'PK': key, 'Manifest': blob, 'chunks': _chunks_of(key), 'type': 'STATIC_MANIFEST'}
+                     for key, blob in encode_manifest(self.stored).items() if self.blobs.get(key) != blob]
+            self._pending.update((item['PK'], item['Manifest']) for item in items)
+        return items
+
+    def flush(self, write_items):
+        """Writes the chunks that changed since the last flush; returns how many."""
+        items = self.changed_chunks()
+        if items: self.chunks_written += write_items(items)
+        self.flushed_at = time.monotonic()
+        return len(items)
@@ -0,0 +1,208 @@
+"""
+Single-pass static GTFS pipeline.
+
+The archive is opened once and each member is parsed once: stops.txt and
+trips.txt into small in-memory maps, then one streaming pass over
+stop_times.txt (by far the largest file) that fills every per-stop and per-trip
+structure at the same time (rows come from gtfs_csv as tuples, not dicts).
+All derived items come out of that one parse:
+
+    STOP#<code>                 stop position and name
+    TRIP#<trip_id>              route, headsign and block
+    TRIP_STOP_TIMES#<trip_id>   the trip's stops in stop_sequence order
+    STOP_ROUTES#<stop_id>       routes serving the stop, with its TripIndex
+    STOP_SCHEDULE#<stop_id>     departures per route (ScheduleIndex)
+    STOP_INDEX                  every stop for nearest-stop queries
+
+This replaces GRT_Stop_Times_Ingest (a second download and parse of
+stop_times.txt) and GRT_Stop_Schedule (a scan of TRIP_STOP_TIMES# plus one
+get_item per trip to rebuild what had just been parsed), and with them the
+ordering race between the three Lambdas.
+
+Each stage's wall time is recorded in StageTimings so the handler can log it.
+A TimeBudget can cut the writes short when the invocation runs low on time; the
+handler then hands the rest to a fresh invocation (see lambda_function).
+"""
+import time
+from contextlib import contextmanager
+from stop_index import time_to_seconds, encode_trip_index, encode_schedule_index, encode_stops_index
+from gtfs_csv import gtfs_rows
+
+
+class StageTimings:
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = round(self.stages.get(name, 0.0) + time.perf_counter() - start, 3)
+
+
+class TimeBudget:
+    """
+    Stops handing out items once the invocation is down to reserve_seconds, which must cover
+    draining the writes already in flight, the last manifest flush and the hand-over.
+    remaining_ms is e.g. the Lambda context's get_remaining_time_in_millis.
+    """
+
+    def __init__(self, remaining_ms, reserve_seconds):
+        self.remaining_ms = remaining_ms
+        self.reserve_ms = reserve_seconds * 1000
+        self.exhausted = False
+
+    def guard(self, items):
+        for item in items:
+            if self.remaining_ms() < self.reserve_ms:
+                self.exhausted = True
+                return
+            yield item
+
+
+class StaticFeed:
+    """Everything the derived items need, from one read of each member."""
+
+    def __init__(self):
+        self.stops = []             # (code, stop_id, name, lat, lon) in file order
+        self.trips = {}             # trip_id -> (route_id, headsign, block_id)
+        self.trip_stop_times = {}   # trip_id -> [(stop_sequence, stop_id, arrival_time)]
+        self.stop_routes = {}       # stop_id -> {(route_id, headsign)}
+        self.stop_trips = {}        # stop_id -> {trip_id: [(stop_sequence, arrival_seconds)]}
+        self.stop_schedule = {}     # stop_id -> {(route_id, headsign): [arrival_seconds]}
+        self.stop_times_rows = 0
+
+
+def _rows(z, name, columns):
+    with z.open(name) as f:
+        yield from gtfs_rows(f, columns)
+
+
+def parse_feed(z, timings):
+    feed = StaticFeed()
+    with timings.stage('ParseStops'):
+        for stop_id, stop_code, name, lat, lon in _rows(z, 'stops.txt', ('stop_id', 'stop_code', 'stop_name', 'stop_lat', 'stop_lon')):
+            code = stop_code or stop_id
+            if not code: continue
+            feed.stops.append((code, stop_id, name, lat, lon))
+
+    with timings.stage('ParseTrips'):
+        for trip_id, route_id, headsign, block_id in _rows(z, 'trips.txt', ('trip_id', 'route_id', 'trip_headsign', 'block_id')):
+            if trip_id and route_id:
+                feed.trips[trip_id] = (route_id, headsign, block_id)
+
+    with timings.stage('ParseStopTimes'):
+        trips, trip_stop_times = feed.trips, feed.trip_stop_times
+        stop_routes, stop_trips, stop_schedule = feed.stop_routes, feed.stop_trips, feed.stop_schedule
+        for trip_id, stop_id, arrival_time, stop_sequence in _rows(z, 'stop_times.txt', ('trip_id', 'stop_id', 'arrival_time', 'stop_sequence')):
+            feed.stop_times_rows += 1
+            if not trip_id or not stop_id: continue
+            sequence = int(stop_sequence) if stop_sequence else None
+            if arrival_time and sequence is not None:
+                trip_stop_times.setdefault(trip_id, []).append((sequence, stop_id, arrival_time))
+
+            trip = trips.get(trip_id)
+            if not trip: continue
+            route_id, headsign, _ = trip
+            if stop_id not in stop_routes:
+                stop_routes[stop_id] = set()
+                stop_trips[stop_id] = {}
+            stop_routes[stop_id].add((route_id, headsign))
+
+            arrival = time_to_seconds(arrival_time)
+            if arrival is None or sequence is None: continue
+            stop_trips[stop_id].setdefault(trip_id, []).append((sequence, arrival))
+            if headsign:
+                stop_schedule.setdefault(stop_id, {}).setdefault((route_id, headsign), []).append(arrival)
+    return feed
+
+
+def stop_items(feed):
+    for code, _, name, lat, lon in feed.stops:
+        yield {'PK': f"STOP#{code}", 'lat': lat, 'lon': lon, 'name': name, 'type': 'STATIC_STOP'}
+
+
+def trip_items(feed):
+    for trip_id, (route_id, headsign, block_id) in feed.trips.items():
+        yield {'PK': f"TRIP#{trip_id}", 'headsign': headsign, 'route_id': route_id, 'block_id': block_id, 'type': 'STATIC_TRIP'}
+
+
+def trip_stop_times_items(feed):
+    for trip_id, stop_times in feed.trip_stop_times.items():
+        stop_times.sort(key=lambda st: st[0])
+        yield {
+            'PK': f"TRIP_STOP_TIMES#{trip_id}",
+            'StopTimes': [{'stop_id': stop_id, 'arrival_time': arrival_time, 'stop_sequence': seq} for seq, stop_id, arrival_time in stop_times],
+            'type': 'TRIP_STOP_TIMES',
+        }
+
+
+def stop_routes_items(feed):
+    for stop_id, route_info_set in feed.stop_routes.items():
+        item = {
+            'PK': f"STOP_ROUTES#{stop_id}",
+            # Sorted so an unchanged stop fingerprints the same on every run (set order follows the hash seed)
+            'Routes': [{'route_id': r, 'headsign': h} for r, h in sorted(route_info_set, key=lambda rh: (rh[0], rh[1] or ''))],
+            'type': 'STOP_ROUTE_MAP',
+        }
+        trip_index = encode_trip_index(feed.stop_trips[stop_id])
+        if trip_index: item['TripIndex'] = trip_index
+        else: print(f"TripIndex for stop {stop_id} too large; reader will use TRIP_STOP_TIMES")
+        yield item
+
+
+def stop_schedule_items(feed):
+    for stop_id, schedule in feed.stop_schedule.items():
+        yield {'PK': f"STOP_SCHEDULE#{stop_id}", 'ScheduleIndex': encode_schedule_index(schedule)}
+
+
+def stop_index_item(feed):
+    """The STOP_INDEX item, or None when it doesn't fit in one item."""
+    indexed_stops = []
+    for code, stop_id, name, lat, lon in feed.stops:
+        try:
+            float(lat), float(lon)
+        except (TypeError, ValueError):
+            continue
+        route_ids = sorted({r for r, _ in feed.stop_routes.get(stop_id, ())}, key=lambda r: (len(r), r))
+        indexed_stops.append((code, name, lat, lon, route_ids))
+    stops_index = encode_stops_index(indexed_stops)
+    if not stops_index: return None
+    return {'PK': 'STOP_INDEX', 'Index': stops_index, 'count': len(indexed_stops), 'type': 'STOP_INDEX'}
+
+
+def stop_index_items(feed):
+    item = stop_index_item(feed)
+    if item: yield item
+    else: print("STOP_INDEX too large for one item; nearest-stop queries stay unavailable")
+
+
+# What the reader serves from goes first: stops, trips and the per-stop indexes (STOP_ROUTES# carries each
+# stop's TripIndex). TRIP_STOP_TIMES# is over half of a full load's WCU and is only read by GRT_Ingest's
+# arrivals and by the reader for stops whose TripIndex didn't fit, so it goes last and a full load may
+# finish it in a later invocation; until then, those lookups miss for trips whose stop times haven't landed.
+STAGES = (
+    ('WriteStops', 'stops_processed', stop_items),
+    ('WriteTrips', 'trips_processed', trip_items),
+    ('WriteStopRoutes', 'stop_routes_processed', stop_routes_items),
+    ('WriteStopSchedules', 'stop_schedules_processed', stop_schedule_items),
+    ('WriteStopIndex', 'stop_index_processed', stop_index_items),
+    ('WriteTripStopTimes', 'trip_stop_times_processed', trip_stop_times_items),
+)
+
+
+def run_pipeline(z, write_items, timings, budget=None):
+    """
+    Parses the open ZipFile once and hands each stage's items to write_items(items),
+    which returns how many it wrote. Returns the per-entity counts. With a TimeBudget,
+    stops early once it's exhausted (budget.exhausted tells the caller).
+    """
+    feed = parse_feed(z, timings)
+    counts = {'stop_times_rows': feed.stop_times_rows}
+    for stage, count_key, items in STAGES:
+        if budget and budget.exhausted: break
+        with timings.stage(stage):
+            counts[count_key] = write_items(budget.guard(items(feed)) if budget else items(feed))
+    return counts
@@ -0,0 +1,131 @@
+"""
+Per-stop lookup indexes, decoded once per warm container by GRT_Reader.
+
+TripIndex attribute of STOP_ROUTES#<stop_id>, the inverted trip index:
+
+    {trip_id: [stop_sequence, arrival_seconds, stop_sequence, arrival_seconds, ...]}
+
+One pair per visit of the trip to the stop (loop routes can visit twice), in
+stop_sequence order, so live buses are matched with a dict lookup instead of
+reading TRIP_STOP_TIMES#.
+
+ScheduleIndex attribute of STOP_SCHEDULE#<stop_id>, the departures per route:
+
+    [[route_id, headsign, [first_seconds, delta, delta, ...]], ...]
+
+Each route key's arrivals are sorted and delta-encoded; next departures are a
+bisect away. All times are seconds after midnight of the service day, so GTFS
+times past midnight such as 25:10:00 stay ordered.
+
+Index attribute of the single STOP_INDEX item, every stop as parallel columns:
+
+    {"ids": [...], "names": [...], "lat": [degrees * 1e5], "lon": [degrees * 1e5], "routes": [[route_id, ...]]}
+
+which the reader loads into arrays and a grid for nearest-stop queries.
+All indexes are stored as zlib-compressed JSON.
+
+Copies of this module ship in pkg_static and pkg_reader, kept identical by pkg_reader/test_shared_modules.py.
+"""
+import json, zlib
+from array import array
+from bisect import bisect_right
+from heapq import merge
+from itertools import accumulate, islice
+
+DAY = 24 * 3600
+
+# DynamoDB items max out at 400 KB; leave room for the other attributes
+MAX_INDEX_BYTES = 350 * 1024
+_COORD_SCALE = 100000
+
+
+def time_to_seconds(value):
+    """'HH:MM:SS' (hours may exceed 23) -> seconds after midnight, or None."""
+    try:
+        h, m, s = value.split(':')
+        return int(h) * 3600 + int(m) * 60 + int(s)
+    except (AttributeError, ValueError):
+        return None
+
+
+def seconds_to_time(secs):
+    return f"{secs // 3600:02d}:{secs % 3600 // 60:02d}:{secs % 60:02d}"
+
+
+def encode_trip_index(visits):
+    """visits: {trip_id: [(stop_sequence, arrival_seconds), ...]} -> bytes, or None if too big for one item."""
+    flat = {trip_id: [v for pair in sorted(pairs) for v in pair] for trip_id, pairs in visits.items()}
+    blob = zlib.compress(json.dumps(flat, separators=(',', ':')).encode('utf-8'), 9)
+    return blob if len(blob) <= MAX_INDEX_BYTES else None
+
+
+def decode_trip_index(blob):
+    return json.loads(zlib.decompress(blob))
+
+
+def lookup_trip(index, trip_id, current_sequence):
+    """(stop_sequence, arrival_seconds) of this trip's next visit to the stop, or (None, None)."""
+    visits = index.get(trip_id)
+    if not visits: return None, None
+    current = int(current_sequence) if current_sequence else 0
+    for i in range(0, len(visits), 2):
+        if visits[i] >= current: return visits[i], visits[i + 1]
+    return None, None
+
+
+def encode_schedule_index(schedule):
+    """schedule: {(route_id, headsign): [arrival_seconds, ...]} -> bytes."""
+    entries = []
+    for (route_id, headsign), times in sorted(schedule.items()):
+        times = sorted(times)
+        entries.append([route_id, headsign, [b - a for a, b in zip([0] + times, times)]])
+    return zlib.compress(json.dumps(entries, separators=(',', ':')).encode('utf-8'), 9)
+
+
+def decode_schedule_index(blob):
+    return {(route_id, headsign): list(accumulate(deltas)) for route_id, headsign, deltas in json.loads(zlib.decompress(blob))}
+
+
+def schedule_index_from_list(schedule):
+    """Index for a STOP_SCHEDULE# item written before ScheduleIndex existed ([{r, h, t}, ...])."""
+    index = {}
+    for entry in schedule:
+        secs = time_to_seconds(entry.get('t'))
+        if secs is not None: index.setdefault((entry['r'], entry['h']), []).append(secs)
+    for times in index.values(): times.sort()
+    return index
+
+
+def next_departures(times, now_secs, n=1):
+    """The next n departures after now_secs (0 <= now_secs < DAY) from a sorted list of service-day seconds.
+
+    Trips of yesterday's service day that run past midnight count as today (25:10 is 01:10),
+    and once today's service is over the list wraps to tomorrow, so results can fall outside
+    [0, DAY); format them with seconds_to_time(t % DAY).
+    """
+    today = (times[i] for i in range(bisect_right(times, now_secs), len(times)))
+    after_midnight = (times[i] - DAY for i in range(bisect_right(times, now_secs + DAY), len(times)))
+    upcoming = list(islice(merge(today, after_midnight), n))
+    if len(upcoming) < n: upcoming += [t + DAY for t in times[:n - len(upcoming)]]
+    return upcoming
+
+
+def encode_stops_index(stops):
+    """stops: [(stop_id, name, lat, lon, [route_id, ...])] -> bytes, or None if too big for one item."""
+    columns = {'ids': [], 'names': [], 'lat': [], 'lon': [], 'routes': []}
+    for stop_id, name, lat, lon, routes in stops:
+        columns['ids'].append(stop_id)
+        columns['names'].append(name)
+        columns['lat'].append(round(float(lat) * _COORD_SCALE))
+        columns['lon'].append(round(float(lon) * _COORD_SCALE))
+        columns['routes'].append(list(routes))
+    blob = zlib.compress(json.dumps(columns, separators=(',', ':')).encode('utf-8'), 9)
+    return blob if len(blob) <= MAX_INDEX_BYTES else None
+
+
+def decode_stops_index(blob):
+    """Parallel columns; lat and lon come back as array('d') of degrees."""
+    columns = json.loads(zlib.decompress(blob))
+    columns['lat'] = array('d', (v / _COORD_SCALE for v in columns['lat']))
+    columns['lon'] = array('d', (v / _COORD_SCALE for v in columns['lon']))
+    return columns
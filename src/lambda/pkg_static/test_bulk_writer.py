@@ -0,0 +1,73 @@
+import threading
+import time
+import unittest
+
+from bulk_writer import BulkWriter, TokenBucket
+
+
+class Throttled(Exception):
+    response = {'Error': {'Code': 'ProvisionedThroughputExceededException'}}
+
+
+class FakeClient:
+    """Writes at most `per_call` items per request (1 WCU each) and throttles the first `throttle_first` calls."""
+
+    def __init__(self, per_call=25, throttle_first=0):
+        self.per_call, self.throttle_first = per_call, throttle_first
+        self.calls = 0
+        self.table = {}
+        self.lock = threading.Lock()
+
+    def batch_write_item(self, RequestItems, ReturnConsumedCapacity=None):
+        requests = RequestItems['T']
+        assert len(requests) <= 25
+        keys = [r['PutRequest']['Item']['PK'] for r in requests]
+        assert len(keys) == len(set(keys)), "duplicate key in one request"
+        with self.lock:
+            self.calls += 1
+            if self.calls <= self.throttle_first: raise Throttled()
+            written, rest = requests[:self.per_call], requests[self.per_call:]
+            for r in written: self.table[r['PutRequest']['Item']['PK']] = r['PutRequest']['Item']
+        response = {'ConsumedCapacity': [{'TableName': 'T', 'CapacityUnits': float(len(written))}]}
+        if rest: response['UnprocessedItems'] = {'T': rest}
+        return response
+
+
+class TestBulkWriter(unittest.TestCase):
+
+    def test_everything_is_written_through_throttling(self):
+        client = FakeClient(per_call=20, throttle_first=2)
+        landed = []
+        writer = BulkWriter(client, 'T', target_wcu=100000, workers=3, base_delay=0.001, on_written=lambda pks, deleted: landed.extend(pks))
+        items = [{'PK': f"TRIP#{i}", 'n': i} for i in range(300)] + [{'PK': 'TRIP#0', 'n': 'again'}]  # goes in its own request
+        self.assertEqual(writer.write(items), 301)
+        writer.close()
+        self.assertEqual(len(client.table), 300)
+        self.assertEqual(sorted(landed), sorted([f"TRIP#{i}" for i in range(300)] + ['TRIP#0']))
+        stats = writer.stats.as_dict()
+        self.assertEqual((stats['items'], stats['failed'], stats['throttled'], stats['consumed_wcu']), (301, 0, 2, 301.0))
+        self.assertGreater(stats['retries'], 2)  # the throttled calls plus every request's 5 unprocessed items
+        self.assertGreater(stats['items_per_second'], 0)
+
+    def test_gives_up_and_counts_failures(self):
+        client = FakeClient(per_call=0)
+        landed = []
+        writer = BulkWriter(client, 'T', target_wcu=100000, workers=1, max_attempts=3, base_delay=0.001, on_written=lambda pks, deleted: landed.extend(pks))
+        writer.write([{'PK': 'A'}, {'PK': 'B'}])
+        writer.close()
+        self.assertEqual((writer.stats.failed, writer.stats.calls, writer.stats.retries), (2, 3, 2))
+        self.assertEqual(landed, [])
+
+    def test_token_bucket_paces_and_backs_off(self):
+        bucket = TokenBucket(1000)
+        bucket.acquire(1000)  # the initial second's worth
+        start = time.monotonic()
+        bucket.acquire(100)
+        self.assertGreaterEqual(time.monotonic() - start, 0.08)
+        bucket.throttled()
+        self.assertEqual(bucket.rate, 500)
+        for _ in range(20): bucket.succeeded()
+        self.assertEqual(bucket.rate, 1000)
+
+if __name__ == '__main__':
+    unittest.main()
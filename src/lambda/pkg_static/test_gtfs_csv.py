@@ -0,0 +1,29 @@
+import csv
+import io
+import unittest
+
+from gtfs_csv import gtfs_rows
+
+
+def rows(text, columns):
+    return list(gtfs_rows(io.BytesIO(text.encode('utf-8')), columns))
+
+
+class TestGtfsCsv(unittest.TestCase):
+
+    def test_columns_by_name_in_any_order(self):
+        text = '\ufeffstop_id, stop_name ,stop_lat,agency_extra\r\n1,"Charles, ""Terminal""",43.45,x\r\n\r\n2,Victoria Park,43.44\r\n'
+        self.assertEqual(rows(text, ('stop_name', 'stop_id')), [('Charles, "Terminal"', '1'), ('Victoria Park', '2')])
+        # A column the file lacks and a short row both read as None, like DictReader
+        self.assertEqual(rows(text, ('stop_id', 'stop_code', 'agency_extra')), [('1', None, 'x'), ('2', None, None)])
+        self.assertEqual(rows(text, ('stop_id',)), [('1',), ('2',)])
+        self.assertEqual(rows('', ('stop_id',)), [])
+
+    def test_matches_dict_reader(self):
+        text = 'trip_id,arrival_time,stop_id,stop_sequence,timepoint_note\n10,08:00:00,1,1,"a\nb"\n10,,2,2,\n11,25:10:00,3,1,x\n'
+        columns = ('trip_id', 'stop_id', 'arrival_time', 'stop_sequence')
+        expected = [tuple(row.get(c) for c in columns) for row in csv.DictReader(io.StringIO(text))]
+        self.assertEqual(rows(text, columns), expected)
+
+if __name__ == '__main__':
+    unittest.main()
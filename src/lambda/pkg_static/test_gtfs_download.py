@@ -0,0 +1,42 @@
+import io
+import unittest
+import zipfile
+
+from gtfs_download import download_to_spool, count_lines
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content, self.closed = content, False
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+class TestGtfsDownload(unittest.TestCase):
+
+    def test_spool_rolls_over_to_disk(self):
+        content = bytes(range(256)) * 400
+        response = FakeResponse(content)
+        spool, size = download_to_spool(response, max_size=10000, chunk_size=4096)
+        with spool:
+            self.assertEqual(size, len(content))
+            self.assertTrue(response.closed)
+            self.assertTrue(spool._rolled)  # past max_size it lives in a file, not in memory
+            self.assertEqual(spool.read(), content)
+
+    def test_count_lines(self):
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, 'w') as z:
+            z.writestr('a.txt', 'h\r\n1\r\n2\r\n')
+            z.writestr('b.txt', 'h\n1\n2')
+            z.writestr('c.txt', '')
+        with zipfile.ZipFile(buf) as z:
+            self.assertEqual([count_lines(z, n) for n in ('a.txt', 'b.txt', 'c.txt')], [3, 3, 0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import io
+import json
+import sys
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch, MagicMock
+
+# Mock AWS; FakeResource below stands in for the table
+sys.modules['boto3'] = MagicMock()
+sys.modules['boto3.dynamodb'] = MagicMock()
+sys.modules['boto3.dynamodb.types'] = MagicMock()
+
+import os
+os.environ['DYNAMO_TABLE'] = 'TestTable'
+
+import lambda_function
+from test_static_manifest import feed_zip
+
+
+class PlainSerializer:
+    def serialize(self, value):
+        return value
+
+
+class FakeClient:
+    def __init__(self):
+        self.items = {}
+        self.puts = []
+
+    def batch_write_item(self, RequestItems, ReturnConsumedCapacity=None):
+        for request in RequestItems['TestTable']:
+            if 'PutRequest' in request:
+                item = request['PutRequest']['Item']
+                self.items[item['PK']] = item
+                self.puts.append(item['PK'])
+            else:
+                self.items.pop(request['DeleteRequest']['Key']['PK'], None)
+        return {'ConsumedCapacity': [{'TableName': 'TestTable', 'CapacityUnits': float(len(RequestItems['TestTable']))}]}
+
+
+class FakeResource:
+    def __init__(self):
+        self.meta = MagicMock(client=FakeClient())
+
+    def batch_get_item(self, RequestItems):
+        items = self.meta.client.items
+        return {'Responses': {'TestTable': [items[k['PK']] for k in RequestItems['TestTable']['Keys'] if k['PK'] in items]}}
+
+
+class Context:
+    """Every put takes a second; the invocation runs into its reserve after `puts` of them."""
+    function_name = 'GRT_Static_Ingest'
+
+    def __init__(self, client, puts):
+        self.client, self.start = client, len(client.puts)
+        self.budget_ms = (lambda_function.TIME_RESERVE_SECONDS + puts - 0.5) * 1000
+
+    def get_remaining_time_in_millis(self):
+        return self.budget_ms - (len(self.client.puts) - self.start) * 1000
+
+
+class TestStaticIngest(unittest.TestCase):
+
+    def setUp(self):
+        self.resource = FakeResource()
+        self.lambda_client = MagicMock()
+        archive = feed_zip().fp.getvalue()
+        response = MagicMock(status_code=200)
+        response.iter_content.side_effect = lambda chunk_size: iter([archive])
+        for name, value in (('dynamodb', self.resource), ('lambda_client', self.lambda_client), ('TypeSerializer', PlainSerializer),
+                            ('WRITE_CAPACITY_UNITS', '100000'), ('requests', MagicMock())):
+            patcher = patch.object(lambda_function, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        lambda_function.requests.Session.return_value.get.return_value = response
+        lambda_function.table.reset_mock()
+        lambda_function.table.scan.side_effect = lambda **kwargs: {'Items': [{'PK': pk} for pk in self.resource.meta.client.items]}
+
+    def run_chain(self, event, puts_per_invocation):
+        """Runs the handler, then every continuation it asks for; returns the results."""
+        results = []
+        while event is not None:
+            self.lambda_client.invoke.reset_mock()
+            with redirect_stdout(io.StringIO()):
+                results.append(lambda_function.lambda_handler(event, Context(self.resource.meta.client, puts_per_invocation)))
+            calls = self.lambda_client.invoke.call_args_list
+            if calls:
+                self.assertEqual(calls[0].kwargs['InvocationType'], 'Event')
+                self.assertEqual(json.loads(calls[0].kwargs['Payload'])['version'], results[0]['version'])
+            event = json.loads(calls[0].kwargs['Payload']) if calls else None
+        return results
+
+    def test_load_continues_across_invocations_until_done(self):
+        client = self.resource.meta.client
+        client.items['TRIP#old'] = {'PK': 'TRIP#old'}
+        results = self.run_chain({'version': 'v2'}, puts_per_invocation=4)
+        self.assertEqual([r['status'] for r in results], ['CONTINUED'] * (len(results) - 1) + ['SUCCESS'])
+        # Readers see the new version once, after the last continuation
+        lambda_function.table.update_item.assert_called_once()
+        self.assertEqual(lambda_function.table.update_item.call_args.kwargs['ExpressionAttributeValues'][':v'], 'v2')
+        self.assertEqual([r.get('resume') for r in results], list(range(1, len(results))) + [None])
+        self.assertGreater(len(results), 2)
+        # Nothing is written twice, the index stages land first and the stale trip goes once the rest is in
+        puts = [pk for pk in client.puts if not pk.startswith('STATIC_MANIFEST#')]
+        self.assertEqual(len(puts), len(set(puts)))
+        self.assertEqual(puts[:4], ['STOP#1001', 'STOP#1002', 'TRIP#t1', 'TRIP#t2'])
+        self.assertEqual(puts[-2:], ['TRIP_STOP_TIMES#t1', 'TRIP_STOP_TIMES#t2'])
+        self.assertNotIn('TRIP#old', client.items)
+        self.assertEqual(results[-1]['deleted'], 1)
+
+        # The manifest now covers everything: a refresh puts nothing
+        client.puts.clear()
+        lambda_function.table.update_item.reset_mock()
+        self.assertEqual(self.run_chain({}, puts_per_invocation=4)[0]['unchanged'], 11)
+        self.assertEqual(client.puts, [])
+
+    def test_gives_up_after_max_resumes(self):
+        with patch.object(lambda_function, 'MAX_RESUMES', 1):
+            results = self.run_chain({}, puts_per_invocation=2)
+        self.assertEqual([r['status'] for r in results], ['CONTINUED', 'PARTIAL'])
+        # A manual run names its own version and the continuation keeps it
+        self.assertTrue(results[0]['version'].startswith('manual-'))
+        self.assertEqual(results[1]['version'], results[0]['version'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import io
+import unittest
+import zipfile
+
+from static_manifest import ManifestDiff, chunk_keys, encode_manifest, fingerprint, is_owned, read_manifest
+from static_pipeline import StageTimings, run_pipeline
+
+STOPS = 'stop_id,stop_code,stop_name,stop_lat,stop_lon\n1,1001,Charles Terminal,43.45,-80.49\n2,1002,Victoria Park,43.44,-80.50\n'
+TRIPS = 'route_id,service_id,trip_id,trip_headsign,block_id\n7,WKDY,t1,Conestoga Station,b1\n7,WKDY,t2,Conestoga Station,b1\n'
+STOP_TIMES = 'trip_id,arrival_time,departure_time,stop_id,stop_sequence\nt1,08:00:00,08:00:00,1,1\nt1,08:05:00,08:05:00,2,2\nt2,09:00:00,09:00:00,1,1\n'
+
+
+def feed_zip(stops=STOPS, trips=TRIPS, stop_times=STOP_TIMES):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as z:
+        z.writestr('stops.txt', stops)
+        z.writestr('trips.txt', trips)
+        z.writestr('stop_times.txt', stop_times)
+    return zipfile.ZipFile(io.BytesIO(buf.getvalue()))
+
+
+class FakeTable:
+    """Keeps what lands and tells the diff, like BulkWriter's on_written. A write of
+    fail_at raises (the run dies there); PKs in drop are silently never written."""
+
+    def __init__(self):
+        self.items = {}
+        self.puts = []
+        self.fail_at, self.drop = None, set()
+
+    def load(self, z, full=False, flush_seconds=300):
+        manifest = read_manifest(self.items) or (dict.fromkeys(pk for pk in self.items if is_owned(pk)), {})
+        stored, blobs = manifest
+        diff = ManifestDiff(dict.fromkeys(stored) if full else stored, blobs, flush_seconds)
+
+        def write(items):
+            count = 0
+            for item in items:
+                if item['PK'] == self.fail_at: raise RuntimeError("Task timed out")
+                count += 1
+                if item['PK'] in self.drop: continue
+                self.items[item['PK']] = item
+                if not item['PK'].startswith('STATIC_MANIFEST#'): self.puts.append(item['PK'])
+                diff.landed([item['PK']])
+            return count
+
+        def write_changed(items):
+            before = len(diff.current)
+            write(diff.changed(items, write))
+            diff.flush(write)
+            return len(diff.current) - before
+
+        self.puts = []
+        run_pipeline(z, write_changed, StageTimings())
+        for pk in diff.removed():
+            del self.items[pk]
+            diff.landed([pk], deleted=True)
+        diff.flush(write)
+        return diff
+
+    def stored(self):
+        return read_manifest(self.items)[0]
+
+
+class TestStaticManifest(unittest.TestCase):
+
+    def test_fingerprint_covers_binary_and_order_free_keys(self):
+        self.assertEqual(fingerprint({'PK': 'A', 'b': b'\x01', 'n': 1}), fingerprint({'n': 1, 'b': b'\x01', 'PK': 'A'}))
+        self.assertNotEqual(fingerprint({'PK': 'A', 'b': b'\x01'}), fingerprint({'PK': 'A', 'b': b'\x02'}))
+
+    def test_second_load_writes_only_what_changed(self):
+        table = FakeTable()
+        first = table.load(feed_zip())
+        self.assertEqual(first.unchanged, 0)
+        self.assertEqual(table.stored(), first.current)
+        self.assertLessEqual(set(chunk_keys()), set(table.items))
+        self.assertEqual(set(encode_manifest(first.current)), set(chunk_keys()))
+
+        # Same feed: nothing to put, delete or re-store
+        again = table.load(feed_zip())
+        self.assertEqual((table.puts, again.removed(), again.chunks_written), ([], [], 0))
+
+        # Stop 1002 renamed, trip t2 dropped
+        renamed = STOPS.replace('Victoria Park', 'Victoria Park Station')
+        changed = table.load(feed_zip(renamed, TRIPS.replace('7,WKDY,t2,Conestoga Station,b1\n', ''), STOP_TIMES.replace('t2,09:00:00,09:00:00,1,1\n', '')))
+        self.assertEqual(sorted(table.puts), ['STOP#1002', 'STOP_INDEX', 'STOP_ROUTES#1', 'STOP_SCHEDULE#1'])
+        self.assertNotIn('TRIP#t2', table.items)
+        self.assertNotIn('TRIP_STOP_TIMES#t2', table.items)
+        self.assertEqual(table.stored(), changed.current)
+        self.assertLess(changed.chunks_written, len(chunk_keys()))
+
+    def test_unknown_fingerprints_are_rewritten_and_stale_ones_deleted(self):
+        table = FakeTable()
+        table.items = {pk: {'PK': pk} for pk in ('STOP#1001', 'TRIP#old', 'TRIP_STOP_TIMES#old', 'BUS_ALL')}
+        table.load(feed_zip())
+        self.assertIn('STOP#1001', table.puts)
+        self.assertNotIn('TRIP#old', table.items)
+        self.assertIn('BUS_ALL', table.items)  # never anything the pipeline doesn't own
+
+        # A forced full reload rewrites everything
+        table.load(feed_zip(), full=True)
+        self.assertEqual(sorted(table.puts), sorted(table.stored()))
+
+    def test_interrupted_run_leaves_a_usable_manifest(self):
+        table = FakeTable()
+        table.fail_at = 'TRIP_STOP_TIMES#t2'
+        table.drop = {'STOP#1002'}
+        with self.assertRaises(RuntimeError):
+            table.load(feed_zip(), flush_seconds=0)
+        # Only what landed made it into the manifest: not the dropped stop, nothing after the failure
+        self.assertEqual(sorted(table.stored()), ['STOP#1001', 'STOP_INDEX', 'STOP_ROUTES#1', 'STOP_ROUTES#2', 'STOP_SCHEDULE#1',
+                                                  'STOP_SCHEDULE#2', 'TRIP#t1', 'TRIP#t2', 'TRIP_STOP_TIMES#t1'])
+
+        # The next run picks up where the last one stopped
+        table.fail_at, table.drop = None, set()
+        resumed = table.load(feed_zip())
+        self.assertEqual(sorted(table.puts), ['STOP#1002', 'TRIP_STOP_TIMES#t2'])
+        self.assertEqual(table.stored(), resumed.current)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import io
+import unittest
+import zipfile
+
+from static_pipeline import StageTimings, TimeBudget, run_pipeline
+from stop_index import decode_trip_index, decode_schedule_index, decode_stops_index
+
+
+def feed_zip():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as z:
+        z.writestr('stops.txt', '\ufeffstop_id,stop_code,stop_name,stop_lat,stop_lon\n'
+                                '1,1001,"Charles Terminal, Platform 2",43.45,-80.49\n2,,Victoria Park,43.44,-80.50\n3,1003,Nowhere,,\n')
+        z.writestr('trips.txt', 'route_id,service_id,trip_id,trip_headsign,block_id\n'
+                                '7,WKDY,t1,Conestoga Station,b1\n7,WKDY,t2,Conestoga Station,b1\n8,WKDY,t3,,b2\n')
+        # t1 visits stop 1 twice and runs past midnight; t2 has no arrival at stop 2; 'ghost' isn't in trips.txt
+        z.writestr('stop_times.txt', 'trip_id,arrival_time,departure_time,stop_id,stop_sequence\n'
+                                     't1,08:40:00,08:40:00,1,30\nt1,08:02:00,08:02:00,1,2\nt1,25:10:00,25:10:00,2,40\n'
+                                     't2,09:00:00,09:00:00,1,1\nt2,,,2,2\nt3,10:00:00,10:00:00,2,1\nghost,11:00:00,11:00:00,1,1\n')
+    return zipfile.ZipFile(io.BytesIO(buf.getvalue()))
+
+
+class TestStaticPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.written = []
+        self.timings = StageTimings()
+        self.counts = run_pipeline(feed_zip(), self.write, self.timings)
+        self.items = {item['PK']: item for item in self.written}
+
+    def write(self, items):
+        items = list(items)
+        self.written.extend(items)
+        return len(items)
+
+    def test_every_entity_from_one_parse(self):
+        self.assertEqual(self.counts, {'stop_times_rows': 7, 'stops_processed': 3, 'trips_processed': 3, 'trip_stop_times_processed': 4,
+                                       'stop_routes_processed': 2, 'stop_schedules_processed': 2, 'stop_index_processed': 1})
+        self.assertEqual(self.items['STOP#1001']['name'], 'Charles Terminal, Platform 2')
+        self.assertIn('STOP#2', self.items)  # no stop_code falls back to stop_id
+        self.assertEqual(self.items['TRIP#t3'], {'PK': 'TRIP#t3', 'headsign': '', 'route_id': '8', 'block_id': 'b2', 'type': 'STATIC_TRIP'})
+        self.assertEqual([st['stop_sequence'] for st in self.items['TRIP_STOP_TIMES#t1']['StopTimes']], [2, 30, 40])
+        self.assertEqual(len(self.items['TRIP_STOP_TIMES#t2']['StopTimes']), 1)
+        self.assertIn('TRIP_STOP_TIMES#ghost', self.items)
+        # Everything the reader serves from lands before the bulk of the writes, TRIP_STOP_TIMES#
+        kinds = [item['PK'].split('#')[0] for item in self.written]
+        self.assertEqual(sorted(set(kinds), key=kinds.index), ['STOP', 'TRIP', 'STOP_ROUTES', 'STOP_SCHEDULE', 'STOP_INDEX', 'TRIP_STOP_TIMES'])
+        self.assertEqual(set(self.timings.stages), {'ParseStops', 'ParseTrips', 'ParseStopTimes', 'WriteStops', 'WriteTrips',
+                                                    'WriteTripStopTimes', 'WriteStopRoutes', 'WriteStopSchedules', 'WriteStopIndex'})
+
+    def test_stop_indexes(self):
+        stop_1 = self.items['STOP_ROUTES#1']
+        self.assertEqual(stop_1['Routes'], [{'route_id': '7', 'headsign': 'Conestoga Station'}])
+        self.assertEqual(decode_trip_index(stop_1['TripIndex']), {'t1': [2, 28920, 30, 31200], 't2': [1, 32400]})
+        self.assertEqual(sorted(r['route_id'] for r in self.items['STOP_ROUTES#2']['Routes']), ['7', '8'])
+        self.assertEqual(decode_trip_index(self.items['STOP_ROUTES#2']['TripIndex']), {'t1': [40, 90600], 't3': [1, 36000]})
+
+        # Trips without a headsign get no schedule key, so stop 2 only has t1's 25:10:00
+        self.assertEqual(decode_schedule_index(self.items['STOP_SCHEDULE#1']['ScheduleIndex']), {('7', 'Conestoga Station'): [28920, 31200, 32400]})
+        self.assertEqual(decode_schedule_index(self.items['STOP_SCHEDULE#2']['ScheduleIndex']), {('7', 'Conestoga Station'): [90600]})
+        index = decode_stops_index(self.items['STOP_INDEX']['Index'])
+        self.assertEqual(index['ids'], ['1001', '2'])
+
+    def test_time_budget_stops_mid_stage(self):
+        clock = {'remaining_ms': 10500}
+        def remaining_ms():
+            clock['remaining_ms'] -= 1000  # a second per item
+            return clock['remaining_ms']
+        budget = TimeBudget(remaining_ms, reserve_seconds=5)
+        self.written = []
+        counts = run_pipeline(feed_zip(), self.write, StageTimings(), budget)
+        self.assertTrue(budget.exhausted)
+        self.assertEqual([item['PK'] for item in self.written], ['STOP#1001', 'STOP#2', 'STOP#1003', 'TRIP#t1', 'TRIP#t2'])
+        self.assertEqual((counts['stops_processed'], counts['trips_processed']), (3, 2))
+        self.assertNotIn('stop_routes_processed', counts)
+
+if __name__ == '__main__':
+    unittest.main()
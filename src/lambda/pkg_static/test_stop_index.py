@@ -0,0 +1,56 @@
+import unittest
+
+from stop_index import (time_to_seconds, seconds_to_time, encode_trip_index, decode_trip_index, lookup_trip,
+                        encode_schedule_index, decode_schedule_index, schedule_index_from_list, next_departures, DAY,
+                        encode_stops_index, decode_stops_index)
+
+
+class TestStopIndex(unittest.TestCase):
+
+    def setUp(self):
+        # Trip 'loop' passes the stop twice; 'late' runs past midnight
+        self.index = decode_trip_index(encode_trip_index({
+            'loop': [(30, time_to_seconds('08:40:00')), (2, time_to_seconds('08:02:00'))],
+            'late': [(12, time_to_seconds('25:10:00'))],
+        }))
+
+    def test_times_past_midnight(self):
+        self.assertEqual(time_to_seconds('25:10:00'), 90600)
+        self.assertEqual(seconds_to_time(90600), '25:10:00')
+        self.assertIsNone(time_to_seconds(''))
+
+    def test_lookup_picks_next_visit(self):
+        self.assertEqual(lookup_trip(self.index, 'loop', None), (2, 28920))
+        self.assertEqual(lookup_trip(self.index, 'loop', 3), (30, 31200))
+        self.assertEqual(lookup_trip(self.index, 'loop', 31), (None, None))
+        self.assertEqual(lookup_trip(self.index, 'late', 12), (12, 90600))
+        self.assertEqual(lookup_trip(self.index, 'other', 1), (None, None))
+
+    def test_schedule_index_roundtrip(self):
+        schedule = {('7', 'Conestoga Station'): [time_to_seconds(t) for t in ('25:10:00', '06:00:00', '23:30:00')], ('201', 'Conestoga'): [30000]}
+        index = decode_schedule_index(encode_schedule_index(schedule))
+        self.assertEqual(index[('7', 'Conestoga Station')], [21600, 84600, 90600])
+        self.assertEqual(index, schedule_index_from_list([{'r': '7', 'h': 'Conestoga Station', 't': '23:30:00'}, {'r': '7', 'h': 'Conestoga Station', 't': '25:10:00'},
+                                                          {'r': '7', 'h': 'Conestoga Station', 't': '06:00:00'}, {'r': '201', 'h': 'Conestoga', 't': '08:20:00'}]))
+
+    def test_next_departures(self):
+        times = [time_to_seconds(t) for t in ('06:00:00', '12:00:00', '23:30:00', '24:20:00', '25:10:00')]
+        # Evening: today's remaining trips, including the ones past midnight
+        self.assertEqual([seconds_to_time(t % DAY) for t in next_departures(times, time_to_seconds('23:00:00'), 3)], ['23:30:00', '00:20:00', '01:10:00'])
+        # Just after midnight, yesterday's late trips come before this morning's
+        self.assertEqual([seconds_to_time(t % DAY) for t in next_departures(times, time_to_seconds('00:30:00'), 3)], ['01:10:00', '06:00:00', '12:00:00'])
+        self.assertEqual(next_departures(times, time_to_seconds('02:00:00'), 1), [21600])
+        # After the last trip it wraps to tomorrow
+        self.assertEqual(next_departures([21600], time_to_seconds('07:00:00'), 2), [21600 + DAY])
+        self.assertEqual(next_departures([], 0), [])
+
+    def test_stops_index_roundtrip(self):
+        stops = decode_stops_index(encode_stops_index([('1000', 'Charles Terminal', '43.448601', '-80.489473', ['7', '201']),
+                                                       ('1123', 'Fairview Park', 43.4242, -80.4381, [])]))
+        self.assertEqual(stops['ids'], ['1000', '1123'])
+        self.assertEqual(list(stops['lat']), [43.4486, 43.4242])
+        self.assertEqual(list(stops['lon']), [-80.48947, -80.4381])
+        self.assertEqual(stops['routes'], [['7', '201'], []])
+
+if __name__ == '__main__':
+    unittest.main()
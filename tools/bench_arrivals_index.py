@@ -0,0 +1,75 @@
+import sys
+import os
+import json
+import math
+import time
+import zlib
+import random
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lambda', 'pkg_reader'))
+import arrivals_index
+from stop_index import lookup_trip
+from bench_stop_trip_index import load_feed
+
+LIVE_BUSES = 300        # GRT's peak service
+POLLS = 20
+ADVANCE_SHARE = 0.35    # share of buses that pass at least one stop between two polls
+BUCKETS = 64            # the ARRIVALS#<n> items GRT_Ingest used to write
+REQUESTS = 500
+
+
+def bucket_blobs(arrivals, with_stops_away):
+    """What a stored stop -> arrivals index would write per poll: crc32(stop_id)-bucketed, zlib-compressed JSON."""
+    split = [{} for _ in range(BUCKETS)]
+    for stop_id, entries in arrivals.items():
+        split[zlib.crc32(stop_id.encode('utf-8')) % BUCKETS][stop_id] = entries if with_stops_away else [e[:4] for e in entries]
+    return [zlib.compress(json.dumps(s, separators=(',', ':'), sort_keys=True).encode('utf-8'), 6) for s in split]
+
+
+def run(path=None):
+    trips, trip_stop_times, stop_visits, _ = load_feed(path)
+    rng = random.Random(7)
+    buses = []
+    for i, trip_id in enumerate(rng.sample(sorted(trip_stop_times), LIVE_BUSES)):
+        route_id, headsign = trips[trip_id]
+        buses.append({'id': str(20000 + i), 'trip_id': trip_id, 'route_id': route_id, 'headsign': headsign,
+                      'current_stop_sequence': rng.randint(1, len(trip_stop_times[trip_id]))})
+    trip_stops = {b['trip_id']: arrivals_index.compact_stop_times(trip_stop_times[b['trip_id']]) for b in buses}
+
+    # Ingest side: WCU a stored index would cost while buses move, with and without stops_away in it
+    last, written, wcu = {}, {True: [], False: []}, {True: [], False: []}
+    for poll in range(POLLS):
+        if poll:
+            for bus in buses:
+                if rng.random() < ADVANCE_SHARE: bus['current_stop_sequence'] += rng.randint(1, 2)
+        arrivals = arrivals_index.project_arrivals(buses, trip_stops)
+        for with_away in (True, False):
+            blobs = bucket_blobs(arrivals, with_away)
+            if poll:
+                changed = [b for b in range(BUCKETS) if last[with_away][b] != blobs[b]]
+                written[with_away].append(len(changed))
+                wcu[with_away].append(sum(math.ceil((len(blobs[b]) + 40) / 1024) for b in changed))
+            last[with_away] = blobs
+    print(f"{len(trip_stop_times)} trips in the feed, {LIVE_BUSES} live buses, {len(arrivals)} stops with upcoming arrivals")
+    for with_away, label in ((True, 'with stops_away'), (False, 'arrival sets only')):
+        print(f"stored in {BUCKETS} buckets, {label}: {sum(written[with_away]) / (POLLS - 1):.1f} buckets and "
+              f"{sum(wcu[with_away]) / (POLLS - 1):.0f} WCU per poll")
+    print("a bus passes a stop on most polls, so either way nearly every bucket changes; GRT_Ingest stores nothing (0 WCU)")
+
+    # Reader side: ?arrivals= for the busiest stops, with TripIndex and stop times warm in the static cache
+    stops = sorted(stop_visits, key=lambda s: -len(stop_visits[s]))[:50]
+    trip_indexes = {s: {t: [v for pair in sorted(pairs) for v in pair] for t, pairs in stop_visits[s].items()} for s in stops}
+    timings = []
+    for i in range(REQUESTS):
+        stop_id = stops[i % len(stops)]
+        start = time.perf_counter()
+        heading = [b for b in buses if lookup_trip(trip_indexes[stop_id], b['trip_id'], b['current_stop_sequence'])[0] is not None]
+        matched = {b['trip_id']: arrivals_index.compact_stop_times(trip_stop_times[b['trip_id']]) for b in heading}
+        entries = arrivals_index.project_arrivals(heading, matched).get(stop_id, [])
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(f"reader: project one stop from the snapshot, warm: median {timings[len(timings) // 2]:.2f} ms, "
+          f"p99 {timings[int(len(timings) * 0.99)]:.2f} ms; {len(entries)} arrivals at the last stop")
+
+if __name__ == '__main__':
+    run(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,70 @@
+import sys
+import os
+import time
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lambda', 'pkg_static'))
+from bulk_writer import BulkWriter
+
+ITEMS = 6000
+LATENCY = 0.015  # seconds per BatchWriteItem round trip
+FRACTION = 0.7
+
+class SimulatedTable:
+    """Provisioned table: refills `wcu` per second with one second of burst, 1 WCU per item,
+    and hands back whatever it can't pay for as UnprocessedItems."""
+
+    def __init__(self, wcu):
+        self.wcu, self.tokens, self.updated = wcu, float(wcu), time.monotonic()
+        self.lock = threading.Lock()
+        self.rejected = 0
+
+    def batch_write_item(self, RequestItems, ReturnConsumedCapacity=None):
+        time.sleep(LATENCY)
+        (table, requests), = RequestItems.items()
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.wcu, self.tokens + (now - self.updated) * self.wcu)
+            self.updated = now
+            accepted = min(len(requests), int(self.tokens))
+            self.tokens -= accepted
+            self.rejected += len(requests) - accepted
+        response = {'ConsumedCapacity': [{'TableName': table, 'CapacityUnits': float(accepted)}]}
+        if accepted < len(requests): response['UnprocessedItems'] = {table: requests[accepted:]}
+        return response
+
+def legacy(client, items):
+    # What table.batch_writer() did: one thread, 25 per request, unprocessed items resent with the next
+    # request, plus the fixed time.sleep(0.1) every 500 items
+    pending, count = [], 0
+    for item in items:
+        pending.append({'PutRequest': {'Item': item}})
+        count += 1
+        if count % 500 == 0: time.sleep(0.1)
+        if len(pending) >= 25:
+            response = client.batch_write_item(RequestItems={'T': pending[:25]})
+            pending = pending[25:] + response.get('UnprocessedItems', {}).get('T', [])
+    while pending:
+        response = client.batch_write_item(RequestItems={'T': pending[:25]})
+        pending = pending[25:] + response.get('UnprocessedItems', {}).get('T', [])
+
+def run():
+    items = [{'PK': f"TRIP#{i}"} for i in range(ITEMS)]
+    print(f"{ITEMS} one-WCU items, {LATENCY * 1000:.0f} ms per request, bulk writer targets {FRACTION:.0%} of provisioned")
+    print(f"{'provisioned WCU':>15} {'writer':>8} {'items/s':>8} {'rejected':>9} {'retries':>8}")
+    for wcu in (500, 2000, 8000):
+        table = SimulatedTable(wcu)
+        start = time.perf_counter()
+        legacy(table, items)
+        elapsed = time.perf_counter() - start
+        print(f"{wcu:>15} {'legacy':>8} {ITEMS / elapsed:>8.0f} {table.rejected:>9} {'-':>8}")
+
+        table = SimulatedTable(wcu)
+        writer = BulkWriter(table, 'T', wcu * FRACTION, workers=4)
+        writer.write(items)
+        writer.close()
+        stats = writer.stats.as_dict()
+        print(f"{wcu:>15} {'bulk':>8} {stats['items_per_second']:>8.0f} {table.rejected:>9} {stats['retries']:>8}")
+
+if __name__ == '__main__':
+    run()
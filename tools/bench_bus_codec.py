@@ -0,0 +1,49 @@
+import sys
+import os
+import json
+import gzip
+import time
+import random
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lambda', 'pkg_ingest'))
+import bus_codec
+
+ROUNDS = 200
+HEADSIGNS = ['Fairview Park', 'Conestoga Station', 'Ainslie Terminal', 'The Boardwalk Station', 'Charles Terminal']
+
+def synthetic_snapshot(bus_count=300):
+    rng = random.Random(3)
+    timestamp = int(time.time())
+    return timestamp, [{
+        'id': str(20000 + i), 'lat': round(43.45 + rng.uniform(-0.1, 0.1), 5), 'lon': round(-80.49 + rng.uniform(-0.1, 0.1), 5),
+        'bearing': float(rng.randint(0, 359)), 'trip_id': str(rng.randint(1000000, 9999999)),
+        'current_stop_sequence': rng.randint(1, 80), 'timestamp': timestamp,
+        'route_id': str(rng.randint(1, 40)), 'headsign': rng.choice(HEADSIGNS), 'block_id': str(rng.randint(1, 300))
+    } for i in range(bus_count)]
+
+def time_it(fn, *args):
+    start = time.perf_counter()
+    for _ in range(ROUNDS): fn(*args)
+    return (time.perf_counter() - start) / ROUNDS * 1000
+
+def legacy_encode(buses, timestamp):
+    return gzip.compress(json.dumps(buses).encode('utf-8'))
+
+def legacy_decode(blob):
+    return json.loads(gzip.decompress(blob).decode('utf-8'))
+
+def run():
+    timestamp, buses = synthetic_snapshot()
+    legacy = legacy_encode(buses, timestamp)
+    columnar = bus_codec.encode_buses(buses, timestamp)
+    assert bus_codec.decode_buses(columnar) == sorted(buses, key=lambda b: int(b["id"]))
+    # DynamoDB bills writes per 1 KB and strongly consistent reads per 4 KB
+    print(f"{'format':<14}{'bytes':>8}{'WCU':>6}{'RCU':>6}{'encode ms':>11}{'decode ms':>11}")
+    for name, blob, enc, dec in (("gzip-json", legacy, legacy_encode, legacy_decode),
+                                 (f"columnar v{bus_codec.VERSION}", columnar, bus_codec.encode_buses, bus_codec.decode_buses)):
+        print(f"{name:<14}{len(blob):>8}{-(-len(blob) // 1024):>6}{-(-len(blob) // 4096):>6}"
+              f"{time_it(enc, buses, timestamp):>11.2f}{time_it(dec, blob):>11.2f}")
+    print(f"{'columns only':<14}{'':>8}{'':>6}{'':>6}{'':>11}{time_it(bus_codec.decode_columns, columnar):>11.2f}")
+
+if __name__ == '__main__':
+    run()
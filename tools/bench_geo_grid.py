@@ -0,0 +1,85 @@
+import sys
+import os
+import io
+import csv
+import time
+import zipfile
+import random
+from math import radians, sin, cos, asin, sqrt
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lambda', 'pkg_reader'))
+import geo
+import stop_index
+from synthetic_gtfs import build_feed
+
+ROUNDS = 500
+RADIUS_M = 500
+
+def synthetic_fleet(bus_count=300, routes=40):
+    rng = random.Random(11)
+    return [{'id': str(20000 + i), 'lat': round(43.45 + rng.uniform(-0.08, 0.08), 5), 'lon': round(-80.49 + rng.uniform(-0.12, 0.12), 5),
+             'route_id': str(rng.randint(1, routes))} for i in range(bus_count)]
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    a = sin(radians(lat2 - lat1) / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(radians(lon2 - lon1) / 2) ** 2
+    return 2 * geo.EARTH_RADIUS_M * asin(sqrt(a))
+
+def degree_scan(buses, stop_lat, stop_lon, route_ids):
+    # What GRT_Reader did: for every offline route, walk all ignored buses with a degrees distance
+    found = {}
+    for r_id in route_ids:
+        for bus in buses:
+            if bus['route_id'] == r_id and ((bus['lat'] - stop_lat) ** 2 + (bus['lon'] - stop_lon) ** 2) ** 0.5 < 0.005:
+                found[r_id] = bus['id']
+                break
+    return found
+
+def grid_lookup(grid, buses, stop_lat, stop_lon, route_ids):
+    nearby = [buses[i] for _, i in grid.within(stop_lat, stop_lon, RADIUS_M)]
+    found = {}
+    for r_id in route_ids:
+        bus = next((b for b in nearby if b['route_id'] == r_id), None)
+        if bus: found[r_id] = bus['id']
+    return found
+
+def time_it(fn, *args):
+    start = time.perf_counter()
+    for _ in range(ROUNDS): result = fn(*args)
+    return (time.perf_counter() - start) / ROUNDS * 1000, result
+
+def run():
+    buses = synthetic_fleet()
+    stops = [(43.45 + dy, -80.49 + dx) for dy in (-0.05, 0, 0.05) for dx in (-0.08, 0, 0.08)]
+    route_ids = [str(r) for r in range(1, 21)]
+
+    build_ms, grid = time_it(geo.GridIndex, [(b['lat'], b['lon']) for b in buses])
+    scan_ms = lookup_ms = 0
+    for stop_lat, stop_lon in stops:
+        ms, _ = time_it(degree_scan, buses, stop_lat, stop_lon, route_ids)
+        scan_ms += ms / len(stops)
+        ms, _ = time_it(grid_lookup, grid, buses, stop_lat, stop_lon, route_ids)
+        lookup_ms += ms / len(stops)
+    print(f"{len(buses)} buses, {len(route_ids)} offline routes per request, {RADIUS_M} m radius")
+    print(f"grid build (once per snapshot) {build_ms:.3f} ms")
+    print(f"per request: degree scan {scan_ms:.3f} ms, grid lookup {lookup_ms:.3f} ms")
+
+    a, b = (43.4643, -80.5204), (43.4516, -80.4925)  # Waterloo to Kitchener
+    pairs = [(a[0], a[1], b[0], b[1])] * 10000
+    for name, fn in (("equirectangular", geo.distance_m), ("haversine", haversine_m)):
+        start = time.perf_counter()
+        for p in pairs: d = fn(*p)
+        print(f"{name:<16} {d:9.2f} m  {(time.perf_counter() - start) / len(pairs) * 1e6:.2f} us/call")
+    # Nearest stops over a GRT-sized stop list, as the reader's ?lat=&lon= route answers them
+    with zipfile.ZipFile(io.BytesIO(build_feed())).open('stops.txt') as f:
+        rows = [(r['stop_id'], r['stop_name'], r['stop_lat'], r['stop_lon'], ['7', '12', '201']) for r in csv.DictReader(io.TextIOWrapper(f, 'utf-8-sig'))]
+    blob = stop_index.encode_stops_index(rows)
+    load_ms, stops = time_it(lambda: stop_index.decode_stops_index(blob))
+    grid_ms, stop_grid = time_it(geo.GridIndex, list(zip(stops['lat'], stops['lon'])))
+    query_ms, nearest = time_it(lambda: stop_grid.within(43.46, -80.49, 800)[:10])
+    print(f"STOP_INDEX: {len(rows)} stops, {len(blob) / 1024:.1f} KB; load {load_ms:.2f} ms + grid {grid_ms:.2f} ms once per container; "
+          f"k=10 within 800 m {query_ms:.3f} ms ({len(nearest)} found)")
+    # What the old 0.005 degree threshold meant in metres at Waterloo's latitude
+    print(f"0.005 deg north = {geo.distance_m(43.45, -80.49, 43.455, -80.49):.0f} m, east = {geo.distance_m(43.45, -80.49, 43.45, -80.485):.0f} m")
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,48 @@
+import sys
+import os
+import io
+import csv
+import time
+import zipfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lambda', 'pkg_static'))
+from gtfs_csv import gtfs_rows
+from static_pipeline import StageTimings, parse_feed
+from synthetic_gtfs import build_feed
+
+ROUNDS = 3
+COLUMNS = ('trip_id', 'stop_id', 'arrival_time', 'stop_sequence')
+
+def dict_reader(z):
+    # What every static loader did: a dict per row, then a row.get() per column
+    with z.open('stop_times.txt') as f:
+        return [tuple(row.get(c) for c in COLUMNS) for row in csv.DictReader(io.TextIOWrapper(f, 'utf-8-sig'))]
+
+def positional(z):
+    with z.open('stop_times.txt') as f:
+        return list(gtfs_rows(f, COLUMNS))
+
+def best_of(fn, *args):
+    times = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+def run():
+    z = zipfile.ZipFile(io.BytesIO(build_feed()))
+    dict_s, expected = best_of(dict_reader, z)
+    tuple_s, got = best_of(positional, z)
+    assert got == expected, "positional reader disagrees with DictReader"
+    rows = len(expected)
+    print(f"stop_times.txt: {rows} rows, {len(z.read('stop_times.txt')) / 1e6:.1f} MB, 8 columns (4 read)")
+    print(f"{'reader':<24} {'seconds':>8} {'rows/s':>10}")
+    print(f"{'csv.DictReader':<24} {dict_s:>8.3f} {rows / dict_s:>10.0f}")
+    print(f"{'gtfs_rows (tuples)':<24} {tuple_s:>8.3f} {rows / tuple_s:>10.0f}")
+    timings = StageTimings()
+    parse_feed(z, timings)
+    print(f"static_pipeline.parse_feed stages (s): {timings.stages}")
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,76 @@
+import sys
+import os
+import random
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lambda', 'pkg_ingest'))
+from bus_codec import encode_buses
+from history_frames import encode_keyframe, encode_delta, reconstruct
+
+POLL_SECONDS = 30
+KEYFRAME_SECONDS = 600
+FLEET_SIZE = 300
+MOVING_SHARE = 0.6      # share of buses that move between two polls (the rest are dwelling / at terminals)
+TURNOVER_PER_POLL = 2   # buses entering and leaving service per poll
+
+def simulate_hour(start_ts):
+    """Yields (timestamp, buses) for one hour of polls with GRT-like movement."""
+    rng = random.Random(11)
+    fleet = {}
+    next_id = 20000
+    def new_bus():
+        nonlocal next_id
+        next_id += 1
+        return {'id': str(next_id), 'lat': round(43.45 + rng.uniform(-0.1, 0.1), 5), 'lon': round(-80.49 + rng.uniform(-0.1, 0.1), 5),
+                'bearing': float(rng.randint(0, 359)), 'trip_id': str(rng.randint(1000000, 9999999)), 'current_stop_sequence': 1,
+                'route_id': str(rng.randint(1, 40)), 'headsign': rng.choice(['Fairview Park', 'Conestoga Station', 'Ainslie Terminal']),
+                'block_id': str(rng.randint(1, 300))}
+    for _ in range(FLEET_SIZE):
+        bus = new_bus()
+        fleet[bus['id']] = bus
+
+    for ts in range(start_ts, start_ts + 3600, POLL_SECONDS):
+        for vid in rng.sample(sorted(fleet), TURNOVER_PER_POLL): del fleet[vid]
+        for _ in range(TURNOVER_PER_POLL):
+            bus = new_bus()
+            fleet[bus['id']] = bus
+        for bus in fleet.values():
+            bus = dict(bus)
+            if rng.random() < MOVING_SHARE:
+                bus['lat'] = round(bus['lat'] + rng.uniform(-0.002, 0.002), 5)
+                bus['lon'] = round(bus['lon'] + rng.uniform(-0.002, 0.002), 5)
+                if rng.random() < 0.3: bus['current_stop_sequence'] += 1
+            fleet[bus['id']] = bus
+        yield ts, [dict(b, timestamp=ts) for b in fleet.values()]
+
+def run():
+    start = 1767823200
+    full_bytes = delta_bytes = full_wcu = delta_wcu = 0
+    frames, snapshots = {}, {}
+    prev, prev_ts, keyframe_ts = None, None, None
+    for ts, buses in simulate_hour(start):
+        full = encode_buses(buses, ts)
+        if prev is None or ts - keyframe_ts >= KEYFRAME_SECONDS:
+            frame, keyframe_ts = encode_keyframe(buses, ts), ts
+        else:
+            frame = encode_delta(prev, buses, ts, keyframe_ts, prev_ts)
+        frames[ts], snapshots[ts] = frame, buses
+        full_bytes += len(full)
+        delta_bytes += len(frame)
+        full_wcu += -(-len(full) // 1024)
+        delta_wcu += -(-len(frame) // 1024)
+        prev, prev_ts = buses, ts
+
+    # Every timestamp must rebuild exactly from its nearest keyframe
+    for ts, buses in snapshots.items():
+        rebuilt = {b['id']: b for b in reconstruct(ts, frames.get)}
+        expected = {b['id']: b for b in buses}
+        assert rebuilt == expected, f"Reconstruction mismatch at {ts}"
+
+    print(f"{len(frames)} polls/hour, {FLEET_SIZE} buses, keyframe every {KEYFRAME_SECONDS}s")
+    print(f"{'layout':<22}{'bytes/hour':>12}{'WCU/hour':>10}")
+    print(f"{'full snapshots':<22}{full_bytes:>12}{full_wcu:>10}")
+    print(f"{'keyframes + deltas':<22}{delta_bytes:>12}{delta_wcu:>10}")
+    print(f"reduction: {100 * (1 - delta_bytes / full_bytes):.1f}% bytes, all {len(frames)} timestamps reconstruct exactly")
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,86 @@
+import sys
+import os
+import math
+import time
+import random
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lambda', 'pkg_reader'))
+from bus_codec import encode_buses, decode_buses
+from live_snapshot import LatestSnapshot, publish_snapshot
+from object_store import LocalStore
+
+# Simulated round trips from a Lambda in the same region; the local work (decode, JSON parse) is measured for real
+DYNAMO_MS = 6.0
+S3_MS = 15.0
+POLL_SECONDS = 30
+MINUTES = 10
+REQUESTS_PER_SECOND = 2  # origin requests reaching one warm GRT_Reader container
+FLEET_SIZE = 300
+
+def fleet(ts, rng):
+    return [{'id': str(20000 + i), 'lat': round(43.45 + rng.uniform(-0.1, 0.1), 5), 'lon': round(-80.49 + rng.uniform(-0.1, 0.1), 5),
+             'bearing': float(rng.randint(0, 359)), 'trip_id': str(rng.randint(1000000, 9999999)), 'current_stop_sequence': rng.randint(1, 40),
+             'timestamp': ts, 'route_id': str(rng.randint(1, 40)), 'headsign': rng.choice(['Fairview Park', 'Conestoga Station', 'Ainslie Terminal']),
+             'block_id': str(rng.randint(1, 300))} for i in range(FLEET_SIZE)]
+
+class SlowStore(LocalStore):
+    def __init__(self, root):
+        super().__init__(root)
+        self.gets = 0
+
+    def get(self, key):
+        self.gets += 1
+        time.sleep(S3_MS / 1000)
+        return super().get(key)
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+def run():
+    rng = random.Random(7)
+    start = 1767823200
+    polls = {ts: fleet(ts, rng) for ts in range(start, start + MINUTES * 60 + 1, POLL_SECONDS)}
+    store = SlowStore(tempfile.mkdtemp())
+    follower = LatestSnapshot(store, POLL_SECONDS, 2)
+    requests = [start + 1 + i / REQUESTS_PER_SECOND for i in range(MINUTES * 60 * REQUESTS_PER_SECOND)]
+
+    bus_all = {'ms': [], 'rcu': 0.0, 'decoded_at': None}
+    published = {'ms': []}
+    poll_times = sorted(polls)
+    next_poll = 0
+    for now in requests:
+        while next_poll < len(poll_times) and poll_times[next_poll] <= now:
+            ts = poll_times[next_poll]
+            blob = encode_buses(polls[ts], ts)
+            publish_snapshot(store, polls[ts], ts)
+            next_poll += 1
+
+        # Before: every request reads BUS_ALL (eventually consistent, 0.5 RCU per started 4 KB), decoding on a new updated_at
+        t = time.perf_counter()
+        time.sleep(DYNAMO_MS / 1000)
+        bus_all['rcu'] += math.ceil(len(blob) / 4096) * 0.5
+        if bus_all['decoded_at'] != ts:
+            decode_buses(blob)
+            bus_all['decoded_at'] = ts
+        bus_all['ms'].append((time.perf_counter() - t) * 1000)
+
+        # After: the warm container follows live/latest.json and only touches S3 when a poll is due
+        t = time.perf_counter()
+        follower.get(now=now)
+        published['ms'].append((time.perf_counter() - t) * 1000)
+
+    count = len(requests)
+    print(f"{count} requests over {MINUTES} min, {FLEET_SIZE} buses, BUS_ALL item {len(blob) / 1024:.1f} KB, "
+          f"simulated DynamoDB {DYNAMO_MS} ms / S3 {S3_MS} ms round trips")
+    print(f"{'':<22} {'RCU':>8} {'S3 GETs':>8} {'mean ms':>8} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7}")
+    for name, stats, rcu, gets in (("BUS_ALL per request", bus_all['ms'], bus_all['rcu'], 0),
+                                   ("published snapshot", published['ms'], 0.0, store.gets)):
+        print(f"{name:<22} {rcu:>8.1f} {gets:>8} {sum(stats) / count:>8.2f} {percentile(stats, 0.5):>7.2f} "
+              f"{percentile(stats, 0.95):>7.2f} {percentile(stats, 0.99):>7.2f}")
+    print(f"pointer reads {follower.pointer_reads}, object downloads {follower.object_reads}; "
+          f"clients reading live/ through CloudFront cost no Lambda or DynamoDB at all")
+
+if __name__ == '__main__':
+    run()
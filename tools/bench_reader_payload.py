@@ -0,0 +1,63 @@
+import sys
+import os
+import json
+import time
+import random
+from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lambda', 'pkg_reader'))
+from response_format import parse_fields, shape_stop_body, dumps, compress_response
+
+ROUNDS = 2000
+# What src/frontend/js/app.js reads from each bus
+APP_FIELDS = 'id,lat,lon,bearing,route_id,headsign,next_scheduled_arrival,next_stop_name,target_stop_sequence,current_stop_sequence'
+
+def decimal_default(obj):
+    # What GRT_Reader passed to json.dumps before
+    if isinstance(obj, Decimal): return int(obj)
+    raise TypeError
+
+def busy_stop_body(buses=14, offline=8, routes=22, decimals=False):
+    rng = random.Random(3)
+    headsigns = ['Conestoga Station', 'Fairview Park', 'Ainslie Terminal', 'University of Waterloo Station']
+    seq = Decimal if decimals else int
+    return {
+        "stop_details": {"id": "1123", "lat": "43.45138", "lon": "-80.49313", "name": "Charles Terminal"},
+        "nearby_buses": [{
+            "id": str(20000 + i), "lat": round(43.45 + rng.uniform(-0.02, 0.02), 5), "lon": round(-80.49 + rng.uniform(-0.02, 0.02), 5),
+            "bearing": float(rng.randint(0, 359)), "trip_id": str(rng.randint(1000000, 9999999)), "current_stop_sequence": rng.randint(1, 40),
+            "timestamp": 1767823200, "route_id": str(rng.randint(1, 40)), "headsign": rng.choice(headsigns), "block_id": str(rng.randint(1, 300)),
+            "next_scheduled_arrival": f"08:{rng.randint(0, 59):02d}:00", "next_stop_name": "Charles St. / Benton St.",
+            "target_stop_sequence": seq(rng.randint(1, 40)),
+        } for i in range(buses)],
+        "offline_schedules": [{"route_id": str(r), "headsign": rng.choice(headsigns), "next_scheduled_arrival": "08:30:00"} for r in range(offline)],
+        "all_routes": [[str(r), rng.choice(headsigns)] for r in range(routes)],
+    }
+
+def time_it(fn):
+    start = time.perf_counter()
+    for _ in range(ROUNDS): result = fn()
+    return (time.perf_counter() - start) / ROUNDS * 1e6, result
+
+def run():
+    legacy = busy_stop_body(decimals=True)
+    body = busy_stop_body()
+    fields = parse_fields(APP_FIELDS)
+    variants = [
+        ("before: default=decimal_default", lambda: json.dumps(legacy, default=decimal_default)),
+        ("full", lambda: dumps(shape_stop_body(body))),
+        ("?fields=<app.js fields>", lambda: dumps(shape_stop_body(body, fields))),
+        ("?format=compact", lambda: dumps(shape_stop_body(body, compact=True))),
+        ("?fields=...&format=compact", lambda: dumps(shape_stop_body(body, fields, compact=True))),
+    ]
+    print(f"one busy stop: {len(body['nearby_buses'])} buses, {len(body['offline_schedules'])} offline schedules, {len(body['all_routes'])} routes")
+    print(f"{'':<32} {'bytes':>6} {'gzip':>6} {'serialize us':>12} {'+ gzip us':>9}")
+    for name, fn in variants:
+        serialize_us, text = time_it(fn)
+        gzip_us, response = time_it(lambda: compress_response({'statusCode': 200, 'headers': {}, 'body': fn()}, 'gzip'))
+        zipped = len(response['body']) * 3 // 4 if response.get('isBase64Encoded') else len(text)
+        print(f"{name:<32} {len(text):>6} {zipped:>6} {serialize_us:>12.1f} {gzip_us:>9.1f}")
+    print("gzip bytes are before base64 (what CloudFront sends on); '+ gzip us' includes serializing.")
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,63 @@
+import sys
+import os
+import io
+import time
+import zipfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lambda', 'pkg_static'))
+from static_pipeline import StageTimings, run_pipeline
+from static_manifest import ManifestDiff, encode_manifest
+from synthetic_gtfs import build_feed
+
+CHANGED_EVERY = 100  # one trip in this many gets retimed; the last route is dropped
+
+def refreshed(content):
+    """The same feed a week later: a few retimed trips and one route withdrawn."""
+    src = zipfile.ZipFile(io.BytesIO(content))
+    trips = src.read('trips.txt').decode('utf-8').splitlines(keepends=True)
+    last_route = trips[-1].split(',')[0]
+    dropped = {line.split(',')[2] for line in trips[1:] if line.split(',')[0] == last_route}
+    out_lines = []
+    for n, line in enumerate(src.read('stop_times.txt').decode('utf-8').splitlines(keepends=True)):
+        trip_id = line.split(',', 1)[0]
+        if trip_id in dropped: continue
+        if n and int(trip_id) % CHANGED_EVERY == 0: line = line.replace(':00,', ':30,', 2)
+        out_lines.append(line)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as z:
+        for name in src.namelist():
+            if name == 'stop_times.txt': z.writestr(name, ''.join(out_lines))
+            elif name == 'trips.txt': z.writestr(name, ''.join(l for l in trips if l.split(',')[2] not in dropped))
+            else: z.writestr(name, src.read(name))
+    return buf.getvalue()
+
+def load(content, previous):
+    diff, sizes = ManifestDiff(dict(previous)), []
+    def write(items):
+        before = len(diff.current)
+        for item in diff.changed(items):
+            # One WCU per KB started; sizes roughly as DynamoDB counts them (names + values, binary as is)
+            sizes.append(sum(len(k) + (len(v) if isinstance(v, bytes) else len(str(v))) for k, v in item.items()) // 1024 + 1)
+            diff.landed([item['PK']])
+        return len(diff.current) - before
+    start = time.perf_counter()
+    run_pipeline(zipfile.ZipFile(io.BytesIO(content)), write, StageTimings())
+    return diff, len(sizes), sum(sizes), time.perf_counter() - start
+
+def run():
+    content = build_feed()
+    full, puts, wcu, seconds = load(content, {})
+    manifest = encode_manifest(full.current)
+    print(f"manifest: {len(full.current)} items in {len(manifest)} chunks, {sum(map(len, manifest.values())) / 1024:.0f} KB")
+    print(f"{'load':<34} {'puts':>6} {'~WCU':>7} {'deletes':>7} {'chunks':>6} {'cpu s':>6}")
+    print(f"{'full rewrite':<34} {puts:>6} {wcu:>7} {0:>7} {len(manifest):>6} {seconds:>6.2f}")
+    previous = dict(full.current)
+    for name, feed in (("unchanged feed", content), (f"1/{CHANGED_EVERY} trips retimed, 1 route cut", refreshed(content))):
+        diff, puts, wcu, seconds = load(feed, previous)
+        diff.blobs = dict(manifest)
+        removed = diff.removed()
+        diff.landed(removed, deleted=True)
+        print(f"{name:<34} {puts:>6} {wcu:>7} {len(removed):>7} {len(diff.changed_chunks()):>6} {seconds:>6.2f}")
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,84 @@
+import sys
+import os
+import io
+import gc
+import time
+import zipfile
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lambda', 'pkg_static'))
+from gtfs_download import download_to_spool, count_lines, CHUNK_BYTES
+from synthetic_gtfs import build_feed
+
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+SCALES = (1, 3, 6)  # x the GRT-sized synthetic feed (more trips per direction)
+
+class FakeResponse:
+    """requests.Response as the handlers see it with stream=True: the body arrives in chunks."""
+
+    def __init__(self, content):
+        self.body = content
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+def legacy_checker(response):
+    # r.content, then z.read(...).decode().splitlines() on stops.txt and calendar.txt
+    content = b''.join(response.iter_content(CHUNK_BYTES))
+    with zipfile.ZipFile(io.BytesIO(content)) as z:
+        stops = len(z.read('stops.txt').decode('utf-8').splitlines())
+        calendar = z.read('calendar.txt').decode('utf-8').splitlines()[1]
+    return stops, calendar
+
+def streaming_checker(response):
+    archive, _ = download_to_spool(response, SPOOL_MAX_BYTES)
+    with archive, zipfile.ZipFile(archive) as z:
+        stops = count_lines(z, 'stops.txt')
+        with z.open('calendar.txt') as f:
+            calendar = [line.rstrip('\r\n') for _, line in zip(range(2), io.TextIOWrapper(f, 'utf-8'))][1]
+    return stops, calendar
+
+def stream_members(z):
+    # What the static pipeline does with the archive: every member read as a stream
+    for name in z.namelist():
+        with z.open(name) as f:
+            for _ in iter(lambda: f.read(64 * 1024), b''): pass
+
+def legacy_static(response):
+    content = b''.join(response.iter_content(CHUNK_BYTES))
+    with zipfile.ZipFile(io.BytesIO(content)) as z: stream_members(z)
+
+def streaming_static(response):
+    archive, _ = download_to_spool(response, SPOOL_MAX_BYTES)
+    with archive, zipfile.ZipFile(archive) as z: stream_members(z)
+
+def peak_mb(fn, content):
+    response = FakeResponse(content)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(response)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1e6, elapsed
+
+def run():
+    print("Peak Python allocations (tracemalloc) on top of the response body itself")
+    print(f"{'feed':>6} {'zip MB':>7} {'path':<26} {'legacy MB':>9} {'stream MB':>9} {'legacy s':>8} {'stream s':>8}")
+    for scale in SCALES:
+        content = build_feed(trips_per_direction=75 * scale)
+        for name, legacy, streaming in (("checker validate_gtfs", legacy_checker, streaming_checker),
+                                        ("static download + members", legacy_static, streaming_static)):
+            legacy_mb, legacy_s = peak_mb(legacy, content)
+            stream_mb, stream_s = peak_mb(streaming, content)
+            print(f"{scale:>5}x {len(content) / 1e6:>7.1f} {name:<26} {legacy_mb:>9.1f} {stream_mb:>9.1f} {legacy_s:>8.2f} {stream_s:>8.2f}")
+    print(f"Streaming keeps at most SPOOL_MAX_BYTES ({SPOOL_MAX_BYTES / 1e6:.0f} MB) of the archive in memory; the rest is in /tmp.")
+    print("The static pipeline's parsed maps (trips, stop times, per-stop indexes) still grow with the feed.")
+
+if __name__ == '__main__':
+    run()
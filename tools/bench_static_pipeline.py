@@ -0,0 +1,76 @@
+import sys
+import os
+import io
+import csv
+import time
+import zipfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lambda', 'pkg_static'))
+from static_pipeline import StageTimings, run_pipeline
+import stop_index
+from synthetic_gtfs import build_feed
+
+def legacy_rows(content, name):
+    # Each of the old Lambdas opened its own download
+    z = zipfile.ZipFile(io.BytesIO(content))
+    with z.open(name) as f:
+        yield from csv.DictReader(io.TextIOWrapper(f, 'utf-8-sig'))
+
+def legacy(content):
+    """GRT_Static_Ingest + GRT_Stop_Times_Ingest + GRT_Stop_Schedule, minus DynamoDB."""
+    items = {}
+    trips = {}
+    for row in legacy_rows(content, 'trips.txt'):
+        if row.get('trip_id') and row.get('route_id'):
+            trips[row['trip_id']] = (row['route_id'], row.get('trip_headsign'))
+    stop_routes, stop_trip_map = {}, {}
+    for row in legacy_rows(content, 'stop_times.txt'):
+        stop_id, trip_id = row.get('stop_id'), row.get('trip_id')
+        if stop_id and trip_id in trips:
+            stop_routes.setdefault(stop_id, set()).add(trips[trip_id])
+            arrival = stop_index.time_to_seconds(row.get('arrival_time'))
+            if arrival is not None and row.get('stop_sequence'):
+                stop_trip_map.setdefault(stop_id, {}).setdefault(trip_id, []).append((int(row['stop_sequence']), arrival))
+    items['STOP_ROUTES'] = len([stop_index.encode_trip_index(stop_trip_map.get(s, {})) for s in stop_routes])
+
+    trip_stop_times = {}
+    for row in legacy_rows(content, 'stop_times.txt'):
+        if row.get('trip_id') and row.get('arrival_time') and row.get('stop_id') and row.get('stop_sequence'):
+            trip_stop_times.setdefault(row['trip_id'], []).append({'stop_id': row['stop_id'], 'arrival_time': row['arrival_time'], 'stop_sequence': int(row['stop_sequence'])})
+    items['TRIP_STOP_TIMES'] = len(trip_stop_times)
+
+    # The schedule rebuild scanned TRIP_STOP_TIMES# back and did one TRIP# get_item per trip
+    schedules = {}
+    for trip_id, stop_times in trip_stop_times.items():
+        route_id, headsign = trips.get(trip_id, (None, None))
+        if not route_id or not headsign: continue
+        for st in stop_times:
+            schedules.setdefault(st['stop_id'], {}).setdefault((route_id, headsign), []).append(stop_index.time_to_seconds(st['arrival_time']))
+    items['STOP_SCHEDULE'] = len([stop_index.encode_schedule_index(s) for s in schedules.values()])
+    items['trip_get_items'] = len(trip_stop_times)
+    return items
+
+def run():
+    content = build_feed()
+    print(f"synthetic feed: {len(content) / 1e6:.1f} MB zipped")
+
+    start = time.perf_counter()
+    legacy_items = legacy(content)
+    legacy_s = time.perf_counter() - start
+
+    timings = StageTimings()
+    start = time.perf_counter()
+    counts = run_pipeline(zipfile.ZipFile(io.BytesIO(content)), lambda items: sum(1 for _ in items), timings)
+    pipeline_s = time.perf_counter() - start
+
+    print(f"legacy (3 Lambdas, 2 downloads, stop_times parsed twice): {legacy_s:.2f}s "
+          f"+ a TRIP_STOP_TIMES# scan and {legacy_items['trip_get_items']} TRIP# get_items")
+    print(f"single pass pipeline (every entity, including STOP#, TRIP# and STOP_INDEX): {pipeline_s:.2f}s")
+    for stage, seconds in timings.stages.items(): print(f"  {stage:<20} {seconds:>7.3f}s")
+    assert counts['stop_routes_processed'] == legacy_items['STOP_ROUTES']
+    assert counts['trip_stop_times_processed'] == legacy_items['TRIP_STOP_TIMES']
+    assert counts['stop_schedules_processed'] == legacy_items['STOP_SCHEDULE']
+    print("item counts match")
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,56 @@
+import sys
+import os
+import json
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lambda', 'pkg_reader'))
+import stop_index
+from bench_stop_trip_index import load_feed
+
+ROUNDS = 200
+NOW = [stop_index.time_to_seconds(t) for t in ('00:30:00', '07:45:00', '12:00:00', '17:30:00', '23:50:00')]
+
+def legacy_lookup(full_schedule, route_keys, now_secs):
+    # What GRT_Reader did per offline route: up to two linear passes comparing 'HH:MM:SS' strings
+    current_time_str = stop_index.seconds_to_time(now_secs)
+    found = []
+    for r_id, r_headsign in route_keys:
+        e = next((e for e in full_schedule if e['r'] == r_id and e['h'] == r_headsign and e['t'] > current_time_str), None) \
+            or next((e for e in full_schedule if e['r'] == r_id and e['h'] == r_headsign), None)
+        found.append(e['t'] if e else None)
+    return found
+
+def index_lookup(index, route_keys, now_secs):
+    return [next(iter(stop_index.next_departures(index.get(key, []), now_secs)), None) for key in route_keys]
+
+def time_it(fn, *args):
+    start = time.perf_counter()
+    for _ in range(ROUNDS): result = fn(*args)
+    return (time.perf_counter() - start) / ROUNDS * 1000, result
+
+def run(path=None):
+    trips, trip_stop_times, _, _ = load_feed(path)
+    schedules = {}
+    for trip_id, stop_times in trip_stop_times.items():
+        route_id, headsign = trips[trip_id]
+        for entry in stop_times:
+            schedules.setdefault(entry['stop_id'], {}).setdefault((route_id, headsign), []).append(stop_index.time_to_seconds(entry['arrival_time']))
+
+    print(f"{'stop':>8} {'departures':>10} {'list KB':>8} {'index KB':>8} {'decode ms':>9} {'scan ms':>8} {'bisect ms':>9}")
+    for stop_id, schedule in sorted(schedules.items(), key=lambda kv: -sum(map(len, kv[1].values())))[:10]:
+        full_schedule = sorted(({'r': r, 'h': h, 't': stop_index.seconds_to_time(t)} for (r, h), times in schedule.items() for t in times), key=lambda x: x['t'])
+        blob = stop_index.encode_schedule_index(schedule)
+        decode_ms, index = time_it(stop_index.decode_schedule_index, blob)
+        route_keys = sorted(schedule)
+        scan_ms = bisect_ms = 0
+        for now in NOW:
+            ms, _ = time_it(legacy_lookup, full_schedule, route_keys, now)
+            scan_ms += ms / len(NOW)
+            ms, _ = time_it(index_lookup, index, route_keys, now)
+            bisect_ms += ms / len(NOW)
+        print(f"{stop_id:>8} {len(full_schedule):>10} {len(json.dumps(full_schedule)) / 1024:>8.1f} {len(blob) / 1024:>8.1f} "
+              f"{decode_ms:>9.2f} {scan_ms:>8.3f} {bisect_ms:>9.3f}")
+    print("Times are per request with every route at the stop offline; decoding happens once per warm container per stop.")
+
+if __name__ == '__main__':
+    run(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,65 @@
+import sys
+import os
+import glob
+import time
+import random
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lambda', 'pkg_ingest'))
+from google.transit import gtfs_realtime_pb2
+from google.protobuf.internal import api_implementation
+import vehicle_decoder
+
+# Recorded feeds live here (save a VehiclePositions response with `curl -o`); synthetic feed otherwise.
+FEED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'debug_data', 'feeds')
+ROUNDS = 50
+
+def protobuf_decode(data):
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.ParseFromString(data)
+    vehicles = []
+    for entity in feed.entity:
+        if entity.HasField('vehicle'):
+            v = entity.vehicle
+            vehicles.append([v.vehicle.id, v.position.latitude, v.position.longitude, v.position.bearing,
+                             v.trip.trip_id, v.current_stop_sequence, v.timestamp])
+    return feed.header.timestamp, vehicles
+
+def synthetic_feed(bus_count=300):
+    rng = random.Random(1)
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = "2.0"
+    feed.header.timestamp = int(time.time())
+    for i in range(bus_count):
+        entity = feed.entity.add(id=str(i))
+        v = entity.vehicle
+        v.vehicle.id = str(20000 + i)
+        v.vehicle.label = str(20000 + i)
+        v.position.latitude = 43.45 + rng.uniform(-0.1, 0.1)
+        v.position.longitude = -80.49 + rng.uniform(-0.1, 0.1)
+        v.position.bearing = float(rng.randint(0, 359))
+        v.trip.trip_id = str(rng.randint(1000000, 9999999))
+        v.trip.route_id = str(rng.randint(1, 200))
+        v.current_stop_sequence = rng.randint(1, 80)
+        v.timestamp = int(time.time())
+    return feed.SerializeToString()
+
+def time_it(fn, data):
+    start = time.perf_counter()
+    for _ in range(ROUNDS): fn(data)
+    return (time.perf_counter() - start) / ROUNDS * 1000
+
+def run(paths):
+    feeds = [(os.path.basename(p), open(p, 'rb').read()) for p in paths]
+    if not feeds: feeds = [("synthetic-300", synthetic_feed())]
+
+    print(f"protobuf implementation: {api_implementation.Type()}")
+    print(f"{'feed':<28}{'bytes':>9}{'vehicles':>10}{'protobuf ms':>14}{'wire ms':>10}{'speedup':>9}  identical")
+    for name, data in feeds:
+        expected = protobuf_decode(data)
+        actual = vehicle_decoder.decode_vehicle_positions(data)
+        pb_ms = time_it(protobuf_decode, data)
+        wire_ms = time_it(vehicle_decoder.decode_vehicle_positions, data)
+        print(f"{name:<28}{len(data):>9}{len(actual[1]):>10}{pb_ms:>14.2f}{wire_ms:>10.2f}{pb_ms / wire_ms:>8.1f}x  {actual == expected}")
+
+if __name__ == '__main__':
+    run(sys.argv[1:] or sorted(glob.glob(os.path.join(FEED_DIR, '*.pb'))))
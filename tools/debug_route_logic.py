@@ -2,11 +2,15 @@ import sys
 import os
 sys.path.append(os.path.join(os.getcwd(), '.gemini/tmp/lib'))
 sys.path.append(os.path.join(os.getcwd(), 'grand_river_current/pkg_ingest'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lambda', 'pkg_reader'))
 
 import boto3
 import json
 import gzip
 from decimal import Decimal
+from boto3.dynamodb.types import TypeDeserializer
+from bus_codec import decode_buses
+from batch_get import batch_get
 
 # Configure AWS
 session = boto3.Session()
@@ -38,7 +42,7 @@ def check_stop_1000():
         print("Error: BUS_ALL not found.")
         return
     
-    buses = json.loads(gzip.decompress(bus_resp['Item']['buses_binary'].value).decode('utf-8'))
+    buses = decode_buses(bus_resp['Item']['buses_binary'].value)
     print(f"Total Live Buses: {len(buses)}")
 
     # 3. Check for Route 4 Buses
@@ -66,17 +70,19 @@ def check_stop_1000():
     # Actually, I'll search the TRIP_STOP_TIMES for the stop_id to find RELEVANT trips first.
     # No, that's not how the reader works. Reader iterates ALL buses.
     
-    print("Checking first 100 buses for Route 4 candidates...")
+    print("Checking all buses for Route 4 candidates...")
     
     found_route_4 = False
     
-    # We can use batch_get_item
-    keys = [{'PK': f"TRIP#{bus['trip_id']}"} for bus in buses if bus.get('trip_id')][:100]
+    # Every bus's trip, with UnprocessedKeys retried instead of silently dropping buses
+    keys = [{'PK': {'S': f"TRIP#{tid}"}} for tid in unique_trip_ids]
     
-    # Simplified batch get (just one batch for now)
     if keys:
-        resp = dynamodb.batch_get_item(RequestItems={table.name: {'Keys': keys}})
-        trips = resp.get('Responses', {}).get(table.name, [])
+        raw_trips, unprocessed, stats = batch_get(dynamodb.meta.client, table.name, keys, deadline_seconds=10)
+        print(f"Trip batch get: {stats.as_dict()}")
+        if unprocessed: print(f"Warning: {len(unprocessed)} trips could not be read; their buses are skipped.")
+        deserializer = TypeDeserializer()
+        trips = [{k: deserializer.deserialize(v) for k, v in t.items()} for t in raw_trips]
         
         trip_map = {t['PK'].split('#')[1]: t for t in trips}
         
@@ -1,6 +1,11 @@
+import sys
+import os
 import boto3
 import json
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lambda', 'pkg_reader'))
+from stop_index import decode_schedule_index, seconds_to_time
+
 # This script assumes you have AWS credentials configured.
 # It will connect to DynamoDB and fetch the raw schedule for a specific stop.
 
@@ -26,7 +31,11 @@ def debug_schedule():
             return
 
         item = response['Item']
-        full_schedule = item.get('Schedule', [])
+        if 'ScheduleIndex' in item:
+            index = decode_schedule_index(item['ScheduleIndex'].value)
+            full_schedule = [{'r': r, 'h': h, 't': seconds_to_time(t)} for (r, h), times in index.items() for t in times]
+        else:
+            full_schedule = item.get('Schedule', [])
         
         print(f"\n--- Full Schedule for Stop {STOP_ID_TO_DEBUG} ---")
         print(f"Total entries: {len(full_schedule)}")
@@ -1,11 +1,18 @@
-import boto3
 import json
 
-session = boto3.Session()
-dynamodb = session.resource('dynamodb')
-table = dynamodb.Table('GRT_Bus_State')
+def rank_stops(stop_routes, min_routes=4):
+    """[(stop_id, route count)] for stops served by at least min_routes routes, busiest first."""
+    stops = [(stop_id, len(routes)) for stop_id, routes in stop_routes.items() if len(routes) >= min_routes]
+    # Sort by count desc
+    stops.sort(key=lambda x: x[1], reverse=True)
+    return stops
 
 def find_busy():
+    import boto3
+    session = boto3.Session()
+    dynamodb = session.resource('dynamodb')
+    table = dynamodb.Table('GRT_Bus_State')
+
     print("Scanning for busy stops...")
     scan = table.scan(
         FilterExpression='begins_with(PK, :s)', 
@@ -13,15 +20,7 @@ def find_busy():
         ProjectionExpression='PK, Routes'
     )
     
-    stops = []
-    for item in scan['Items']:
-        count = len(item.get('Routes', []))
-        if count > 3:
-            stop_id = item['PK'].split('#')[1]
-            stops.append((stop_id, count))
-    
-    # Sort by count desc
-    stops.sort(key=lambda x: x[1], reverse=True)
+    stops = rank_stops({item['PK'].split('#')[1]: item.get('Routes', []) for item in scan['Items']})
     
     print("\n--- Top 10 Busiest Stops ---")
     for s_id, count in stops[:10]:
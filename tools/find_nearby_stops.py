@@ -1,46 +1,37 @@
+import sys
+import os
 import boto3
 import json
-from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lambda', 'pkg_reader'))
+from stop_index import decode_stops_index
+from geo import GridIndex
 
 session = boto3.Session()
 dynamodb = session.resource('dynamodb')
 table = dynamodb.Table('GRT_Bus_State')
 
-def find_nearby():
-    # Get Stop 1000 location
-    resp = table.get_item(Key={'PK': 'STOP#1000'})
+def find_nearby(stop_id='1000', radius_m=150):
+    # One read: the STOP_INDEX item the static ingest builds holds every stop's position and routes
+    resp = table.get_item(Key={'PK': 'STOP_INDEX'})
     if 'Item' not in resp:
-        print("Stop 1000 not found.")
+        print("STOP_INDEX not found. Run GRT_Static_Ingest first.")
+        return
+    stops = decode_stops_index(resp['Item']['Index'].value)
+    if stop_id not in stops['ids']:
+        print(f"Stop {stop_id} not found.")
         return
 
-    target = resp['Item']
-    lat = float(target['lat'])
-    lon = float(target['lon'])
-    print(f"Stop 1000: {target['name']} ({lat}, {lon})")
+    target = stops['ids'].index(stop_id)
+    lat, lon = stops['lat'][target], stops['lon'][target]
+    print(f"Stop {stop_id}: {stops['names'][target]} ({lat}, {lon})")
 
-    # Scan all stops (inefficient but fine for this one-off)
-    # In a real app we'd use GSI or Geospatial index
-    scan = table.scan(FilterExpression='begins_with(PK, :s)', ExpressionAttributeValues={':s': 'STOP#'})
-    
-    print("\n--- Nearby Stops (< 150m) ---")
-    for item in scan['Items']:
-        if item['PK'] == 'STOP#1000' or item.get('type') != 'STATIC_STOP': continue
-        
-        slat = float(item['lat'])
-        slon = float(item['lon'])
-        
-        # Simple Euclidean approx
-        dist = ((slat - lat)**2 + (slon - lon)**2)**0.5
-        if dist < 0.0015: # Approx 150m
-            print(f"{item['PK']}: {item['name']} - Routes: ???")
-            
-            # Check routes for this stop
-            stop_id = item['PK'].split('#')[1]
-            r_resp = table.get_item(Key={'PK': f"STOP_ROUTES#{stop_id}"})
-            if 'Item' in r_resp:
-                routes = r_resp['Item'].get('Routes', [])
-                r_str = ", ".join([f"{r['route_id']} {r['headsign']}" for r in routes])
-                print(f"    Routes: {r_str}")
+    print(f"\n--- Nearby Stops (< {radius_m}m) ---")
+    grid = GridIndex(list(zip(stops['lat'], stops['lon'])))
+    for distance, i in grid.within(lat, lon, radius_m):
+        if i == target: continue
+        print(f"STOP#{stops['ids'][i]}: {stops['names'][i]} - {distance:.0f} m")
+        print(f"    Routes: {', '.join(stops['routes'][i])}")
 
 if __name__ == '__main__':
-    find_nearby()
+    find_nearby(*sys.argv[1:2])
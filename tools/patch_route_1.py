@@ -2,6 +2,10 @@ import boto3
 import json
 import gzip
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lambda', 'pkg_reader'))
+from bus_codec import decode_buses
 
 DYNAMO_TABLE = "GRT_Bus_State"
 dynamodb = boto3.resource('dynamodb')
@@ -21,7 +25,7 @@ def patch_route_1_for_stop_1000():
     print(f"Searching for live Route {TARGET_ROUTE_ID} bus to get headsign...")
     bus_response = table.get_item(Key={'PK': 'BUS_ALL'})
     bus_item = bus_response.get('Item')
-    buses = json.loads(gzip.decompress(bus_item['buses_binary'].value).decode('utf-8')) if bus_item and 'buses_binary' in bus_item else []
+    buses = decode_buses(bus_item['buses_binary'].value) if bus_item and 'buses_binary' in bus_item else []
 
     route_1_headsign = None
     for bus in buses:
@@ -0,0 +1,61 @@
+import io
+import csv
+import random
+import zipfile
+
+# Roughly GRT-sized: ~2,600 stops, ~9,000 weekday trips, ~450k stop_times rows
+DEFAULT_STOPS = 2600
+DEFAULT_ROUTES = 60
+DEFAULT_TRIPS_PER_DIRECTION = 75
+DEFAULT_STOPS_PER_ROUTE = 50
+HUBS = 8  # terminals (Charles, Fairview, Conestoga, ...) shared by many routes
+
+def build_feed(stops=DEFAULT_STOPS, routes=DEFAULT_ROUTES, trips_per_direction=DEFAULT_TRIPS_PER_DIRECTION,
+               stops_per_route=DEFAULT_STOPS_PER_ROUTE, seed=42):
+    """Returns a GTFS static ZIP (bytes) with GRT-like shape, including BOM, quoted names and extra agency columns."""
+    rng = random.Random(seed)
+    stop_ids = [str(1000 + i) for i in range(stops)]
+    hubs = stop_ids[:HUBS]
+
+    def rows_to_csv(header, rows, bom=False):
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator='\r\n')
+        writer.writerow(header)
+        writer.writerows(rows)
+        return ('\ufeff' if bom else '') + buf.getvalue()
+
+    stop_rows = [(sid, sid, f"Stop {sid}, \"Platform {i % 4}\"", f"{43.38 + rng.uniform(0, 0.16):.6f}",
+                  f"{-80.60 + rng.uniform(0, 0.25):.6f}", '0') for i, sid in enumerate(stop_ids)]
+
+    trip_rows, stop_time_rows = [], []
+    trip_no = 0
+    for r in range(routes):
+        route_id = str(r + 1)
+        path = [rng.choice(hubs)] + rng.sample(stop_ids[HUBS:], stops_per_route - 2) + [rng.choice(hubs)]
+        for direction, (stops_in_order, headsign) in enumerate(((path, f"Route {route_id} Outbound"),
+                                                                (path[::-1], f"Route {route_id} Inbound"))):
+            for t in range(trips_per_direction):
+                trip_no += 1
+                trip_id = str(4000000 + trip_no)
+                trip_rows.append((route_id, 'WKDY', trip_id, headsign, str(direction), str(r * 10 + t % 10), 'shape', '1'))
+                start = 5 * 3600 + t * (20 * 3600 // trips_per_direction) + rng.randint(0, 300)
+                for seq, stop_id in enumerate(stops_in_order, start=1):
+                    secs = start + seq * 75
+                    hms = f"{secs // 3600:02d}:{secs % 3600 // 60:02d}:{secs % 60:02d}"
+                    stop_time_rows.append((trip_id, hms, hms, stop_id, str(seq), '0', '0', ''))
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('stops.txt', rows_to_csv(['stop_id', 'stop_code', 'stop_name', 'stop_lat', 'stop_lon', 'location_type'], stop_rows, bom=True))
+        z.writestr('routes.txt', rows_to_csv(['route_id', 'route_short_name', 'route_type'], [(str(r + 1), str(r + 1), '3') for r in range(routes)]))
+        z.writestr('trips.txt', rows_to_csv(['route_id', 'service_id', 'trip_id', 'trip_headsign', 'direction_id', 'block_id', 'shape_id', 'wheelchair_accessible'], trip_rows))
+        z.writestr('stop_times.txt', rows_to_csv(['trip_id', 'arrival_time', 'departure_time', 'stop_id', 'stop_sequence', 'pickup_type', 'drop_off_type', 'timepoint_note'], stop_time_rows))
+        z.writestr('calendar.txt', rows_to_csv(['service_id', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday', 'start_date', 'end_date'],
+                                               [('WKDY', '1', '1', '1', '1', '1', '0', '0', '20260101', '20301231')]))
+    return buf.getvalue()
+
+if __name__ == '__main__':
+    import sys
+    out = sys.argv[1] if len(sys.argv) > 1 else 'synthetic_gtfs.zip'
+    with open(out, 'wb') as f: f.write(build_feed())
+    print(f"Wrote {out}")
@@ -7,9 +7,11 @@ API_URL = "https://dke47c3cr49qs.cloudfront.net"
 LOGGER_URL = "https://q3racsvshuvureikmjutrb4fci0lsaom.lambda-url.us-east-1.on.aws/"
 DYNAMO_TABLE = "GRT_Bus_State"
 TEST_STOP_ID = "1001"
+HISTORY_BUCKET = os.environ.get('HISTORY_BUCKET') or f"grt-history-{boto3.client('sts').get_caller_identity()['Account']}"
 
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table(DYNAMO_TABLE)
+s3 = boto3.client('s3')
 
 results = []
 
@@ -74,16 +76,16 @@ def test_database_integrity():
 
 def test_history_logging():
     try:
-        # Look for a unique PK history record
-        res = table.scan(
-            Limit=1, 
-            FilterExpression="begins_with(PK, :p)", 
-            ExpressionAttributeValues={':p': {"S": "BUS_HISTORY#"}}
-        )
-        has_history = len(res.get('Items', [])) > 0
-        add_result("History", "Unique Record Creation", has_history, "Found recent history blob" if has_history else "No history records found")
+        # History lives in hourly partitions; today's manifest says which hours have data
+        manifest_key = time.strftime("history/%Y/%m/%d/manifest.json", time.gmtime())
+        res = s3.get_object(Bucket=HISTORY_BUCKET, Key=manifest_key)
+        hours = json.loads(res['Body'].read()).get('hours', {})
+        last_ts = max((h['last'] for h in hours.values()), default=0)
+        age_seconds = int(time.time()) - last_ts
+        has_history = age_seconds < 300
+        add_result("History", "Partition Append", has_history, f"Last frame age: {age_seconds}s" if hours else "No partitions today")
     except Exception as e:
-        add_result("History", "Unique Record Creation", False, str(e))
+        add_result("History", "Partition Append", False, str(e))
 
 def test_logger():
     try: